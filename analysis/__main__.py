@@ -1,42 +1,37 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
 from dataclasses import dataclass
-import operator
-from typing import Callable, Literal, Optional, ParamSpec, TypeVar
+from typing import TYPE_CHECKING, Callable, Literal, Optional, ParamSpec, TypeVar
 
 import click
 import rich
 import rich.table
 
-from analysis import discovery, graph, scenario
-from analysis.generator import Configuration, run_experiments
-from analysis.sequence_plot import (
-    Packets,
-    build_conditions,
-    plot_bytesInFlight,
-    plot_sequence,
-)
-from analysis.trace_analyzer.dst.reordered_packets import (
-    OOOAnalyzer,
-    PacketOutOfOrderAnalyzer,
-    SpuriousOOOAnalyzer,
-    TrueBytesInFlightAnalyzer,
-    congestion_windows,
-    hashable_packet,
-    tcp_bytes_in_flight,
-)
-from analysis.trace_analyzer.dst.spurious_retransmission_packets import (
-    SpuriousRetransmissionAnalyzer,
-)
-from analysis.trace_analyzer.source.dropped_packets import DroppedPacketsAnalyzer
-from analysis.trace_analyzer.source.regular_fast_retransmit import (
-    FastRetransmissionAnalyzer,
-)
-from analysis.trace_analyzer.source.replayer import TcpSourceReplayer
-from analysis.trace_analyzer.source.sack_fast_retransmit import (
-    FastRetransmitSackAnalyzer,
-)
-from analysis.trace_analyzer.source.spurious_sack_fast_transmit import (
-    SingleDupAckRetransmitSackAnalyzer,
+from analysis import (
+    classification,
+    daemon,
+    decimation,
+    discovery,
+    goodput,
+    graph,
+    manifest,
+    profiling,
+    report,
+    scenario,
+    telemetry,
 )
+from analysis.design import SampledDesign
+from analysis.ecdf import ECDF, ExportedECDF
+from analysis.histogram import ExportedHistogram
+from analysis.statistic import CONFIDENCE
+from analysis.window import Window
+
+if TYPE_CHECKING:
+    from analysis.generator import Configuration
+
 
 P = ParamSpec("P")
 T = TypeVar("T")
@@ -58,10 +53,106 @@ def _analysis() -> None: ...
     type=str,
     required=True,
 )
-def _simulate(config_filename: str) -> None:
+@click.option(
+    "--compress",
+    help="Compress the traces of every run once it finishes",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--estimate",
+    help="Print the predicted cost of the experiment without running it",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--no-cache",
+    help="Simulate every command even if an identical run already exists",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--simulator",
+    help="Command to run instead of ns-3, with {} standing for the simulation's options",
+    default=None,
+)
+def _simulate(
+    config_filename: str,
+    compress: bool,
+    estimate: bool,
+    no_cache: bool,
+    simulator: Optional[str],
+) -> None:
+    from analysis.generator import Configuration, run_experiments
+
     with open(config_filename, "r") as file:
         configuration = Configuration.model_validate_json(file.read())
-        run_experiments(configuration)
+    if compress:
+        configuration = configuration.model_copy(update={"compress": True})
+    if no_cache:
+        configuration = configuration.model_copy(update={"cache": False})
+    if simulator is not None:
+        if "{}" not in simulator:
+            raise click.BadParameter(
+                "must contain {} where the options go", param_hint="--simulator"
+            )
+        configuration = configuration.model_copy(update={"simulator": simulator})
+    if estimate:
+        print_estimate(configuration)
+        return
+    run_experiments(configuration)
+
+
+def print_estimate(configuration: Configuration) -> None:
+    from analysis.generator import schedule
+
+    scheduled = schedule(configuration)
+    wall_times = [estimate.wall_time for _, estimate in scheduled]
+    workers = os.cpu_count() or 1
+
+    table = rich.table.Table(title=configuration.directory, show_header=False)
+    table.add_row("Commands", str(len(scheduled)))
+    table.add_row("CPU hours", f"{sum(wall_times) / 3600:.2f}")
+    table.add_row(
+        f"Makespan on {workers} workers (hours)",
+        f"{telemetry.makespan(wall_times, workers) / 3600:.2f}",
+    )
+    table.add_row(
+        "Disk usage",
+        telemetry.format_bytes(sum(estimate.output_bytes for _, estimate in scheduled)),
+    )
+    if scheduled:
+        longest, longest_estimate = scheduled[0]
+        table.add_row(
+            "Longest command",
+            f"{longest.directory} ({longest_estimate.wall_time:.1f}s)",
+        )
+    rich.console.Console().print(table)
+
+
+def start_profiling(ctx: click.Context, filename: str, memory: bool) -> None:
+    """Profiles the stages until the command finishes, when the profile is printed
+    and written to filename"""
+
+    def finish() -> None:
+        profiling.profiler.stop()
+        stages = profiling.profiler.report()
+        profiling.print_report(stages)
+        profiling.store_report(filename, stages)
+
+    profiling.profiler.start(memory)
+    ctx.call_on_close(finish)
+
+
+def start_sampling(ctx: click.Context, filename: str) -> None:
+    sampler = profiling.StackSampler(threading.get_ident())
+
+    def finish() -> None:
+        sampler.stop()
+        sampler.store(filename)
+
+    sampler.start()
+    ctx.call_on_close(finish)
 
 
 def multi_command(
@@ -88,16 +179,36 @@ def generate_scenarios(
     options: Optional[list[discovery.Options]],
     seeds: list[discovery.Seed],
     variables: list[discovery.Variable],
-) -> dict[discovery.Options, scenario.Scenario]:
+    axis: int = 0,
+    window: Window = Window(),
+) -> dict[discovery.Options, scenario.Scenario | daemon.RemoteScenario]:
     if not options:
         options = discovery.discover_options(directory)
     if not seeds:
         seeds = discovery.discover_seeds(directory, options[0])
     if not variables:
         variables = discovery.discover_variables(directory, options[0], seeds[0])
+    if client := daemon.connect():
+        return {
+            option: daemon.RemoteScenario(
+                directory=directory,
+                option=option,
+                seeds=seeds,
+                variables=tuple(variables),
+                axis=axis,
+                client=client,
+                window=window,
+            )
+            for option in options
+        }
     return {
         option: scenario.Scenario(
-            directory=directory, option=option, seeds=seeds, variables=tuple(variables)
+            directory=directory,
+            option=option,
+            seeds=seeds,
+            variables=tuple(variables),
+            axis=axis,
+            window=window,
         )
         for option in options
     }
@@ -112,6 +223,73 @@ class GraphArguments:
     output: Optional[str]
 
 
+def print_incomplete_runs(incomplete_runs: list[manifest.IncompleteRun]) -> None:
+    table = rich.table.Table(title="Incomplete runs", show_header=True)
+    table.add_column("Option")
+    table.add_column("Seed")
+    table.add_column("Variable")
+    table.add_column("Reason")
+    for location, reason in incomplete_runs:
+        table.add_row(*location, reason)
+    rich.console.Console().print(table)
+
+
+@click.command("index")
+@click.option("--directory", "-d", help="Path to the directory", required=True)
+def _index(directory: str) -> None:
+    trace_manifest = manifest.Manifest.scan(directory)
+    trace_manifest.store()
+    rich.console.Console().print(
+        f":card_index: [bold green]Indexed[/bold green] {len(trace_manifest.locations)} runs in {directory}",
+        emoji=True,
+    )
+    if incomplete_runs := trace_manifest.incomplete_runs():
+        print_incomplete_runs(incomplete_runs)
+
+
+@click.command("serve")
+@click.option(
+    "--stop", help="Stop the daemon that is serving", is_flag=True, default=False
+)
+def _serve(stop: bool) -> None:
+    console = rich.console.Console()
+    if stop:
+        if client := daemon.connect():
+            client.request("shutdown")
+            console.print(
+                ":stop_sign: [bold red]Stopped[/bold red] the daemon", emoji=True
+            )
+        return
+    console.print(
+        f":satellite: [bold green]Serving[/bold green] analyses on {daemon.SOCKET_FILENAME}",
+        emoji=True,
+    )
+    daemon.serve()
+
+
+def window_options(command: Callable[P, T]) -> Callable[P, T]:
+    """Adds --from and --to, passed to the command as the window of the run"""
+    options = [
+        click.option(
+            "--from",
+            "start",
+            help="Ignore the packets before this many seconds",
+            type=float,
+            default=None,
+        ),
+        click.option(
+            "--to",
+            "end",
+            help="Ignore the packets after this many seconds",
+            type=float,
+            default=None,
+        ),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
 @click.command("bytesInFlight")
 @click.option("--directory", "-d", help="Path to the directory", required=True)
 @click.option("--directory", "-d", help="Path to the directory", required=True)
@@ -119,32 +297,36 @@ class GraphArguments:
 @click.option("--seed", "-s", help="Seed of the run", required=True)
 @click.option("--value", "-v", help="Value to display e.g. 3.0Mbps", required=True)
 @click.option("--sender", "-s", help="Traffic Sender number", default=1, type=int)
+@window_options
 def _bytesInFlight(
     directory: str,
     option: discovery.Options,
     seed: discovery.Seed,
     value: discovery.Variable,
     sender: int,
+    start: Optional[float],
+    end: Optional[float],
 ) -> None:
-    run = scenario.VariableRun(directory, option, seed, (value,))
-    traffic_sender, receiver = run.senders[value][sender], run.receivers[value]
-    source, dst = run.ip_addresses(value)
+    window = Window(start, end)
+    if client := daemon.connect():
+        flight = client.request(
+            "bytes_in_flight",
+            directory=directory,
+            option=option,
+            seed=seed,
+            value=value,
+            sender=sender,
+            window=window,
+        )
+    else:
+        from analysis import inspection
 
-    dropped_packets = DroppedPacketsAnalyzer(traffic_sender, receiver).filter_packets(
-        source, dst
-    )
-    capture = TrueBytesInFlightAnalyzer(
-        lost_packets=[hashable_packet(pkt) for pkt in dropped_packets]
-    )
-    TcpSourceReplayer(
-        file=traffic_sender, source=source, destination=dst, event_handlers=capture
-    ).run()
-
-    plot_bytesInFlight(
-        capture.bytes_in_flight,
-        tcp_bytes_in_flight(run.debug_filename(value), sender),
-        congestion_windows(run.cwnd_filename(value, sender)),
-    )
+        run = scenario.VariableRun(directory, option, seed, (value,), window=window)
+        flight = inspection.bytes_in_flight(run, value, sender)
+
+    from analysis.sequence_plot import plot_bytesInFlight
+
+    plot_bytesInFlight(*flight)
 
 
 @click.command("sequence")
@@ -164,6 +346,26 @@ def _bytesInFlight(
     "--receiver-ack", help="Receiver sending an ack", is_flag=True, default=False
 )
 @click.option("--sender", "-s", help="Traffic Sender number", default=1, type=int)
+@click.option(
+    "--decimation",
+    "method",
+    help="How to thin out the packets before drawing them",
+    type=click.Choice(decimation.decimations),
+    default="minmax",
+)
+@click.option(
+    "--buckets",
+    help="Number of buckets along the time axis to decimate into",
+    default=decimation.DEFAULT_BUCKETS,
+    type=int,
+)
+@click.option(
+    "--export",
+    "export_filename",
+    help="Write the condition of every packet the sender sent as JSON",
+    default=None,
+)
+@window_options
 def _sequence(
     directory: str,
     option: discovery.Options,
@@ -174,64 +376,120 @@ def _sequence(
     receiver_seq: bool,
     receiver_ack: bool,
     sender: int,
+    method: decimation.Decimation,
+    buckets: int,
+    export_filename: Optional[str],
+    start: Optional[float],
+    end: Optional[float],
 ) -> None:
-    run = scenario.VariableRun(directory, option, seed, (value,))
-    traffic_sender, receiver = run.senders[value][sender], run.receivers[value]
-    source, dst = run.flow_ip_addresses(value)[sender]
-
-    packet_lists = []
-    if sender_seq:
-        packet_lists.append(
-            Packets(
-                "Sender Seq",
-                traffic_sender.packets_from(source),
-                operator.attrgetter("seq"),
-                build_conditions(
-                    SpuriousOOOAnalyzer(traffic_sender, receiver),
-                    SingleDupAckRetransmitSackAnalyzer(traffic_sender, receiver),
-                    FastRetransmitSackAnalyzer(traffic_sender),
-                    FastRetransmissionAnalyzer(traffic_sender),
-                    DroppedPacketsAnalyzer(traffic_sender, receiver),
-                    OOOAnalyzer(traffic_sender, receiver),
-                    source=source,
-                    destination=dst,
-                ),
-            )
-        )
-    if sender_ack:
-        packet_lists.append(
-            Packets(
-                "Sender Ack",
-                traffic_sender.packets_from(dst),
-                operator.attrgetter("ack"),
-            )
+    window = Window(start, end)
+    flags = dict(
+        sender_seq=sender_seq,
+        sender_ack=sender_ack,
+        receiver_seq=receiver_seq,
+        receiver_ack=receiver_ack,
+    )
+    if client := daemon.connect():
+        series = client.request(
+            "sequence",
+            directory=directory,
+            option=option,
+            seed=seed,
+            value=value,
+            sender=sender,
+            window=window,
+            **flags,
         )
-    if receiver_seq:
-        print(receiver.filename)
-        packet_lists.append(
-            Packets(
-                "Receiver Seq",
-                receiver.packets_from(source),
-                operator.attrgetter("seq"),
-                build_conditions(
-                    SpuriousRetransmissionAnalyzer(receiver),
-                    PacketOutOfOrderAnalyzer(receiver),
-                    source=source,
-                    destination=dst,
-                ),
+    else:
+        from analysis import inspection
+
+        run = scenario.VariableRun(directory, option, seed, (value,), window=window)
+        series = inspection.sequence(run, value, sender, **flags)
+
+    if export_filename:
+        from analysis import inspection
+
+        run = scenario.VariableRun(directory, option, seed, (value,), window=window)
+        with open(export_filename, "w") as file:
+            file.write(
+                inspection.exported_classification(run, value, sender).model_dump_json()
             )
-        )
 
-    if receiver_ack:
-        packet_lists.append(
-            Packets(
-                "Receiver Ack",
-                traffic_sender.packets_from(dst),
-                operator.attrgetter("ack"),
+    from analysis.sequence_plot import plot_sequence
+
+    plot_sequence(*series, method=method, buckets=buckets)
+
+
+@click.command("goodput")
+@click.option("--directory", "-d", help="Path to the directory", required=True)
+@click.option("--option", "-o", help="Option of the run", required=True)
+@click.option(
+    "--seed",
+    "-s",
+    "seeds",
+    help="Seeds to aggregate, if not set will aggregate every seed",
+    multiple=True,
+    default=[],
+)
+@click.option("--value", "-v", help="Value to display e.g. 3.0Mbps", required=True)
+@click.option(
+    "--bucket",
+    "width",
+    help="Seconds of every bucket along the time axis",
+    default=goodput.BUCKET_WIDTH,
+    type=float,
+)
+@click.option(
+    "--throughput",
+    help="Count every payload byte received, retransmissions included",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--percentiles",
+    help="Lower and upper percentile of the band across seeds",
+    nargs=2,
+    default=(5.0, 95.0),
+    type=float,
+)
+@click.option("--data", help="Write the bands as JSON to this file", default=None)
+@window_options
+def _goodput(
+    directory: str,
+    option: discovery.Options,
+    seeds: tuple[discovery.Seed, ...],
+    value: discovery.Variable,
+    width: float,
+    throughput: bool,
+    percentiles: tuple[float, float],
+    data: Optional[str],
+    start: Optional[float],
+    end: Optional[float],
+) -> None:
+    timelines = [
+        scenario.VariableRun(
+            directory, option, seed, (value,), window=Window(start, end)
+        ).goodput_timeline(value, width, throughput)
+        for seed in seeds or discovery.discover_seeds(directory, option)
+    ]
+    if not timelines:
+        raise click.UsageError(f"No runs of {option} in {directory}")
+    bands = goodput.bands(timelines, percentiles)
+
+    if data:
+        with open(data, "w") as file:
+            json.dump(
+                [
+                    goodput.ExportedBand.from_band(flow, band).model_dump()
+                    for flow, band in enumerate(bands)
+                ],
+                file,
+                indent=2,
             )
-        )
 
-    plot_sequence(*packet_lists)
+    from analysis.sequence_plot import plot_goodput
+
+    plot_goodput(bands, "Throughput" if throughput else "Goodput")
 
 
 @click.group(name="graph")
@@ -260,7 +518,36 @@ def _sequence(
     help="variables to plot, if not set will discover",
     default=[],
 )
+@click.option(
+    "--axis",
+    "-a",
+    help="Swept variable to plot against when the experiment varies several",
+    default=None,
+)
 @click.option("--output", "-o", help="Output file name")
+@click.option(
+    "--profile",
+    help="Record the time, calls, packets and peak memory of every stage, which "
+    "tracing memory slows down",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--profile-memory/--no-profile-memory",
+    help="Trace the peak memory of every stage while profiling",
+    default=True,
+)
+@click.option(
+    "--profile-output",
+    help="Where to write the profile as JSON",
+    default="profile.json",
+)
+@click.option(
+    "--stacks",
+    help="Sample the stack and write the collapsed stacks to this file for flamegraphs",
+    default=None,
+)
+@window_options
 @click.pass_context
 def _graph(
     ctx: click.Context,
@@ -268,9 +555,25 @@ def _graph(
     options: list[discovery.Options],
     variables: list[discovery.Variable],
     seeds: list[discovery.Seed],
+    axis: Optional[str],
     output: Optional[str],
+    profile: bool,
+    profile_memory: bool,
+    profile_output: str,
+    stacks: Optional[str],
+    start: Optional[float],
+    end: Optional[float],
 ) -> None:
     ctx.ensure_object(dict)
+    if profile:
+        start_profiling(ctx, profile_output, profile_memory)
+    if stacks is not None:
+        start_sampling(ctx, stacks)
+    design = SampledDesign.load(directory)
+    if design is None and axis is not None:
+        raise click.BadParameter(
+            f"{directory} has no sampled design to take the {axis} axis from"
+        )
     ctx.obj["arguments"] = GraphArguments(
         directory=directory,
         options=options,
@@ -280,9 +583,24 @@ def _graph(
     )
 
     ctx.obj["scenarios"] = generate_scenarios(
-        directory=directory, options=options, seeds=seeds, variables=variables
+        directory=directory,
+        options=options,
+        seeds=seeds,
+        variables=variables,
+        axis=design.axis(axis) if design else 0,
+        window=Window(start, end),
     )
 
+    if trace_manifest := manifest.cached_manifest(directory):
+        incomplete_runs = trace_manifest.incomplete_runs(
+            manifest.RunLocation(option, seed, variable)
+            for option, scenario in ctx.obj["scenarios"].items()
+            for seed in scenario.seeds
+            for variable in scenario.variables
+        )
+        if incomplete_runs:
+            print_incomplete_runs(incomplete_runs)
+
 
 @click.group(name="udp_loss")
 @click.pass_context
@@ -510,10 +828,106 @@ def _average_congestion_window(ctx: click.Context) -> None:
     ctx.obj["title"] = "Average Congestion Window"
 
 
+def _statistic(name: str, attribute: str, property: str, title: str) -> click.Group:
+    @click.group(name=name)
+    @click.pass_context
+    def group(ctx: click.Context) -> None:
+        ctx.obj["statistics"] = {
+            option: getattr(scenario, attribute)
+            for option, scenario in ctx.obj["scenarios"].items()
+        }
+        ctx.obj["property"] = property
+        ctx.obj["title"] = title
+
+    return group
+
+
+def _multi_flow(name: str, attribute: str, property: str) -> click.Group:
+    return _statistic(name, attribute, property, f"{property} per Flow")
+
+
+_fairness = _statistic(
+    "fairness",
+    "flow_fairness",
+    "Jain's Fairness Index",
+    "Fairness of Flow Completion Times",
+)
+_goodput_fairness = _statistic(
+    "goodput_fairness",
+    "goodput_fairness",
+    "Jain's Fairness Index",
+    "Fairness of Goodput over Time",
+)
+_rtt = _statistic("rtt", "rtt_multi_flow", "RTT (ms)", "RTT of every Timed Packet")
+_reorder_extent = _statistic(
+    "reorder_extent",
+    "reorder_extent",
+    "Reorder Extent (packets)",
+    "Reorder Extent of every Reordered Packet",
+)
+_reorder_displacement = _statistic(
+    "reorder_displacement",
+    "reorder_displacement",
+    "Displacement (packets)",
+    "Reorder Density",
+)
+
+
+# the statistics every sender's flow is measured by, from one replay of each sender
+# and one pass over the receiver's and the router's captures
+multi_flow_statistics = (
+    _multi_flow("lost_multi_flow", "packets_lost_multi_flow", "Packets Lost"),
+    _multi_flow(
+        "rerouted_multi_flow", "packets_rerouted_multi_flow", "Rerouted Packets"
+    ),
+    _multi_flow(
+        "total_recovery_time_multi_flow",
+        "total_recovery_time_multi_flow",
+        "Total Recovery Time (s)",
+    ),
+    _multi_flow(
+        "rto_wait_time_multi_flow", "rto_wait_time_multi_flow", "RTO wait time"
+    ),
+    _multi_flow(
+        "rto_wait_time_unsent_data_multi_flow",
+        "rto_wait_time_for_unsent_multi_flow",
+        "RTO wait time on unsent data",
+    ),
+    _multi_flow(
+        "dropped_retransmitted_packets_multi_flow",
+        "dropped_retransmitted_packets_multi_flow",
+        "Dropped Retransmitted Packets",
+    ),
+    _multi_flow(
+        "peak_goodput_multi_flow", "peak_goodput_multi_flow", "Peak Goodput (Mbps)"
+    ),
+    _multi_flow(
+        "median_goodput_multi_flow",
+        "median_goodput_multi_flow",
+        "Median Goodput (Mbps)",
+    ),
+    _multi_flow(
+        "displaced_multi_flow", "displaced_multi_flow", "Fraction of Packets Displaced"
+    ),
+    _multi_flow("median_rtt_multi_flow", "median_rtt_multi_flow", "Median RTT (ms)"),
+    _multi_flow("p95_rtt_multi_flow", "p95_rtt_multi_flow", "P95 RTT (ms)"),
+    _multi_flow(
+        "rtt_inflation_multi_flow",
+        "rtt_inflation_multi_flow",
+        "RTT Inflation while Rerouted",
+    ),
+)
+
+
 statistics = (
     _max_flow_time,
     _time,
     _time_multi_flow,
+    _fairness,
+    _goodput_fairness,
+    _rtt,
+    _reorder_extent,
+    _reorder_displacement,
     _average_time,
     _total_recovery_time,
     _loss,
@@ -532,15 +946,41 @@ statistics = (
     _spurious_retransmissions_reordering,
     _longest_number_spurious_retransmissions_before_rto,
     _average_congestion_window,
+    *multi_flow_statistics,
+    *(
+        _statistic(f"classified_{condition}", f"classified_{condition}", name, name)
+        for condition, name in classification.SENDER_CONDITIONS.items()
+    ),
 )
 
 
+def _write_curves(filename: Optional[str], curves: dict[str, ECDF]) -> None:
+    if filename is None:
+        return
+    with open(filename, "w") as file:
+        json.dump(
+            {
+                label: ExportedECDF.from_ecdf(curve).model_dump()
+                for label, curve in curves.items()
+            },
+            file,
+        )
+
+
 @multi_command(*statistics, name="cdf_diff")
+@click.option(
+    "--points",
+    "-p",
+    help="Downsample every curve to this many quantiles",
+    type=int,
+    default=None,
+)
+@click.option("--data", help="Write the curves as JSON to this file", default=None)
 @click.pass_context
-def cdf_diff(ctx: click.Context) -> None:
+def cdf_diff(ctx: click.Context, points: Optional[int], data: Optional[str]) -> None:
     arguments = ctx.obj["arguments"]
     stats = ctx.obj["statistics"]
-    graph.cdf_time_diff(
+    curves = graph.cdf_time_diff(
         stats["baseline-udp"].data,
         stats["frr"].data,
         graph.Labels(
@@ -549,13 +989,25 @@ def cdf_diff(ctx: click.Context) -> None:
             title=ctx.obj["title"],
         ),
         target=arguments.output,
+        points=points,
     )
+    _write_curves(data, curves)
 
 
 @multi_command(*statistics, name="cdf")
 @click.option("--variable", "-v", help="Variable to plot", type=str, required=True)
+@click.option(
+    "--points",
+    "-p",
+    help="Downsample every curve to this many quantiles",
+    type=int,
+    default=None,
+)
+@click.option("--data", help="Write the curves as JSON to this file", default=None)
 @click.pass_context
-def cdf(ctx: click.Context, variable: str) -> None:
+def cdf(
+    ctx: click.Context, variable: str, points: Optional[int], data: Optional[str]
+) -> None:
     arguments = ctx.obj["arguments"]
     stats = ctx.obj["statistics"]
 
@@ -570,7 +1022,7 @@ def cdf(ctx: click.Context, variable: str) -> None:
 
     values = [plot[variable_idx].value for plot in first_stat.data.values()]
 
-    graph.cdf(
+    curves = graph.cdf(
         values,
         graph.Labels(
             x_axis=ctx.obj["property"],
@@ -578,13 +1030,25 @@ def cdf(ctx: click.Context, variable: str) -> None:
             title=ctx.obj["title"],
         ),
         target=arguments.output,
+        points=points,
     )
+    _write_curves(data, curves)
 
 
 @multi_command(*statistics, name="cdf_multi_flow")
 @click.option("--variable", "-v", help="Variable to plot", type=str, required=True)
+@click.option(
+    "--points",
+    "-p",
+    help="Downsample every curve to this many quantiles",
+    type=int,
+    default=None,
+)
+@click.option("--data", help="Write the curves as JSON to this file", default=None)
 @click.pass_context
-def cdf_multi_flow(ctx: click.Context, variable: str) -> None:
+def cdf_multi_flow(
+    ctx: click.Context, variable: str, points: Optional[int], data: Optional[str]
+) -> None:
     arguments = ctx.obj["arguments"]
     stats = ctx.obj["statistics"]
 
@@ -602,7 +1066,7 @@ def cdf_multi_flow(ctx: click.Context, variable: str) -> None:
         for option, stat in stats.items()
     }
 
-    graph.cdf_multi_flow(
+    curves = graph.cdf_multi_flow(
         values,
         graph.Labels(
             x_axis=ctx.obj["property"],
@@ -610,12 +1074,71 @@ def cdf_multi_flow(ctx: click.Context, variable: str) -> None:
             title=ctx.obj["title"],
         ),
         target=arguments.output,
+        points=points,
+    )
+    _write_curves(data, curves)
+
+
+@multi_command(*statistics, name="histogram")
+@click.option("--variable", "-v", help="Variable to plot", type=str, required=True)
+@click.option(
+    "--bins",
+    "-b",
+    help="Number of bins, if not set counts get a bin for every integer",
+    type=int,
+    default=None,
+)
+@click.option("--data", help="Write the histograms as JSON to this file", default=None)
+@click.pass_context
+def histogram(
+    ctx: click.Context, variable: str, bins: Optional[int], data: Optional[str]
+) -> None:
+    """Pools the values of every seed at the variable, per option"""
+    arguments = ctx.obj["arguments"]
+    stats = ctx.obj["statistics"]
+
+    extracted_variable = scenario.extract_numerical_value_from_string(variable)
+    values = {
+        option: [
+            plot.value
+            for plots in stat.data.values()
+            for plot in plots
+            if plot.variable == extracted_variable
+        ]
+        for option, stat in stats.items()
+    }
+
+    counted = graph.histogram(
+        values,
+        graph.Labels(
+            x_axis=ctx.obj["property"],
+            y_axis="Fraction of Samples",
+            title=ctx.obj["title"],
+        ),
+        target=arguments.output,
+        bins=bins,
     )
+    if data is not None:
+        with open(data, "w") as file:
+            json.dump(
+                {
+                    label: ExportedHistogram.from_histogram(counts).model_dump()
+                    for label, counts in counted.items()
+                },
+                file,
+            )
 
 
 @multi_command(*statistics, name="min_max_plot")
+@click.option(
+    "--interval",
+    "-i",
+    help="What the error bars span: the minimum to maximum, the 5th to 95th percentile or the bootstrapped confidence interval of the average",
+    type=click.Choice(graph.intervals),
+    default="range",
+)
 @click.pass_context
-def min_max_plot(ctx: click.Context) -> None:
+def min_max_plot(ctx: click.Context, interval: graph.Interval) -> None:
     arguments = ctx.obj["arguments"]
     stats = ctx.obj["statistics"]
 
@@ -627,6 +1150,7 @@ def min_max_plot(ctx: click.Context) -> None:
             title=ctx.obj["title"],
         ),
         target=arguments.output,
+        interval=interval,
         styles={
             "no_frr_congested": {"ecolor": "orange", "color": "orange"},
             "frr": {"ecolor": "blue", "color": "blue"},
@@ -668,25 +1192,46 @@ def summary(ctx: click.Context) -> None:
         table.add_column("Minimum")
         table.add_column("Maximum")
         table.add_column("Standard Deviation")
+        table.add_column("Median")
+        table.add_column("P5 - P95")
+        table.add_column(f"{CONFIDENCE:.0%} CI")
 
         averages = scenario.average
         minimums = scenario.minimum
         maximums = scenario.maximum
         standard_deviations = scenario.standard_deviation
-
-        for variable, average, minimum, maximum, std_dev in zip(
-            tuple(avg.variable for avg in averages),
+        lows, medians, highs = scenario.percentiles(5, 50, 95)
+        confidence_interval = scenario.confidence_interval
+
+        for (
+            average,
+            minimum,
+            maximum,
+            std_dev,
+            low,
+            median,
+            high,
+            lower,
+            upper,
+        ) in zip(
             averages,
             minimums,
             maximums,
             standard_deviations,
+            lows,
+            medians,
+            highs,
+            *confidence_interval,
         ):
             table.add_row(
-                str(variable),
+                str(average.variable),
                 str(round(average.value, 2)),
                 str(round(minimum.value, 2)),
                 str(round(maximum.value, 2)),
                 str(round(std_dev.value, 2)),
+                str(round(median.value, 2)),
+                f"{round(low.value, 2)} - {round(high.value, 2)}",
+                f"{round(lower.value, 2)} - {round(upper.value, 2)}",
             )
         console.print(table)
 
@@ -716,9 +1261,41 @@ def table(ctx: click.Context) -> None:
                     seed,
                     str(value),
                 )
+            table.add_section()
+            for percentile, plots in zip(
+                (5, 50, 95), stat.percentiles(5, 50, 95), strict=True
+            ):
+                table.add_row(f"{percentile}th Percentile", str(plots[idx].value))
+            lower, upper = stat.confidence_interval
+            table.add_row(
+                f"{CONFIDENCE:.0%} CI of Average",
+                f"{lower[idx].value} - {upper[idx].value}",
+            )
             console.print(table)
 
 
+@multi_command(*statistics, name="export")
+@click.pass_context
+def export(ctx: click.Context) -> None:
+    arguments = ctx.obj["arguments"]
+    stats = ctx.obj["statistics"]
+
+    exported = json.dumps(
+        {
+            option: scenario.ExportedStatistic.model_validate(
+                {"data": stat.data}
+            ).model_dump(mode="json")
+            for option, stat in stats.items()
+        },
+        indent=2,
+    )
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            file.write(exported)
+    else:
+        click.echo(exported)
+
+
 @click.group(name="against")
 @click.pass_context
 def _against(ctx: click.Context) -> None:
@@ -746,6 +1323,64 @@ def scatter(ctx: click.Context, line: bool) -> None:
     )
 
 
+@_graph.command(name="report")
+@click.option(
+    "--format",
+    "-f",
+    "formats",
+    help="Formats to write every figure in",
+    type=click.Choice(report.formats),
+    multiple=True,
+    default=report.formats,
+)
+@click.option(
+    "--chart",
+    "-c",
+    "charts",
+    help="Charts to render for every statistic",
+    type=click.Choice(report.charts),
+    multiple=True,
+    default=report.charts,
+)
+@click.option(
+    "--jobs", "-j", help="Processes to render with, defaults to every core", type=int
+)
+@click.pass_context
+def _report(
+    ctx: click.Context,
+    formats: tuple[report.Format, ...],
+    charts: tuple[report.Chart, ...],
+    jobs: Optional[int],
+) -> None:
+    arguments = ctx.obj["arguments"]
+    console = rich.console.Console()
+
+    sections: dict[str, report.Section] = {}
+    for group in statistics:
+        assert group.name is not None
+        try:
+            ctx.invoke(group)
+        except Exception as e:
+            console.print(
+                f":warning: Skipping {group.name}, which could not be computed: [bold red]{e}[/bold red]",
+                emoji=True,
+            )
+            continue
+        sections[group.name] = report.Section(
+            ctx.obj["title"], ctx.obj["property"], ctx.obj["statistics"]
+        )
+
+    index = report.generate(
+        sections,
+        arguments.directory,
+        arguments.output or "report",
+        formats,
+        charts,
+        workers=jobs,
+    )
+    console.print(f"Report written to [bold]{index}[/bold]")
+
+
 for statistic in statistics:
     _graph.add_command(statistic)
     _against.add_command(statistic)
@@ -754,7 +1389,10 @@ for statistic in statistics:
 _analysis.add_command(_graph)
 _analysis.add_command(_sequence)
 _analysis.add_command(_bytesInFlight)
+_analysis.add_command(_goodput)
 _analysis.add_command(_simulate)
+_analysis.add_command(_index)
+_analysis.add_command(_serve)
 
 if __name__ == "__main__":
     _analysis()
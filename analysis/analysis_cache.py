@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import os
+from typing import Callable, Optional, TypeVar
+
+from analysis import compression
+
+CACHE_DIRECTORY = ".analysis_cache"
+
+T = TypeVar("T")
+
+
+def folder(directory: str) -> str:
+    """Where what is computed from the runs in directory is cached, which is
+    concatenated like the statistics' cache so that an absolute directory stays
+    under CACHE_DIRECTORY rather than replacing it as with os.path.join"""
+    return f"{CACHE_DIRECTORY}/{directory}"
+
+
+def cached(
+    directory: str,
+    name: str,
+    sources: list[str],
+    load: Callable[[str], Optional[T]],
+    store: Callable[[T, str], None],
+    compute: Callable[[], T],
+) -> T:
+    """Loads what is cached as name.npz for the traces of a run, computing it again
+    when any of the traces it was computed from have changed since, or when load
+    rejects what it read by returning None"""
+    filename = os.path.join(folder(directory), f"{name}.npz")
+    modified = max(
+        (os.path.getmtime(compression.resolve(source)) for source in sources),
+        default=0.0,
+    )
+    if os.path.exists(filename) and os.path.getmtime(filename) >= modified:
+        try:
+            value = load(filename)
+        except (OSError, ValueError, KeyError):
+            os.remove(filename)
+        else:
+            if value is not None:
+                return value
+
+    value = compute()
+    os.makedirs(folder(directory), exist_ok=True)
+    store(value, filename)
+    return value
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Iterable, Optional, Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+from pydantic import BaseModel
+
+from analysis import analysis_cache
+from analysis.window import Window
+
+if TYPE_CHECKING:
+    import scapy.packet
+
+# a packet that no condition matched
+UNCLASSIFIED = 0
+
+# the conditions of a sender's packets, labelled in this order of precedence so that a
+# packet matching several is only marked by the first of them
+SENDER_CONDITIONS: dict[str, str] = {
+    "spurious_ooo": "Spurious Retransmission due to OOO Packet",
+    "single_dup_ack": "Single Dup Ack Fast Retransmit",
+    "sack_fast_retransmit": "SACK Fast Retransmit",
+    "fast_retransmission": "Fast Retransmission",
+    "dropped": "Dropped Packets",
+    "out_of_order": "Out of Order Packets",
+}
+
+Labels = NDArray[np.uint8]
+
+
+def _key(packet: scapy.packet.Packet) -> tuple[int, int, float]:
+    return packet.seq, packet.ack, float(packet.time)
+
+
+def _times(packets: Sequence[scapy.packet.Packet]) -> NDArray[np.float64]:
+    return np.fromiter(
+        (float(packet.time) for packet in packets), np.float64, count=len(packets)
+    )
+
+
+def classify(
+    packets: list[scapy.packet.Packet],
+    conditions: tuple[str, ...],
+    matches: Iterable[Sequence[scapy.packet.Packet]],
+) -> Classification:
+    """Labels every packet by the first of the matches it is in, counting from one,
+    where packets are matched by their sequence, acknowledgement and time"""
+    positions: defaultdict[tuple[int, int, float], list[int]] = defaultdict(list)
+    for position, packet in enumerate(packets):
+        positions[_key(packet)].append(position)
+
+    labels = np.full(len(packets), UNCLASSIFIED, dtype=np.uint8)
+    for label, matched_packets in enumerate(matches, start=1):
+        matched = np.fromiter(
+            (
+                position
+                for packet in matched_packets
+                for position in positions.get(_key(packet), ())
+            ),
+            np.int64,
+        )
+        matched = matched[labels[matched] == UNCLASSIFIED]
+        labels[matched] = label
+    return Classification(conditions, labels, _times(packets))
+
+
+@dataclass(frozen=True, eq=False)
+class Classification:
+    conditions: tuple[str, ...]
+    labels: Labels
+    # the time of every packet, sorted as the packets are
+    times: NDArray[np.float64]
+
+    def sliced(self, window: Window) -> Classification:
+        """The labels of the packets within the window"""
+        within = window.slice(self.times)
+        return Classification(self.conditions, self.labels[within], self.times[within])
+
+    def indices(self, condition: str) -> NDArray[np.int64]:
+        return np.flatnonzero(self.labels == self.conditions.index(condition) + 1)
+
+    def count(self, condition: str) -> int:
+        return int(
+            np.count_nonzero(self.labels == self.conditions.index(condition) + 1)
+        )
+
+    def store(self, file: str) -> None:
+        np.savez(
+            file,
+            conditions=np.array(self.conditions),
+            labels=self.labels,
+            times=self.times,
+        )
+
+    @classmethod
+    def load(cls, file: str) -> Classification:
+        with np.load(file, allow_pickle=False) as data:
+            return cls(
+                tuple(str(name) for name in data["conditions"]),
+                data["labels"],
+                data["times"],
+            )
+
+
+class ExportedClassification(BaseModel):
+    """The label of every packet, where label n is the nth condition and 0 is none"""
+
+    conditions: list[str]
+    times: list[float]
+    sequences: list[int]
+    labels: list[int]
+
+
+def cached(
+    directory: str,
+    name: str,
+    sources: list[str],
+    conditions: tuple[str, ...],
+    compute: Callable[[], Classification],
+) -> Classification:
+    """Loads the labels cached for the traces of a run, classifying the packets again
+    when the traces or the conditions have changed since"""
+
+    def load(file: str) -> Optional[Classification]:
+        classification = Classification.load(file)
+        return classification if classification.conditions == conditions else None
+
+    return analysis_cache.cached(
+        directory, name, sources, load, Classification.store, compute
+    )
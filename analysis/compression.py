@@ -0,0 +1,64 @@
+import gzip
+import os
+import shutil
+from typing import IO
+
+COMPRESSED_SUFFIX = ".gz"
+COMPRESSIBLE_SUFFIXES = (".pcap", ".log", ".dat")
+COMPRESSION_LEVEL = 6
+
+
+def resolve(filename: str) -> str:
+    """Returns the path the trace is actually stored at, preferring the uncompressed
+    file and falling back to its compressed counterpart"""
+    if os.path.exists(filename) or not os.path.exists(filename + COMPRESSED_SUFFIX):
+        return filename
+    return filename + COMPRESSED_SUFFIX
+
+
+def is_compressed(filename: str) -> bool:
+    return filename.endswith(COMPRESSED_SUFFIX)
+
+
+def open_text(filename: str) -> IO[str]:
+    path = resolve(filename)
+    if is_compressed(path):
+        return gzip.open(path, "rt")
+    return open(path, "r")
+
+
+def open_binary(filename: str) -> IO[bytes] | gzip.GzipFile:
+    path = resolve(filename)
+    if is_compressed(path):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def compress_file(filename: str, level: int = COMPRESSION_LEVEL) -> str:
+    target = filename + COMPRESSED_SUFFIX
+    with open(filename, "rb") as source, gzip.open(
+        target, "wb", compresslevel=level
+    ) as destination:
+        shutil.copyfileobj(source, destination)
+    shutil.copystat(filename, target)
+    os.remove(filename)
+    return target
+
+
+def compress_stream(
+    source: IO[bytes], filename: str, level: int = COMPRESSION_LEVEL
+) -> str:
+    """Compresses everything read from the source until it closes, such as the
+    output of a process, into the compressed counterpart of filename"""
+    target = filename + COMPRESSED_SUFFIX
+    with gzip.open(target, "wb", compresslevel=level) as destination:
+        shutil.copyfileobj(source, destination)
+    return target
+
+
+def compress_directory(directory: str, level: int = COMPRESSION_LEVEL) -> list[str]:
+    return [
+        compress_file(os.path.join(directory, filename), level)
+        for filename in sorted(os.listdir(directory))
+        if filename.endswith(COMPRESSIBLE_SUFFIXES)
+    ]
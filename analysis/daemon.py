@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cached_property
+from multiprocessing.connection import Client, Listener
+from typing import TYPE_CHECKING, Any, Callable, Generic, Hashable, Optional, TypeVar
+
+import rich.console
+
+from analysis import discovery, scenario, statistic
+from analysis.window import Window
+
+if TYPE_CHECKING:
+    from analysis.inspection import BytesInFlight
+    from analysis.sequence_plot import Series
+
+SOCKET_FILENAME = ".analysis.sock"
+
+# how many scenarios, parsed runs and analyzer results are kept warm
+SCENARIOS = 32
+RUNS = 1
+RESULTS = 32
+
+# the statistics a scenario computes, and so the ones a client may ask for
+STATISTICS = frozenset(
+    name
+    for name, attribute in vars(scenario.Scenario).items()
+    if isinstance(attribute, cached_property) and name not in ("path", "runs")
+)
+
+console = rich.console.Console()
+
+
+class DaemonError(Exception): ...
+
+
+Version = tuple[float, ...]
+T = TypeVar("T")
+
+
+def _version(*paths: str) -> Version:
+    # rewriting a run changes its directory, which invalidates whatever was kept warm
+    return tuple(os.path.getmtime(path) for path in paths if os.path.exists(path))
+
+
+class _VersionedCache(Generic[T]):
+    """Keeps up to size entries, evicting the least recently used, where every entry
+    belongs to a scope such as a run and is dropped once a request sees a newer
+    version of its scope"""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.entries: OrderedDict[tuple[Hashable, Hashable], tuple[Version, T]] = (
+            OrderedDict()
+        )
+
+    def get(
+        self,
+        scope: Hashable,
+        detail: Hashable,
+        version: Version,
+        compute: Callable[[], T],
+    ) -> T:
+        stale = [
+            key
+            for key, (seen, _) in self.entries.items()
+            if key[0] == scope and seen != version
+        ]
+        for key in stale:
+            del self.entries[key]
+
+        key = (scope, detail)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key][1]
+        value = compute()
+        self.entries[key] = (version, value)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return value
+
+
+class AnalysisDaemon:
+    """Keeps scenarios, along with the packets their runs parsed and the results of
+    the analyzers, in memory across requests"""
+
+    def __init__(self) -> None:
+        self.scenarios = _VersionedCache[scenario.Scenario](SCENARIOS)
+        # the latest run stays warm so that sequence and bytesInFlight share packets
+        self.runs = _VersionedCache[scenario.VariableRun](RUNS)
+        self.results = _VersionedCache[Any](RESULTS)
+        self.handlers: dict[str, Callable[..., Any]] = {
+            "ping": lambda: None,
+            "statistic": self.scenario_statistic,
+            "sequence": self.sequence,
+            "bytes_in_flight": self.bytes_in_flight,
+        }
+
+    def handle(self, command: str, arguments: dict[str, Any]) -> Any:
+        if command not in self.handlers:
+            raise DaemonError(f"Unknown command {command}")
+        return self.handlers[command](**arguments)
+
+    def scenario_statistic(
+        self,
+        directory: str,
+        option: discovery.Options,
+        seeds: list[discovery.Seed],
+        variables: tuple[discovery.Variable, ...],
+        axis: int,
+        name: str,
+        window: Window = Window(),
+    ) -> statistic.Statistic:
+        if name not in STATISTICS:
+            raise DaemonError(f"{name} is not a statistic")
+        warm = self.scenarios.get(
+            (directory, option),
+            (tuple(seeds), tuple(variables), axis, window),
+            _version(os.path.join(directory, option)),
+            lambda: scenario.Scenario(
+                directory, option, list(seeds), tuple(variables), axis, window
+            ),
+        )
+        return getattr(warm, name)
+
+    def _run(
+        self,
+        directory: str,
+        option: discovery.Options,
+        seed: discovery.Seed,
+        value: discovery.Variable,
+        window: Window,
+        version: Version,
+    ) -> scenario.VariableRun:
+        return self.runs.get(
+            (directory, option, seed, value),
+            window,
+            version,
+            lambda: scenario.VariableRun(
+                directory, option, seed, (value,), window=window
+            ),
+        )
+
+    def sequence(
+        self,
+        directory: str,
+        option: discovery.Options,
+        seed: discovery.Seed,
+        value: discovery.Variable,
+        sender: int,
+        window: Window = Window(),
+        **flags: bool,
+    ) -> list[Series]:
+        from analysis import inspection
+
+        version = _version(os.path.join(directory, option, seed, value))
+
+        def compute() -> list[Series]:
+            run = self._run(directory, option, seed, value, window, version)
+            return inspection.sequence(run, value, sender, **flags)
+
+        return self.results.get(
+            (directory, option, seed, value),
+            ("sequence", sender, window, tuple(sorted(flags.items()))),
+            version,
+            compute,
+        )
+
+    def bytes_in_flight(
+        self,
+        directory: str,
+        option: discovery.Options,
+        seed: discovery.Seed,
+        value: discovery.Variable,
+        sender: int,
+        window: Window = Window(),
+    ) -> BytesInFlight:
+        from analysis import inspection
+
+        version = _version(os.path.join(directory, option, seed, value))
+
+        def compute() -> BytesInFlight:
+            run = self._run(directory, option, seed, value, window, version)
+            return inspection.bytes_in_flight(run, value, sender)
+
+        return self.results.get(
+            (directory, option, seed, value),
+            ("bytes_in_flight", sender, window),
+            version,
+            compute,
+        )
+
+
+def serve(address: str = SOCKET_FILENAME) -> None:
+    if os.path.exists(address):
+        if connect(address) is not None:
+            raise DaemonError(f"A daemon is already serving on {address}")
+        os.remove(address)  # left behind by a daemon that did not shut down cleanly
+
+    daemon = AnalysisDaemon()
+    with Listener(address, family="AF_UNIX") as listener:
+        # requests are pickled, so only the owner may connect
+        os.chmod(address, 0o600)
+        while True:
+            with listener.accept() as connection:
+                try:
+                    command, arguments = connection.recv()
+                except EOFError:
+                    continue
+                if command == "shutdown":
+                    connection.send((True, None))
+                    return
+                try:
+                    result = daemon.handle(command, arguments)
+                except Exception as e:
+                    console.print(
+                        f":x: [bold red]Failed[/bold red] to handle {command}: [bold red]{e}[/bold red]",
+                        emoji=True,
+                    )
+                    response: tuple[bool, Any] = (False, f"{type(e).__name__}: {e}")
+                else:
+                    response = (True, result)
+                try:
+                    connection.send(response)
+                except OSError:
+                    pass  # the client went away while the request was being handled
+
+
+@dataclass(frozen=True)
+class DaemonClient:
+    address: str
+
+    def request(self, command: str, **arguments: Any) -> Any:
+        with Client(self.address, family="AF_UNIX") as connection:
+            connection.send((command, arguments))
+            succeeded, result = connection.recv()
+        if not succeeded:
+            raise DaemonError(result)
+        return result
+
+
+def connect(address: str = SOCKET_FILENAME) -> Optional[DaemonClient]:
+    """Returns a client if a daemon is serving on the address"""
+    if not os.path.exists(address):
+        return None
+    client = DaemonClient(address)
+    try:
+        client.request("ping")
+    except (OSError, EOFError):
+        return None
+    return client
+
+
+@dataclass(frozen=True)
+class RemoteScenario:
+    """Stands in for a scenario, asking the daemon for its statistics"""
+
+    directory: str
+    option: discovery.Options
+    seeds: list[discovery.Seed]
+    variables: tuple[discovery.Variable, ...]
+    axis: int
+    client: DaemonClient
+    window: Window = Window()
+
+    def __getattr__(self, name: str) -> statistic.Statistic:
+        if name not in STATISTICS:
+            raise AttributeError(name)
+        return self.client.request(
+            "statistic",
+            directory=self.directory,
+            option=self.option,
+            seeds=self.seeds,
+            variables=self.variables,
+            axis=self.axis,
+            name=name,
+            window=self.window,
+        )
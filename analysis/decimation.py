@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from typing import Literal, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+Decimation = Literal["minmax", "lttb", "none"]
+decimations: list[Decimation] = ["minmax", "lttb", "none"]
+
+# roughly the width of a screen in pixels, with each pixel keeping up to 4 points
+DEFAULT_BUCKETS = 2_000
+
+Indices = NDArray[np.int64]
+
+
+def envelope(bucket: NDArray[np.int64], y: NDArray) -> Indices:
+    """Keeps the first, last, lowest and highest point of every run of equal
+    (non-decreasing) bucket ids"""
+    n = len(bucket)
+    if not n:
+        return np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    # within each bucket the points are ordered by y, so its ends are the extremes
+    order = np.lexsort((y, bucket))
+    return np.unique(np.concatenate([starts, ends, order[starts], order[ends]]))
+
+
+def min_max(x: NDArray[np.float64], y: NDArray, buckets: int) -> Indices:
+    """Keeps the first, last, lowest and highest point of every pixel wide bucket of
+    the x-axis (M4), which draws the same envelope as the full series"""
+    n = len(x)
+    if n <= 4 * buckets:
+        return np.arange(n)
+    edges = np.linspace(x[0], x[-1], buckets + 1)
+    bucket = np.clip(np.searchsorted(edges, x, side="right") - 1, 0, buckets - 1)
+    return envelope(bucket, y)
+
+
+def lttb(x: NDArray[np.float64], y: NDArray, threshold: int) -> Indices:
+    """Largest-Triangle-Three-Buckets, keeping the point of every bucket that forms
+    the largest triangle with the previously kept point and the next bucket's mean"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    y = y.astype(np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        following_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        mean_x = x[end:following_end].mean()
+        mean_y = y[end:following_end].mean()
+        areas = np.abs(
+            (x[previous] - mean_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (mean_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def decimate(
+    x: NDArray[np.float64],
+    y: NDArray,
+    method: Decimation = "minmax",
+    buckets: int = DEFAULT_BUCKETS,
+    keep: Optional[Indices] = None,
+) -> Indices:
+    """Indices of the points to draw, always including those in keep"""
+    if method == "none":
+        return np.arange(len(x))
+    indices = min_max(x, y, buckets) if method == "minmax" else lttb(x, y, 4 * buckets)
+    if keep is not None and len(keep):
+        indices = np.union1d(indices, keep)
+    return indices
+
+
+def matching(x: NDArray[np.float64], markers: NDArray[np.float64]) -> Indices:
+    """Indices of the points of the sorted x that are at one of the markers"""
+    if not len(x):
+        return np.empty(0, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(x, markers), len(x) - 1)
+    return np.unique(positions[x[positions] == markers])
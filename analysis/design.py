@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import random
+from itertools import product
+from typing import Any, Literal, Optional, Sequence
+
+from pydantic import BaseModel, Field, model_validator
+
+DESIGN_FILENAME = "design.json"
+
+DesignMethod = Literal["full", "random", "latin_hypercube", "halton"]
+
+PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+Point = tuple[Any, ...]
+
+
+def _decode(index: int, sizes: Sequence[int]) -> tuple[int, ...]:
+    # mixed radix decoding of a flat index into the full grid, last variable fastest
+    indices = []
+    for size in reversed(sizes):
+        index, remainder = divmod(index, size)
+        indices.append(remainder)
+    return tuple(reversed(indices))
+
+
+def _radical_inverse(index: int, base: int) -> float:
+    inverse, denominator = 0.0, 1.0
+    while index:
+        index, remainder = divmod(index, base)
+        denominator *= base
+        inverse += remainder / denominator
+    return inverse
+
+
+def _unique(indices: list[tuple[int, ...]]) -> list[tuple[int, ...]]:
+    return list(dict.fromkeys(indices))
+
+
+class Design(BaseModel):
+    """How the swept variables are sampled, full runs the whole cartesian product
+    whereas the other methods pick a space-filling subset of `samples` points"""
+
+    method: DesignMethod = Field(default="full")
+    samples: Optional[int] = Field(default=None, gt=0)
+    seed: int = Field(default=0)
+
+    @model_validator(mode="after")
+    def _check_samples(self) -> Design:
+        if self.method != "full" and self.samples is None:
+            raise ValueError(f"{self.method} design requires the number of samples")
+        return self
+
+    def points(self, values: Sequence[Sequence[Any]]) -> list[Point]:
+        sizes = [len(variable_values) for variable_values in values]
+        total = math.prod(sizes)
+        if self.method == "full" or self.samples is None or self.samples >= total:
+            return list(product(*values))
+
+        indices = {
+            "random": self._random,
+            "latin_hypercube": self._latin_hypercube,
+            "halton": self._halton,
+        }[self.method](sizes, self.samples)
+        return [
+            tuple(variable_values[idx] for variable_values, idx in zip(values, point))
+            for point in self._top_up(_unique(indices), sizes, self.samples)
+        ]
+
+    def _top_up(
+        self, indices: list[tuple[int, ...]], sizes: Sequence[int], samples: int
+    ) -> list[tuple[int, ...]]:
+        """Strata that fall into the same value of a coarse variable sample the same
+        point, so the design is topped up with random points not yet sampled to keep
+        its size"""
+        generator = random.Random(self.seed)
+        taken = set(indices)
+        while len(indices) < samples:
+            point = _decode(generator.randrange(math.prod(sizes)), sizes)
+            if point not in taken:
+                taken.add(point)
+                indices.append(point)
+        return indices
+
+    def _random(self, sizes: Sequence[int], samples: int) -> list[tuple[int, ...]]:
+        generator = random.Random(self.seed)
+        return [
+            _decode(index, sizes)
+            for index in sorted(generator.sample(range(math.prod(sizes)), samples))
+        ]
+
+    def _latin_hypercube(
+        self, sizes: Sequence[int], samples: int
+    ) -> list[tuple[int, ...]]:
+        generator = random.Random(self.seed)
+        strata = []
+        for size in sizes:
+            permutation = list(range(samples))
+            generator.shuffle(permutation)
+            strata.append(
+                [
+                    int((stratum + generator.random()) / samples * size)
+                    for stratum in permutation
+                ]
+            )
+        return list(zip(*strata))
+
+    def _halton(self, sizes: Sequence[int], samples: int) -> list[tuple[int, ...]]:
+        if len(sizes) > len(PRIMES):
+            raise ValueError(f"halton design supports up to {len(PRIMES)} variables")
+        # skip the origin, which every base maps to, and offset by the seed
+        start = self.seed + 1
+        return [
+            tuple(
+                int(_radical_inverse(index, base) * size)
+                for base, size in zip(PRIMES, sizes)
+            )
+            for index in range(start, start + samples)
+        ]
+
+
+class SampledDesign(BaseModel):
+    method: DesignMethod
+    names: list[str]
+    points: list[list[Any]]
+
+    def axis(self, name: Optional[str]) -> int:
+        if name is None:
+            return 0
+        if name not in self.names:
+            raise ValueError(f"{name} is not one of the swept variables {self.names}")
+        return self.names.index(name)
+
+    def store(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, DESIGN_FILENAME), "w") as file:
+            file.write(self.model_dump_json(indent=2))
+
+    @staticmethod
+    def load(directory: str) -> Optional[SampledDesign]:
+        filename = os.path.join(directory, DESIGN_FILENAME)
+        if not os.path.exists(filename):
+            return None
+        with open(filename, "r") as file:
+            return SampledDesign.model_validate(json.load(file))
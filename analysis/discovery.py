@@ -1,10 +1,14 @@
 import os
 from typing import Literal, NewType, cast
 
+from analysis.manifest import cached_manifest
+
 Devices = NewType("Devices", str)
 Seed = NewType("Seed", str)
 Variable = NewType("Variable", str)
 Options = Literal["baseline", "baseline-udp", "frr", "frr-udp"]
+Queues = Literal["CongestedQueue", "AlternateQueue"]
+queues: list[Queues] = ["CongestedQueue", "AlternateQueue"]
 
 
 # expected directory structure
@@ -12,29 +16,47 @@ Options = Literal["baseline", "baseline-udp", "frr", "frr-udp"]
 # options being "baseline", "baseline-udp", "frr", "frr-udp" etc.
 # seed-run being "1234-1", "1234-2", "1234-3", "345-1", "345-2", "345-3"
 # variable being the values such as 1.25Mbps, 2.5Mbps, 5Mbps, 10Mbps, 20Mbps, 40Mbps
+# when the directory has a manifest the tree is answered from it instead of listing it
 
 
 def discover_senders(
     directory: str, option: str, seed: str, variable: str
 ) -> list[Devices]:
+    if manifest := cached_manifest(directory):
+        files = list(manifest.files(option, seed, variable))
+    else:
+        files = os.listdir(f"{directory}/{option}/{seed}/{variable}")
     return sorted(
         filter(
             lambda device: "TrafficSender" in device,
-            map(Devices, os.listdir(f"{directory}/{option}/{seed}/{variable}")),
+            map(Devices, files),
         )
     )
 
 
 def discover_variables(directory: str, option: str, seed: str) -> list[Variable]:
+    if manifest := cached_manifest(directory):
+        return list(map(Variable, manifest.variables(option, seed)))
     return list(map(Variable, sorted(os.listdir(f"{directory}/{option}/{seed}"))))
 
 
 def discover_seeds(directory: str, option: str) -> list[Seed]:
+    if manifest := cached_manifest(directory):
+        return list(map(Seed, manifest.seeds(option)))
     return list(map(Seed, os.listdir(f"{directory}/{option}")))
 
 
 def discover_options(directory: str) -> list[Options]:
-    return cast(list[Options], list(os.listdir(directory)))
+    if manifest := cached_manifest(directory):
+        return cast(list[Options], manifest.options())
+    return cast(
+        list[Options],
+        [
+            option
+            for option in os.listdir(directory)
+            if os.path.isdir(os.path.join(directory, option))
+        ],
+    )
 
 
 def discover_tcp_hosts(directory: str, option: str, seed: str) -> list[str]:
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from typing import Mapping, NamedTuple, Optional, Sequence, cast
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+from pydantic import BaseModel
+
+
+class ECDF(NamedTuple):
+    """The empirical distribution as a step function, where probabilities[i] is the
+    fraction of the samples at or below values[i]"""
+
+    values: NDArray[np.float64]
+    probabilities: NDArray[np.float64]
+
+    def downsample(self, points: int) -> ECDF:
+        """Keeps the steps at points evenly spaced quantiles, which bounds the size of
+        the curve while every kept step stays exact"""
+        if len(self.values) <= points:
+            return self
+        quantiles = np.linspace(1 / points, 1, points)
+        steps = np.unique(
+            np.minimum(
+                np.searchsorted(self.probabilities, quantiles - 1e-12),
+                len(self.values) - 1,
+            )
+        )
+        return ECDF(self.values[steps], self.probabilities[steps])
+
+
+class ExportedECDF(BaseModel):
+    values: list[float]
+    probabilities: list[float]
+
+    @staticmethod
+    def from_ecdf(curve: ECDF) -> ExportedECDF:
+        return ExportedECDF(
+            values=curve.values.tolist(), probabilities=curve.probabilities.tolist()
+        )
+
+
+def flatten(sample: ArrayLike) -> NDArray[np.float64]:
+    """The samples as a flat array, where those of multiple flows are nested and may
+    differ in length"""
+    if isinstance(sample, np.ndarray):
+        return sample.astype(np.float64).ravel()
+    parts = cast(Sequence[ArrayLike], sample)
+    if not len(parts):
+        return np.empty(0)
+    return np.hstack([np.asarray(part, dtype=np.float64).ravel() for part in parts])
+
+
+def ecdfs(
+    samples: Mapping[str, ArrayLike], points: Optional[int] = None
+) -> dict[str, ECDF]:
+    """The ECDF of every set of samples, sorted together in a single pass"""
+    arrays = [flatten(sample) for sample in samples.values()]
+    sizes = np.array([len(array) for array in arrays], dtype=np.int64)
+    values = np.concatenate(arrays) if arrays else np.empty(0)
+    groups = np.repeat(np.arange(len(arrays)), sizes)
+
+    kept = ~np.isnan(values)
+    values, groups = values[kept], groups[kept]
+    order = np.lexsort((values, groups))
+    values, groups = values[order], groups[order]
+
+    counts = np.bincount(groups, minlength=len(arrays))
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    # the rank within its own samples of the last of every run of equal values
+    last = np.r_[(values[1:] != values[:-1]) | (groups[1:] != groups[:-1]), True]
+    ranks = np.arange(1, len(values) + 1) - starts[groups]
+    probabilities = ranks / np.maximum(counts[groups], 1)
+
+    curves = {}
+    for label, start, count in zip(samples, starts, counts):
+        steps = last[start : start + count]
+        curve = ECDF(
+            values[start : start + count][steps],
+            probabilities[start : start + count][steps],
+        )
+        curves[label] = curve if points is None else curve.downsample(points)
+    return curves
+
+
+def ecdf(samples: Sequence[float] | ArrayLike, points: Optional[int] = None) -> ECDF:
+    return ecdfs({"": samples}, points)[""]
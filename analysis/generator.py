@@ -1,16 +1,25 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
 import os
-from typing import Any, Generator, Iterable, Optional
-from itertools import chain, product
 import shutil
-from functools import reduce
-import operator
+import subprocess
+import time
+from dataclasses import dataclass, replace
+from functools import cached_property
+from itertools import chain
+from typing import TYPE_CHECKING, Any, Generator, Iterable, Optional
 
-from mpire.pool import WorkerPool
 from pydantic import BaseModel, ConfigDict, Field
 
+from analysis import compression, manifest, simulation_cache, telemetry
+from analysis.design import Design, SampledDesign
+
+if TYPE_CHECKING:
+    from mpire.pool import WorkerPool
+
+# the options of a command are substituted for the braces
+SIMULATOR = './ns3 run "scratch/simulation.cc {}"'
+
 
 class Settings(BaseModel):
     model_config = ConfigDict(extra="forbid")
@@ -99,15 +108,38 @@ class Command:
     condition_label: str
     variable_label: str
     settings: Settings
+    compress: bool = False
+    fingerprint: Optional[str] = None
+    # a stand-in for ns-3 taking the same options, None runs ns-3 itself
+    simulator: Optional[str] = None
+
+    @property
+    def experiment_directory(self) -> str:
+        return os.path.join(self.main_directory, self.variable_label)
+
+    @property
+    def location(self) -> manifest.RunLocation:
+        return manifest.RunLocation(
+            option=self.condition_label,
+            seed=f"{self.seed}{self.run}",
+            variable="_".join((str(value) for value in self.variables.values())),
+        )
 
     @property
     def directory(self) -> str:
-        return os.path.join(
-            self.main_directory,
-            self.variable_label,
-            self.condition_label,
-            f"{self.seed}{self.run}",
-            "_".join((str(value) for value in self.variables.values())),
+        return os.path.join(self.experiment_directory, *self.location)
+
+    @cached_property
+    def effective_settings(self) -> Settings:
+        return Settings(**{**self.settings.model_dump(), **self.variables})
+
+    @property
+    def key(self) -> str:
+        # identifies the simulated point regardless of where it is stored and its seed
+        return " ".join(
+            option
+            for option in self.options()
+            if not option.startswith(("--dir=", "--seed=", "--run="))
         )
 
     def generate_dir(self) -> None:
@@ -140,13 +172,67 @@ class Command:
         return command_options
 
     def generate(self) -> str:
-        return 'NS_LOG="" ./ns3 run "scratch/simulation.cc {}" 2> {}/debug.log > /dev/null'.format(
-            " ".join(self.options()), self.directory
+        simulation = (self.simulator or SIMULATOR).format(" ".join(self.options()))
+        if self.compress:
+            # execute streams stderr through the compressor so the log never hits the
+            # disk raw, without a pipeline masking the exit status of ns-3
+            return 'NS_LOG="" {} > /dev/null'.format(simulation)
+        return 'NS_LOG="" {} 2> {}/debug.log > /dev/null'.format(
+            simulation, self.directory
         )
 
-    def execute(self) -> None:
+    def execute(self) -> telemetry.Telemetry:
         self.generate_dir()
-        os.system(self.generate())
+        if self.fingerprint is not None and (
+            cached_directory := simulation_cache.lookup(self)
+        ):
+            return self._reuse(cached_directory)
+
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            self.generate(),
+            shell=True,
+            stderr=subprocess.PIPE if self.compress else None,
+        )
+        if process.stderr is not None:
+            with process.stderr:
+                compression.compress_stream(
+                    process.stderr, os.path.join(self.directory, "debug.log")
+                )
+        # wait4 reports the peak RSS of this command alone, unlike getrusage which
+        # accumulates over every child the worker has reaped
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        wall_time = time.perf_counter() - start
+
+        if self.compress:
+            compression.compress_directory(self.directory)
+        if self.fingerprint is not None and process.returncode == 0:
+            simulation_cache.store(self)
+
+        return telemetry.Telemetry(
+            directory=self.directory,
+            key=self.key,
+            work=telemetry.packet_events(self),
+            wall_time=wall_time,
+            peak_rss=usage.ru_maxrss * 1024,
+            output_bytes=telemetry.directory_size(self.directory),
+            exit_status=process.returncode,
+        )
+
+    def _reuse(self, cached_directory: str) -> telemetry.Telemetry:
+        start = time.perf_counter()
+        simulation_cache.reuse(cached_directory, self.directory)
+        return telemetry.Telemetry(
+            directory=self.directory,
+            key=self.key,
+            work=telemetry.packet_events(self),
+            wall_time=time.perf_counter() - start,
+            peak_rss=0,
+            output_bytes=telemetry.directory_size(self.directory),
+            exit_status=0,
+            cached_from=cached_directory,
+        )
 
 
 class Conditions(BaseModel):
@@ -169,6 +255,31 @@ class Configuration(BaseModel):
     conditions: dict[str, Conditions]
     seed: int
     number_of_runs: int
+    compress: bool = Field(default=False)
+    cache: bool = Field(default=True)
+    simulator: Optional[str] = Field(default=None)
+    design: Design = Field(default_factory=Design)
+
+    @property
+    def variable_label(self) -> str:
+        if not self.variables:
+            return "base"
+        return "_".join(variable.name for variable in self.variables)
+
+    @property
+    def experiment_directory(self) -> str:
+        return os.path.join(self.directory, self.variable_label)
+
+    @cached_property
+    def points(self) -> list[tuple[Any, ...]]:
+        return self.design.points([variable.values for variable in self.variables])
+
+    def sampled_design(self) -> SampledDesign:
+        return SampledDesign(
+            method=self.design.method,
+            names=[variable.name for variable in self.variables],
+            points=[list(point) for point in self.points],
+        )
 
     def _no_variable_runs(self) -> Generator[Command, None, None]:
         for option, conditions in self.conditions.items():
@@ -180,19 +291,17 @@ class Configuration(BaseModel):
                     seed=self.seed,
                     run=run,
                     condition_label=option,
-                    variable_label="base",
+                    variable_label=self.variable_label,
                     settings=self.overwrite_settings.apply(),
+                    compress=self.compress,
+                    simulator=self.simulator,
                 )
 
     def commands(self) -> Generator[Command, None, None]:
         if not self.variables:
             yield from self._no_variable_runs()
             return
-        product_combinations = product(
-            *(variable.values for variable in self.variables)
-        )
-
-        for combination in product_combinations:
+        for combination in self.points:
             for option, conditions in self.conditions.items():
                 for run in range(self.number_of_runs):
                     yield Command(
@@ -207,27 +316,83 @@ class Configuration(BaseModel):
                         seed=self.seed,
                         run=run,
                         condition_label=option,
-                        variable_label="_".join(
-                            variable.name for variable in self.variables
-                        ),
+                        variable_label=self.variable_label,
                         settings=self.overwrite_settings.apply(),
+                        compress=self.compress,
+                        simulator=self.simulator,
                     )
 
     def __len__(self) -> int:
-        return (
-            reduce(operator.mul, (len(variable.values) for variable in self.variables))
-            * self.number_of_runs
-            * len(self.conditions)
-        )
+        return len(self.points) * self.number_of_runs * len(self.conditions)
+
+
+def schedule(
+    configuration: Configuration,
+) -> list[tuple[Command, telemetry.Estimate]]:
+    cost_model = telemetry.CostModel(telemetry.load_history(configuration.directory))
+    return sorted(
+        (
+            (command, cost_model.estimate(command))
+            for command in configuration.commands()
+        ),
+        key=lambda scheduled: scheduled[1].wall_time,
+        reverse=True,
+    )
 
 
 def run_experiments(
     configuration: Configuration,
 ) -> None:
+    # only the orchestrator needs the pool, not a stand-in reading the settings
+    from mpire.pool import WorkerPool
+
+    if configuration.variables:
+        configuration.sampled_design().store(configuration.experiment_directory)
+    if os.path.isdir(configuration.experiment_directory) and not os.path.exists(
+        manifest.manifest_filename(configuration.experiment_directory)
+    ):
+        # index the runs already there so the journal does not hide them
+        manifest.Manifest.scan(configuration.experiment_directory).store()
+    fingerprint = simulation_cache.fingerprint() if configuration.cache else None
+    # longest expected runs first so they do not stretch the makespan at the end
+    commands = [
+        replace(command, fingerprint=fingerprint)
+        for command, _ in schedule(configuration)
+    ]
+    # identical runs are simulated once, and the others reuse its directory after it
+    groups = simulation_cache.group(commands)
+    groups_by_directory = {group[0].directory: group for group in groups}
+
+    def record(result: telemetry.Telemetry, command: Command) -> None:
+        telemetry.record(configuration.directory, result)
+        manifest.record_run(command.experiment_directory, command.location)
+
     with WorkerPool() as pool:
-        pool.map(
-            Command.execute,
-            configuration.commands(),
-            iterable_len=len(configuration),
-            progress_bar=True,
-        )
+        # the duplicates of a failed run are simulated themselves
+        unfinished = []
+        for result in _execute(pool, [group[0] for group in groups]):
+            first, *duplicates = groups_by_directory[result.directory]
+            record(result, first)
+            if result.exit_status != 0:
+                unfinished.extend(duplicates)
+                continue
+            for duplicate in duplicates:
+                record(duplicate.execute(), duplicate)
+
+        commands_by_directory = {command.directory: command for command in unfinished}
+        for result in _execute(pool, unfinished):
+            record(result, commands_by_directory[result.directory])
+
+
+def _execute(
+    pool: WorkerPool, commands: list[Command]
+) -> Iterable[telemetry.Telemetry]:
+    if not commands:
+        return []
+    return pool.imap_unordered(
+        Command.execute,
+        commands,
+        iterable_len=len(commands),
+        chunk_size=1,
+        progress_bar=True,
+    )
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, NamedTuple, Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+from pydantic import BaseModel
+
+from analysis.statistic import jains_fairness_index
+
+if TYPE_CHECKING:
+    import scapy.packet
+
+# seconds of every bucket of a timeline, unless the caller picks another width
+BUCKET_WIDTH = 0.1
+
+MEGABIT = 1e6
+
+
+class Transfer(NamedTuple):
+    """The bytes a flow moved at every time"""
+
+    times: NDArray[np.float64]
+    amounts: NDArray[np.float64]
+
+
+def _times(packets: Sequence[scapy.packet.Packet]) -> NDArray[np.float64]:
+    return np.fromiter(
+        (float(packet.time) for packet in packets), np.float64, count=len(packets)
+    )
+
+
+def delivered(acknowledgements: Sequence[scapy.packet.Packet]) -> Transfer:
+    """The bytes the receiver handed to the application, which is how far every
+    acknowledgement advanced the highest cumulative acknowledgement before it, so
+    that duplicates, retransmissions and reordered segments count once"""
+    frontier = np.maximum.accumulate(
+        np.fromiter(
+            (packet.ack for packet in acknowledgements),
+            np.int64,
+            count=len(acknowledgements),
+        )
+    )
+    return Transfer(
+        _times(acknowledgements),
+        np.diff(frontier, prepend=frontier[:1]).astype(np.float64),
+    )
+
+
+def received(segments: Sequence[scapy.packet.Packet]) -> Transfer:
+    """The payload of every segment that reached the receiver, retransmissions
+    included"""
+    return Transfer(
+        _times(segments),
+        np.fromiter(
+            (len(packet["TCP"].payload) for packet in segments),
+            np.float64,
+            count=len(segments),
+        ),
+    )
+
+
+@dataclass(frozen=True, eq=False)
+class Timeline:
+    """The bits per second of every flow in consecutive buckets of width seconds from
+    time zero, as a flows x buckets array"""
+
+    width: float
+    rates: NDArray[np.float64]
+
+    @classmethod
+    def from_transfers(
+        cls, transfers: Sequence[Transfer], width: float = BUCKET_WIDTH
+    ) -> Timeline:
+        end = max(
+            (transfer.times.max(initial=0.0) for transfer in transfers), default=0
+        )
+        buckets = int(end // width) + 1
+        return cls(
+            width,
+            np.array(
+                [
+                    np.bincount(
+                        (transfer.times // width).astype(np.int64),
+                        weights=transfer.amounts,
+                        minlength=buckets,
+                    )
+                    for transfer in transfers
+                ],
+                dtype=np.float64,
+            ).reshape(len(transfers), buckets)
+            * 8
+            / width,
+        )
+
+    @property
+    def times(self) -> NDArray[np.float64]:
+        return np.arange(self.rates.shape[1], dtype=np.float64) * self.width
+
+    @property
+    def active(self) -> NDArray[np.bool_]:
+        """Whether every bucket lies between the first and the last bucket the flow
+        moved any bytes in, so that a stalled flow counts but a finished one does not"""
+        moved = self.rates > 0
+        buckets = np.arange(self.rates.shape[1])
+        first = np.where(moved.any(axis=1), moved.argmax(axis=1), buckets.size)
+        last = buckets.size - 1 - moved[:, ::-1].argmax(axis=1)
+        return (buckets >= first[:, None]) & (buckets <= last[:, None])
+
+    @property
+    def peak(self) -> NDArray[np.float64]:
+        return self.rates.max(axis=1, initial=0.0)
+
+    @property
+    def median(self) -> NDArray[np.float64]:
+        """The median rate of every flow over the buckets it was active in"""
+        active = np.where(self.active, self.rates, np.nan)
+        with np.errstate(all="ignore"):
+            return np.nan_to_num(np.nanmedian(active, axis=1))
+
+    @property
+    def fairness(self) -> NDArray[np.float64]:
+        """Jain's fairness index of every bucket across the flows active in it, and
+        NaN where no flow was"""
+        active = self.active
+        rates = np.where(active, self.rates, 0.0)
+        counts = active.sum(axis=0)
+        return np.where(
+            counts > 0,
+            jains_fairness_index(
+                rates.sum(axis=0), (rates**2).sum(axis=0), np.maximum(counts, 1)
+            ),
+            np.nan,
+        )
+
+    def mean_fairness(self) -> float:
+        fairness = self.fairness
+        if np.isnan(fairness).all():
+            return 1.0
+        return float(np.nanmean(fairness))
+
+
+class Band(NamedTuple):
+    """The mean and a percentile band of a flow's rate in every bucket across seeds"""
+
+    times: NDArray[np.float64]
+    mean: NDArray[np.float64]
+    lower: NDArray[np.float64]
+    upper: NDArray[np.float64]
+
+
+def bands(
+    timelines: Sequence[Timeline], percentiles: tuple[float, float] = (5.0, 95.0)
+) -> list[Band]:
+    """Aggregates the timelines of every seed into a band for every flow, where a
+    seed whose flows finished sooner moves nothing in the buckets after"""
+    width = timelines[0].width
+    if any(timeline.width != width for timeline in timelines):
+        raise ValueError("Timelines must share the width of their buckets")
+    flows = max(timeline.rates.shape[0] for timeline in timelines)
+    buckets = max(timeline.rates.shape[1] for timeline in timelines)
+    rates = np.zeros((len(timelines), flows, buckets))
+    for index, timeline in enumerate(timelines):
+        rates[index, : timeline.rates.shape[0], : timeline.rates.shape[1]] = (
+            timeline.rates
+        )
+
+    mean = rates.mean(axis=0)
+    lower, upper = np.percentile(rates, percentiles, axis=0)
+    times = np.arange(buckets, dtype=np.float64) * width
+    return [Band(times, mean[flow], lower[flow], upper[flow]) for flow in range(flows)]
+
+
+class ExportedBand(BaseModel):
+    """A flow's rate in bits per second at the start of every bucket"""
+
+    flow: int
+    times: list[float]
+    mean: list[float]
+    lower: list[float]
+    upper: list[float]
+
+    @staticmethod
+    def from_band(flow: int, band: Band) -> ExportedBand:
+        return ExportedBand(
+            flow=flow,
+            times=band.times.tolist(),
+            mean=band.mean.tolist(),
+            lower=band.lower.tolist(),
+            upper=band.upper.tolist(),
+        )
@@ -2,24 +2,33 @@ from __future__ import annotations
 
 from typing import (
     TYPE_CHECKING,
+    Literal,
+    Mapping,
     NamedTuple,
     NotRequired,
     Optional,
     Sequence,
-    TypeVar,
     TypedDict,
+    TypeVar,
+    Union,
 )
 
-from matplotlib.axes import Axes
-import matplotlib.pyplot as plt
 import numpy as np
-from numpy.typing import NDArray
+from numpy.typing import ArrayLike, NDArray
 from pydantic import BaseModel
-import matplotlib.colors as mcolors
 
 if TYPE_CHECKING:
+    from matplotlib.axes import Axes
+
     from analysis import statistic
+
+from analysis import profiling
 from analysis.discovery import Options, Seed
+from analysis.ecdf import ECDF, ecdfs
+from analysis.histogram import Histogram, histograms
+
+# the statistics whose average and spread across seeds can be plotted
+Summary = Union["statistic.Statistic", "statistic.MultiFlowStatistic"]
 
 
 class Style(TypedDict):
@@ -66,10 +75,47 @@ class MultiFlowPlot(BaseModel):
         )
 
 
+class PlotColumns(NamedTuple):
+    """Columnar counterpart of a list of plots, sorted by variable"""
+
+    variables: NDArray[np.float64]
+    values: NDArray[np.float64]
+
+    @staticmethod
+    def from_pairs(variables: Sequence[float], values: Sequence[float]) -> PlotColumns:
+        order = np.argsort(variables, kind="stable")
+        return PlotColumns(
+            np.asarray(variables, dtype=np.float64)[order],
+            np.asarray(values, dtype=np.float64)[order],
+        )
+
+    def to_plots(self) -> list[Plot]:
+        return [
+            Plot(variable=variable, value=value)
+            for variable, value in zip(self.variables.tolist(), self.values.tolist())
+        ]
+
+
 def _sort_plots(plots: list[Plot]) -> list[Plot]:
     return sorted(plots, key=lambda x: x.variable)
 
 
+Interval = Literal["range", "percentile", "confidence"]
+intervals: list[Interval] = ["range", "percentile", "confidence"]
+
+
+def _interval_bounds(
+    statistic: Summary, interval: Interval
+) -> tuple[list[Plot], list[Plot]]:
+    if interval == "percentile":
+        lower, upper = statistic.percentiles(5, 95)
+        return lower, upper
+    if interval == "confidence":
+        return statistic.confidence_interval
+    return statistic.minimum, statistic.maximum
+
+
+@profiling.profiled("plot")
 def correlation_scatter(
     stats: tuple[
         dict[Options, statistic.Statistic], dict[Options, statistic.Statistic]
@@ -80,6 +126,8 @@ def correlation_scatter(
     correlation_lines: bool = False,
 ) -> None:
     # show first average statistic on x-axis and second average statistic on y-axis
+    import matplotlib.colors as mcolors
+    import matplotlib.pyplot as plt
 
     figure, axes = plt.subplots(figsize=(10, 6))
     options = list(stats[0].keys())
@@ -138,11 +186,12 @@ def correlation_scatter(
     else:
         figure.show()
 
-    figure.clf()
+    plt.close(figure)
 
 
+@profiling.profiled("plot")
 def single_point_plot(
-    stats: dict[Options, statistic.Statistic],
+    stats: Mapping[Options, Summary],
     axes: Axes,
     option: Options,
     styles: Optional[dict[str, Style]] = None,
@@ -169,16 +218,21 @@ def single_point_plot(
         )
 
 
+@profiling.profiled("plot")
 def min_max_plot(
-    stats: dict[Options, statistic.Statistic],
+    stats: Mapping[Options, Summary],
     labels: Labels,
     target: Optional[str] = None,
     styles: Optional[dict[str, Style]] = None,
+    interval: Interval = "range",
 ) -> None:
+    import matplotlib.pyplot as plt
+
     figure, axes = plt.subplots(figsize=(10, 6))
 
     for option, statistic in stats.items():
         plots = _sort_plots(statistic.average)
+        lower, upper = _interval_bounds(statistic, interval)
         axes.plot(
             [plot.variable for plot in plots],
             [plot.value for plot in plots],
@@ -195,14 +249,8 @@ def min_max_plot(
                 )
                 / (len(plots) * 4),
                 yerr=[
-                    [
-                        abs(a.value - s.value)
-                        for a, s in zip(plots, _sort_plots(statistic.minimum))
-                    ],
-                    [
-                        abs(a.value - s.value)
-                        for a, s in zip(plots, _sort_plots(statistic.maximum))
-                    ],
+                    [abs(a.value - s.value) for a, s in zip(plots, _sort_plots(lower))],
+                    [abs(a.value - s.value) for a, s in zip(plots, _sort_plots(upper))],
                 ],
                 label=option,
                 fmt="o",
@@ -218,14 +266,8 @@ def min_max_plot(
                 )
                 / (len(plots) * 4),
                 yerr=[
-                    [
-                        abs(a.value - s.value)
-                        for a, s in zip(plots, _sort_plots(statistic.minimum))
-                    ],
-                    [
-                        abs(a.value - s.value)
-                        for a, s in zip(plots, _sort_plots(statistic.maximum))
-                    ],
+                    [abs(a.value - s.value) for a, s in zip(plots, _sort_plots(lower))],
+                    [abs(a.value - s.value) for a, s in zip(plots, _sort_plots(upper))],
                 ],
                 label=option,
                 fmt="o",
@@ -242,15 +284,18 @@ def min_max_plot(
     else:
         figure.show()
 
-    figure.clf()
+    plt.close(figure)
 
 
+@profiling.profiled("plot")
 def plot(
-    stats: dict[Options, statistic.Statistic],
+    stats: Mapping[Options, Summary],
     labels: Labels,
     target: Optional[str] = None,
     styles: Optional[dict[str, Style]] = None,
 ) -> None:
+    import matplotlib.pyplot as plt
+
     figure, axes = plt.subplots(figsize=(10, 6))
 
     for option, statistic in stats.items():
@@ -299,7 +344,7 @@ def plot(
     else:
         figure.show()
 
-    figure.clf()
+    plt.close(figure)
 
 
 class SeededPlots(NamedTuple):
@@ -307,24 +352,13 @@ class SeededPlots(NamedTuple):
     alternative: list[Plot]
 
 
-def cdf_multi_flow(
-    plots: dict[str, Sequence[np.number] | NDArray[np.number]],
-    labels: Labels,
-    target: Optional[str] = None,
-    styles: Optional[dict[str, Style]] = None,
-) -> None:
+def _plot_ecdfs(curves: dict[str, ECDF], labels: Labels, target: Optional[str]) -> None:
+    import matplotlib.pyplot as plt
+
     figure, axes = plt.subplots(figsize=(10, 6))
 
-    for label, plot in plots.items():
-        print(plot)
-        axes.hist(
-            plot,
-            bins=100,
-            density=True,
-            histtype="step",
-            cumulative=True,
-            label=label,
-        )
+    for label, curve in curves.items():
+        axes.step(curve.values, curve.probabilities, where="post", label=label)
 
     axes.set_ylabel(labels["y_axis"])
     axes.set_xlabel(labels["x_axis"])
@@ -338,48 +372,44 @@ def cdf_multi_flow(
     else:
         figure.show()
 
-    figure.clf()
+    plt.close(figure)
 
 
-def cdf(
-    plots: Sequence[np.number] | NDArray[np.number],
+@profiling.profiled("plot")
+def cdf_multi_flow(
+    plots: Mapping[str, ArrayLike],
     labels: Labels,
     target: Optional[str] = None,
     styles: Optional[dict[str, Style]] = None,
-):
-    figure, axes = plt.subplots(figsize=(10, 6))
-
-    axes.hist(
-        plots,
-        bins=100,
-        density=True,
-        histtype="step",
-        cumulative=True,
-        label="CDF",
-    )
-
-    axes.set_ylabel(labels["y_axis"])
-    axes.set_xlabel(labels["x_axis"])
-    axes.set_title(labels["title"])
-    axes.legend()
+    points: Optional[int] = None,
+) -> dict[str, ECDF]:
+    curves = ecdfs(plots, points)
+    _plot_ecdfs(curves, labels, target)
+    return curves
 
-    figure.subplots_adjust(left=0.2)
 
-    if target:
-        figure.savefig(target, dpi=300)
-    else:
-        figure.show()
-
-    figure.clf()
+@profiling.profiled("plot")
+def cdf(
+    plots: ArrayLike,
+    labels: Labels,
+    target: Optional[str] = None,
+    styles: Optional[dict[str, Style]] = None,
+    points: Optional[int] = None,
+) -> dict[str, ECDF]:
+    curves = ecdfs({"CDF": plots}, points)
+    _plot_ecdfs(curves, labels, target)
+    return curves
 
 
+@profiling.profiled("plot")
 def cdf_time_diff(
     baseline: dict[Seed, list[Plot]],
     alternative: dict[Seed, list[Plot]],
     labels: Labels,
     target: Optional[str] = None,
     styles: Optional[dict[str, Style]] = None,
-) -> None:
+    points: Optional[int] = None,
+) -> dict[str, ECDF]:
     def _take_value(plots: list[Plot]) -> list[float]:
         return [plot.value for plot in plots]
 
@@ -390,4 +420,35 @@ def cdf_time_diff(
             for seed in baseline.keys()
         ]
     )
-    cdf(differences, labels, target, styles)
+    return cdf(differences, labels, target, styles, points)
+
+
+@profiling.profiled("plot")
+def histogram(
+    plots: Mapping[str, ArrayLike],
+    labels: Labels,
+    target: Optional[str] = None,
+    bins: Optional[int] = None,
+) -> dict[str, Histogram]:
+    import matplotlib.pyplot as plt
+
+    counted = histograms(plots, bins)
+    figure, axes = plt.subplots(figsize=(10, 6))
+
+    for label, counts in counted.items():
+        axes.stairs(counts.fractions, counts.edges, label=label)
+
+    axes.set_ylabel(labels["y_axis"])
+    axes.set_xlabel(labels["x_axis"])
+    axes.set_title(labels["title"])
+    axes.legend()
+
+    figure.subplots_adjust(left=0.2)
+
+    if target:
+        figure.savefig(target, dpi=300)
+    else:
+        figure.show()
+
+    plt.close(figure)
+    return counted
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from typing import Mapping, NamedTuple, Optional
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+from pydantic import BaseModel
+
+from analysis.ecdf import flatten
+
+# wider integer samples, such as byte counts, are binned like any other samples
+MAXIMUM_INTEGER_BINS = 1_000
+
+
+class Histogram(NamedTuple):
+    """The fraction of the samples in every bin, where bin i spans edges[i] up to
+    edges[i + 1]"""
+
+    edges: NDArray[np.float64]
+    fractions: NDArray[np.float64]
+
+
+class ExportedHistogram(BaseModel):
+    edges: list[float]
+    fractions: list[float]
+
+    @staticmethod
+    def from_histogram(histogram: Histogram) -> ExportedHistogram:
+        return ExportedHistogram(
+            edges=histogram.edges.tolist(), fractions=histogram.fractions.tolist()
+        )
+
+
+def _finite(values: NDArray[np.float64]) -> NDArray[np.float64]:
+    return values[np.isfinite(values)]
+
+
+def edges(values: NDArray[np.float64], bins: Optional[int] = None) -> NDArray:
+    """A bin for every integer when the samples are counts spanning at most
+    MAXIMUM_INTEGER_BINS of them and no number of bins is asked for, so that e.g.
+    displacements are not merged"""
+    values = _finite(values)
+    if not values.size:
+        return np.array([-0.5, 0.5])
+    if (
+        bins is None
+        and np.array_equal(values, np.round(values))
+        and values.max() - values.min() < MAXIMUM_INTEGER_BINS
+    ):
+        return np.arange(values.min(), values.max() + 2) - 0.5
+    return np.histogram_bin_edges(values, bins=bins or "auto")
+
+
+def histograms(
+    samples: Mapping[str, ArrayLike], bins: Optional[int] = None
+) -> dict[str, Histogram]:
+    """The histogram of every set of samples over the same bins, so that they can be
+    compared bin by bin"""
+    arrays = {label: _finite(flatten(sample)) for label, sample in samples.items()}
+    shared = edges(
+        np.concatenate(list(arrays.values())) if arrays else np.empty(0), bins
+    )
+    return {
+        label: Histogram(shared, np.histogram(array, shared)[0] / max(array.size, 1))
+        for label, array in arrays.items()
+    }
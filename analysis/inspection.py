@@ -0,0 +1,259 @@
+import operator
+import os
+from dataclasses import replace
+from typing import NamedTuple
+
+import scapy.packet
+
+from analysis import classification, compression, discovery
+from analysis.classification import (
+    SENDER_CONDITIONS,
+    Classification,
+    ExportedClassification,
+)
+from analysis.pcap import PcapFile
+from analysis.pyramid import Pyramid, cached
+from analysis.scenario import VariableRun
+from analysis.sequence_plot import Packets, Series
+from analysis.trace_analyzer.dst.reordered_packets import (
+    Delivery,
+    PacketOutOfOrderAnalyzer,
+    TrueBytesInFlightAnalyzer,
+    congestion_windows,
+    hashable_packet,
+    queue_occupancy,
+    tcp_bytes_in_flight,
+)
+from analysis.trace_analyzer.dst.spurious_retransmission_packets import (
+    SpuriousRetransmissionAnalyzer,
+)
+from analysis.trace_analyzer.source.dropped_packets import DroppedPacketsAnalyzer
+from analysis.trace_analyzer.source.packet_capture import CaptureGroup
+from analysis.trace_analyzer.source.regular_fast_retransmit import (
+    FastRetransmissionAnalyzer,
+)
+from analysis.trace_analyzer.source.replayer import TcpSourceReplayer
+from analysis.trace_analyzer.source.sack_fast_retransmit import (
+    FastRetransmitSackPacketCapture,
+)
+from analysis.trace_analyzer.source.spurious_sack_fast_transmit import (
+    SingleDupAckRetransmitPacketCapture,
+    spurious_single_dup_acks,
+)
+from analysis.window import Window
+
+
+class BytesInFlight(NamedTuple):
+    true_bytes_in_flight: Pyramid
+    bytes_in_flight: Pyramid
+    congestion_windows: Pyramid
+    queues: dict[discovery.Queues, Pyramid]
+
+
+def _true_bytes_in_flight(
+    run: VariableRun, value: discovery.Variable, sender: int
+) -> Pyramid:
+    traffic_sender, receiver = run.senders[value][sender], run.receivers[value]
+    source, dst = run.ip_addresses(value)
+
+    dropped_packets = DroppedPacketsAnalyzer(traffic_sender, receiver).filter_packets(
+        source, dst
+    )
+    capture = TrueBytesInFlightAnalyzer(
+        lost_packets=[hashable_packet(pkt) for pkt in dropped_packets]
+    )
+    TcpSourceReplayer(
+        file=traffic_sender, source=source, destination=dst, event_handlers=capture
+    ).run()
+    return Pyramid.from_amounts(capture.bytes_in_flight)
+
+
+def bytes_in_flight(
+    run: VariableRun, value: discovery.Variable, sender: int
+) -> BytesInFlight:
+    """The series of the whole run sliced to its window, as the bytes in flight at
+    the start of a window depend on the packets before it"""
+    window, run = run.window, replace(run, window=Window())
+    directory = os.path.join(run.path, value)
+    traffic_sender, receiver = run.senders[value][sender], run.receivers[value]
+    debug, cwnd = run.debug_filename(value), run.cwnd_filename(value, sender)
+
+    queues: dict[discovery.Queues, Pyramid] = {}
+    for queue in discovery.queues:
+        filename = run.queue_filename(value, queue)
+        if os.path.exists(compression.resolve(filename)):
+            queues[queue] = cached(
+                directory,
+                queue,
+                [filename],
+                lambda: Pyramid.from_amounts(queue_occupancy(filename)),
+            )
+
+    flight = BytesInFlight(
+        cached(
+            directory,
+            f"true_bytes_in_flight_{sender}",
+            [traffic_sender.path, receiver.path],
+            lambda: _true_bytes_in_flight(run, value, sender),
+        ),
+        cached(
+            directory,
+            f"bytes_in_flight_{sender}",
+            [debug],
+            lambda: Pyramid.from_amounts(tcp_bytes_in_flight(debug, sender)),
+        ),
+        cached(
+            directory,
+            f"congestion_windows_{sender}",
+            [cwnd],
+            lambda: Pyramid.from_amounts(congestion_windows(cwnd)),
+        ),
+        queues,
+    )
+    if not window.bounded:
+        return flight
+    return BytesInFlight(
+        flight.true_bytes_in_flight.sliced(window),
+        flight.bytes_in_flight.sliced(window),
+        flight.congestion_windows.sliced(window),
+        {queue: pyramid.sliced(window) for queue, pyramid in flight.queues.items()},
+    )
+
+
+def _sender_conditions(
+    traffic_sender: PcapFile, receiver: PcapFile, source: str, dst: str
+) -> list[list[scapy.packet.Packet]]:
+    """The packets matching every sender condition, in the order of
+    SENDER_CONDITIONS, from one match of the captures and one replay of the sender,
+    where only the fast retransmissions come from tshark"""
+    delivery = Delivery.match(traffic_sender, receiver, source)
+    single_dup_ack = SingleDupAckRetransmitPacketCapture()
+    sack_fast_retransmit = FastRetransmitSackPacketCapture()
+    TcpSourceReplayer(
+        traffic_sender,
+        source,
+        dst,
+        CaptureGroup(captures=[single_dup_ack, sack_fast_retransmit]),
+    ).run()
+    return [
+        delivery.spurious_out_of_order(),
+        spurious_single_dup_acks(single_dup_ack, delivery),
+        sack_fast_retransmit.packets,
+        FastRetransmissionAnalyzer(traffic_sender).filter_packets(source, dst),
+        delivery.dropped(),
+        delivery.out_of_order(),
+    ]
+
+
+def sender_classification(
+    run: VariableRun, value: discovery.Variable, sender: int
+) -> Classification:
+    """Labels the packets the sender sent by the first condition they match, where a
+    window is cut from the labels of the whole run, as the condition a packet
+    matches depends on the packets before it"""
+    window, run = run.window, replace(run, window=Window())
+    traffic_sender, receiver = run.senders[value][sender], run.receivers[value]
+    source, dst = run.flow_ip_addresses(value)[sender]
+    conditions = tuple(SENDER_CONDITIONS.values())
+    return classification.cached(
+        os.path.join(run.path, value),
+        f"sender_classification_{sender}",
+        [traffic_sender.path, receiver.path],
+        conditions,
+        lambda: classification.classify(
+            traffic_sender.packets_from(source),
+            conditions,
+            _sender_conditions(traffic_sender, receiver, source, dst),
+        ),
+    ).sliced(window)
+
+
+def receiver_classification(
+    run: VariableRun, value: discovery.Variable, sender: int
+) -> Classification:
+    window, run = run.window, replace(run, window=Window())
+    receiver = run.receivers[value]
+    source, dst = run.flow_ip_addresses(value)[sender]
+    analyzers = (
+        SpuriousRetransmissionAnalyzer(receiver),
+        PacketOutOfOrderAnalyzer(receiver),
+    )
+    conditions = tuple(analyzer.name for analyzer in analyzers)
+    return classification.cached(
+        os.path.join(run.path, value),
+        f"receiver_classification_{sender}",
+        [receiver.path],
+        conditions,
+        lambda: classification.classify(
+            receiver.packets_from(source),
+            conditions,
+            [analyzer.filter_packets(source, dst) for analyzer in analyzers],
+        ),
+    ).sliced(window)
+
+
+def exported_classification(
+    run: VariableRun, value: discovery.Variable, sender: int
+) -> ExportedClassification:
+    source, _ = run.flow_ip_addresses(value)[sender]
+    packets = run.senders[value][sender].packets_from(source)
+    labelled = sender_classification(run, value, sender)
+    return ExportedClassification(
+        conditions=list(labelled.conditions),
+        times=[float(packet.time) for packet in packets],
+        sequences=[packet.seq for packet in packets],
+        labels=labelled.labels.tolist(),
+    )
+
+
+def sequence(
+    run: VariableRun,
+    value: discovery.Variable,
+    sender: int,
+    *,
+    sender_seq: bool,
+    sender_ack: bool,
+    receiver_seq: bool,
+    receiver_ack: bool,
+) -> list[Series]:
+    traffic_sender, receiver = run.senders[value][sender], run.receivers[value]
+    source, dst = run.flow_ip_addresses(value)[sender]
+
+    packet_lists = []
+    if sender_seq:
+        packet_lists.append(
+            Packets(
+                "Sender Seq",
+                traffic_sender.packets_from(source),
+                operator.attrgetter("seq"),
+                sender_classification(run, value, sender),
+            )
+        )
+    if sender_ack:
+        packet_lists.append(
+            Packets(
+                "Sender Ack",
+                traffic_sender.packets_from(dst),
+                operator.attrgetter("ack"),
+            )
+        )
+    if receiver_seq:
+        packet_lists.append(
+            Packets(
+                "Receiver Seq",
+                receiver.packets_from(source),
+                operator.attrgetter("seq"),
+                receiver_classification(run, value, sender),
+            )
+        )
+
+    if receiver_ack:
+        packet_lists.append(
+            Packets(
+                "Receiver Ack",
+                traffic_sender.packets_from(dst),
+                operator.attrgetter("ack"),
+            )
+        )
+
+    return [packets.series for packets in packet_lists]
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Iterable, NamedTuple, Optional
+
+from analysis.compression import COMPRESSED_SUFFIX
+
+MANIFEST_FILENAME = ".manifest.jsonl"
+RECEIVER_CAPTURE = "-Receiver-1.pcap"
+
+# an empty pcap still carries its 24 byte global header
+PCAP_HEADER_SIZE = 24
+
+
+class FileEntry(NamedTuple):
+    size: int
+    mtime: float
+
+
+class RunLocation(NamedTuple):
+    option: str
+    seed: str
+    variable: str
+
+
+class IncompleteRun(NamedTuple):
+    location: RunLocation
+    reason: str
+
+
+def manifest_filename(directory: str) -> str:
+    return os.path.join(directory, MANIFEST_FILENAME)
+
+
+def scan_files(run_directory: str) -> dict[str, FileEntry]:
+    files = {}
+    with os.scandir(run_directory) as entries:
+        for entry in entries:
+            if entry.is_file():
+                stat = entry.stat()
+                files[entry.name] = FileEntry(stat.st_size, stat.st_mtime)
+    return files
+
+
+def _subdirectories(directory: str) -> list[str]:
+    with os.scandir(directory) as entries:
+        return sorted(entry.name for entry in entries if entry.is_dir())
+
+
+def _uncompressed_name(filename: str) -> str:
+    return filename.removesuffix(COMPRESSED_SUFFIX)
+
+
+def incomplete_reason(files: dict[str, FileEntry]) -> Optional[str]:
+    if not files:
+        return "empty run directory"
+    names = {_uncompressed_name(filename) for filename in files}
+    if RECEIVER_CAPTURE not in names:
+        return "missing receiver capture"
+    if not any("TrafficSender" in filename for filename in names):
+        return "missing traffic sender captures"
+    if "debug.log" not in names:
+        return "missing debug.log"
+    if RECEIVER_CAPTURE in files and files[RECEIVER_CAPTURE].size <= PCAP_HEADER_SIZE:
+        return "no packets captured at the receiver"
+    return None
+
+
+@dataclass
+class Manifest:
+    """Index of the directory/option/seed/variable trace tree, stored as an append
+    only journal so that simulate can add runs as they finish"""
+
+    directory: str
+    tree: dict[str, dict[str, dict[str, dict[str, FileEntry]]]] = field(
+        default_factory=dict
+    )
+
+    def add(self, location: RunLocation, files: dict[str, FileEntry]) -> None:
+        self.tree.setdefault(location.option, {}).setdefault(location.seed, {})[
+            location.variable
+        ] = files
+
+    @property
+    def locations(self) -> list[RunLocation]:
+        return [
+            RunLocation(option, seed, variable)
+            for option, seeds in self.tree.items()
+            for seed, variables in seeds.items()
+            for variable in variables
+        ]
+
+    @staticmethod
+    def load(directory: str) -> Optional[Manifest]:
+        filename = manifest_filename(directory)
+        if not os.path.exists(filename):
+            return None
+        manifest = Manifest(directory)
+        with open(filename, "r") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                run = json.loads(line)
+                manifest.add(
+                    RunLocation(run["option"], run["seed"], run["variable"]),
+                    {name: FileEntry(*entry) for name, entry in run["files"].items()},
+                )
+        return manifest
+
+    @staticmethod
+    def scan(directory: str) -> Manifest:
+        manifest = Manifest(directory)
+        for option in _subdirectories(directory):
+            for seed in _subdirectories(os.path.join(directory, option)):
+                for variable in _subdirectories(os.path.join(directory, option, seed)):
+                    location = RunLocation(option, seed, variable)
+                    manifest.add(
+                        location, scan_files(os.path.join(directory, *location))
+                    )
+        return manifest
+
+    def store(self) -> None:
+        filename = manifest_filename(self.directory)
+        temporary = f"{filename}.{os.getpid()}"
+        with open(temporary, "w") as file:
+            for location in self.locations:
+                file.write(_serialize(location, self.files(*location)))
+        os.replace(temporary, filename)
+
+    def options(self) -> list[str]:
+        return sorted(self.tree)
+
+    def seeds(self, option: str) -> list[str]:
+        return sorted(self.tree.get(option, {}))
+
+    def variables(self, option: str, seed: str) -> list[str]:
+        return sorted(self.tree.get(option, {}).get(seed, {}))
+
+    def files(self, option: str, seed: str, variable: str) -> dict[str, FileEntry]:
+        return self.tree.get(option, {}).get(seed, {}).get(variable, {})
+
+    def incomplete_runs(
+        self, locations: Optional[Iterable[RunLocation]] = None
+    ) -> list[IncompleteRun]:
+        return [
+            IncompleteRun(location, reason)
+            for location in (self.locations if locations is None else locations)
+            if (reason := incomplete_reason(self.files(*location)))
+        ]
+
+
+def _serialize(location: RunLocation, files: dict[str, FileEntry]) -> str:
+    return (
+        json.dumps(
+            {
+                "option": location.option,
+                "seed": location.seed,
+                "variable": location.variable,
+                "files": {name: list(entry) for name, entry in files.items()},
+            }
+        )
+        + "\n"
+    )
+
+
+def record_run(directory: str, location: RunLocation) -> None:
+    """Appends the run to the manifest, later entries for the same run take precedence"""
+    files = scan_files(os.path.join(directory, *location))
+    with open(manifest_filename(directory), "a") as file:
+        file.write(_serialize(location, files))
+
+
+_loaded: dict[str, tuple[float, Manifest]] = {}
+
+
+def cached_manifest(directory: str) -> Optional[Manifest]:
+    """Loads the manifest once per process, reloading it only when it changes"""
+    filename = manifest_filename(directory)
+    try:
+        mtime = os.path.getmtime(filename)
+    except FileNotFoundError:
+        return None
+    if directory not in _loaded or _loaded[directory][0] != mtime:
+        manifest = Manifest.load(directory)
+        if manifest is None:
+            return None
+        _loaded[directory] = (mtime, manifest)
+    return _loaded[directory][1]
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING
-
+from typing import TYPE_CHECKING, Any
 
+from analysis import profiling
 from analysis.graph import Plot
 from analysis.trace_analyzer.dst.reordered_packets import (
     DroppedRetransmittedPacketCapture,
@@ -12,9 +12,13 @@ from analysis.trace_analyzer.dst.reordered_packets import (
     hashable_packet,
 )
 from analysis.trace_analyzer.source.replayer import TcpSourceReplayer
+from analysis.trace_analyzer.source.retransmission_timeout import (
+    RTOWaitingForUnsent,
+    WaitTimeAfterRTO,
+)
 
 if TYPE_CHECKING:
-    from analysis.scenario import VariableRun, WaitTimeAfterRTO, RTOWaitingForUnsent
+    from analysis.scenario import VariableRun
 
 
 def extract_numerical_value_from_string(string: str) -> float:
@@ -35,6 +39,14 @@ def _calculate_packet_loss(
 class Metric(ABC):
     name: str
 
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        # every metric is profiled as a stage of its own
+        if isinstance(calculate := cls.__dict__.get("calculate"), staticmethod):
+            cls.calculate = staticmethod(  # type: ignore[method-assign]
+                profiling.profiled("metric")(calculate.__func__)
+            )
+
     @classmethod
     def fetch_metrics(cls, variable_run: VariableRun) -> list[Plot]:
         return sorted(
@@ -1,12 +1,32 @@
-from dataclasses import dataclass
-from functools import cached_property
-from typing import NamedTuple
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import struct
 import time
+from dataclasses import dataclass, replace
+from functools import cached_property
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+import numpy as np
+from numpy.typing import NDArray
 
-import pyshark
-import scapy.packet
-from scapy.all import rdpcap, PacketList
-from scapy.layers.inet import IP, TCP, UDP
+from analysis import analysis_cache, compression, profiling
+from analysis._lazy import lazy_import
+from analysis.window import Window
+
+if TYPE_CHECKING:
+    import pyshark
+    import scapy.all as scapy_all
+    import scapy.layers.inet as inet
+    import scapy.packet
+    from scapy.plist import PacketList
+else:
+    # the constants are needed without the dissectors, e.g. to write synthetic traces
+    pyshark = lazy_import("pyshark")
+    scapy_all = lazy_import("scapy.all")
+    inet = lazy_import("scapy.layers.inet")
 
 SOURCE = "10.1.2.1"
 DESTINATION = "10.1.7.2"
@@ -19,46 +39,251 @@ class Communication(NamedTuple):
     destination: str
 
 
+class Flow(NamedTuple):
+    source: str
+    source_port: int
+    destination: str
+    destination_port: int
+
+
+class Demultiplexed(NamedTuple):
+    flows: dict[Flow, list[scapy.packet.Packet]]
+    sources: dict[str, list[scapy.packet.Packet]]
+
+
+# records between the entries of the sparse index of a capture, which bounds how many
+# records before a window are read to find where it starts
+INDEX_INTERVAL = 1024
+
+PCAP_HEADER_SIZE = 24
+LITTLE_ENDIAN_MAGICS = (b"\xd4\xc3\xb2\xa1", b"\x4d\x3c\xb2\xa1")
+NANOSECOND_MAGICS = (b"\xa1\xb2\x3c\x4d", b"\x4d\x3c\xb2\xa1")
+
+
+class RecordIndex(NamedTuple):
+    """The time and byte offset of every INDEX_INTERVAL-th record of a capture"""
+
+    times: NDArray[np.float64]
+    offsets: NDArray[np.int64]
+
+    def entry(self, start: Optional[float]) -> int:
+        """The last entry at or before start, from which a window is read"""
+        if start is None:
+            return 0
+        return max(int(np.searchsorted(self.times, start, "right")) - 1, 0)
+
+    def store(self, file: str) -> None:
+        np.savez(file, times=self.times, offsets=self.offsets)
+
+    @classmethod
+    def load(cls, file: str) -> RecordIndex:
+        with np.load(file, allow_pickle=False) as data:
+            return cls(data["times"], data["offsets"])
+
+
+@profiling.profiled("index")
+def build_index(filename: str, interval: int = INDEX_INTERVAL) -> RecordIndex:
+    """Walks the record headers of the capture, seeking over the packets without
+    reading them"""
+    times: list[float] = []
+    offsets: list[int] = []
+    with compression.open_binary(filename) as file:
+        magic = file.read(PCAP_HEADER_SIZE)[:4]
+        record = struct.Struct("<IIII" if magic in LITTLE_ENDIAN_MAGICS else ">IIII")
+        resolution = 1e-9 if magic in NANOSECOND_MAGICS else 1e-6
+        offset, count = PCAP_HEADER_SIZE, 0
+        while len(header := file.read(record.size)) == record.size:
+            seconds, fraction, captured, _ = record.unpack(header)
+            if count % interval == 0:
+                times.append(seconds + fraction * resolution)
+                offsets.append(offset)
+            file.seek(captured, os.SEEK_CUR)
+            offset += record.size + captured
+            count += 1
+    return RecordIndex(np.array(times), np.array(offsets, dtype=np.int64))
+
+
+def cached_index(filename: str) -> RecordIndex:
+    """Loads the index cached for the capture, building it again when the capture
+    has changed since, as walking a compressed capture decompresses all of it"""
+    directory, name = os.path.split(filename)
+    return analysis_cache.cached(
+        directory,
+        f"{name}.index",
+        [filename],
+        RecordIndex.load,
+        RecordIndex.store,
+        lambda: build_index(filename),
+    )
+
+
 TCP_FIN = 0b00_0000_0001
 TCP_SYN = 0b00_0000_0010
 TCP_ACK = 0b00_0001_0000
 
 
+def _times(packets: list[scapy.packet.Packet] | PacketList) -> NDArray[np.float64]:
+    return np.fromiter(
+        (float(packet.time) for packet in packets), np.float64, count=len(packets)
+    )
+
+
 @dataclass(frozen=True)
 class PcapFile:
     filename: str
+    window: Window = Window()
+
+    @cached_property
+    def path(self) -> str:
+        return compression.resolve(self.filename)
+
+    def windowed(self, window: Window) -> PcapFile:
+        return replace(self, window=window)
+
+    @cached_property
+    def index(self) -> RecordIndex:
+        return cached_index(self.path)
 
     @cached_property
+    def _windowed_packets(self) -> tuple[int, PacketList]:
+        """The number of records before the window and the packets within it, read
+        from the last index entry before the window up to the first packet after it,
+        as ns-3 writes the records of a capture in time order"""
+        entry = self.index.entry(self.window.start)
+        packets = []
+        if self.index.offsets.size:
+            # scapy detects gzip compressed captures by their magic number
+            with scapy_all.PcapReader(self.path) as reader:
+                reader.f.seek(int(self.index.offsets[entry]))
+                for packet in reader:
+                    if (
+                        self.window.end is not None
+                        and float(packet.time) > self.window.end
+                    ):
+                        break
+                    packets.append(packet)
+        within = self.window.slice(_times(packets))
+        return (
+            entry * INDEX_INTERVAL + within.start,
+            scapy_all.PacketList(packets[within]),
+        )
+
+    @cached_property
+    def preceding_packets(self) -> PacketList:
+        """The packets before the window, which a replay goes through to reach the
+        state the connection was in when the window opened"""
+        if self.window.start is None:
+            return scapy_all.PacketList([])
+        packets = self.windowed(Window(end=self.window.start)).packets
+        return packets[: int(np.searchsorted(_times(packets), self.window.start))]
+
+    @cached_property
+    @profiling.profiled("rdpcap", packets=lambda packets, _: len(packets))
     def packets(self) -> PacketList:
-        return rdpcap(self.filename)
+        if self.window.bounded:
+            return self._windowed_packets[1]
+        # scapy detects gzip compressed captures by their magic number
+        return scapy_all.rdpcap(self.path)
+
+    @cached_property
+    def times(self) -> NDArray[np.float64]:
+        """The time of every packet, sorted as the records are"""
+        return _times(self.packets)
+
+    def packet_at(self, number: int) -> scapy.packet.Packet:
+        """The packet tshark numbers number, counting from one over the whole
+        capture rather than the window"""
+        first = self._windowed_packets[0] if self.window.bounded else 0
+        return self.packets[number - 1 - first]
+
+    def display_filter(self, display_filter: str) -> str:
+        """Restricts a tshark display filter to the window, where tshark still
+        analyses the packets before it"""
+        clauses = [display_filter]
+        if self.window.start is not None:
+            clauses.append(f"frame.time_epoch >= {self.window.start}")
+        if self.window.end is not None:
+            clauses.append(f"frame.time_epoch <= {self.window.end}")
+        return " and ".join(clauses)
 
     @cached_property
     def tcp_packets(self) -> list[scapy.packet.Packet]:
-        return [pkt for pkt in self.packets if TCP in pkt]
+        return [pkt for pkt in self.packets if inet.TCP in pkt]
 
     @cached_property
     def udp_packets(self) -> list[scapy.packet.Packet]:
-        return [pkt for pkt in self.packets if UDP in pkt]
+        return [pkt for pkt in self.packets if inet.UDP in pkt]
+
+    @cached_property
+    def first_packet(self) -> scapy.packet.Packet:
+        """The first packet of the whole capture, which opens the connection"""
+        if not self.window.bounded:
+            return self.packets[0]
+        with scapy_all.PcapReader(self.path) as reader:
+            return reader.read_packet()
 
     @property
     def first_addresses(self) -> Communication:
-        return Communication(self.packets[0][IP].src, self.packets[0][IP].dst)
+        return Communication(
+            self.first_packet[inet.IP].src, self.first_packet[inet.IP].dst
+        )
+
+    @cached_property
+    @profiling.profiled(
+        "demultiplex", packets=lambda _, file: len(file.__dict__["packets"])
+    )
+    def demultiplexed(self) -> Demultiplexed:
+        """Splits the IP packets by their 4-tuple and by their source in one pass,
+        keeping the order they were captured in, so that every flow of a shared
+        capture such as the receiver's is read from it once"""
+        flows: dict[Flow, list[scapy.packet.Packet]] = {}
+        sources: dict[str, list[scapy.packet.Packet]] = {}
+        for packet in self.packets:
+            ip = packet.getlayer(inet.IP)
+            if ip is None:
+                continue
+            transport = ip.payload
+            if isinstance(transport, (inet.TCP, inet.UDP)):
+                flow = Flow(ip.src, transport.sport, ip.dst, transport.dport)
+            else:
+                flow = Flow(ip.src, 0, ip.dst, 0)
+            flows.setdefault(flow, []).append(packet)
+            sources.setdefault(ip.src, []).append(packet)
+        return Demultiplexed(flows, sources)
+
+    @property
+    def flows(self) -> dict[Flow, list[scapy.packet.Packet]]:
+        return self.demultiplexed.flows
 
     def packets_from(self, source: str):
-        return list(
-            filter(lambda pkt: IP in pkt and pkt[IP].src == source, self.packets)
-        )
+        return list(self.demultiplexed.sources.get(source, ()))
+
+    def packets_between(
+        self, source: str, destination: str
+    ) -> list[scapy.packet.Packet]:
+        """The packets of every flow from source to destination, in capture order"""
+        flows = [
+            packets
+            for flow, packets in self.flows.items()
+            if flow.source == source and flow.destination == destination
+        ]
+        if len(flows) == 1:
+            return list(flows[0])
+        return sorted(itertools.chain.from_iterable(flows), key=lambda pkt: pkt.time)
 
     @cached_property
     def addresses(self) -> list[str]:
-        return list(set([pkt[IP].src for pkt in self.packets]))
+        return list(self.demultiplexed.sources)
 
     def number_of_packets_from_source(self, source: str) -> int:
-        return len(self.packets_from(source))
+        return len(self.demultiplexed.sources.get(source, ()))
 
+    @profiling.profiled("tshark")
     def flow_completion_time(self, source: str, destination: str) -> float:
+        # a flow completes once, so its completion is read from the whole capture
+        # rather than only within the window, where it may not have finished
         pyshark_cap = pyshark.FileCapture(
-            self.filename,
+            self.path,
             display_filter=f"tcp.flags.fin==1 and tcp.flags.ack==1 and ip.src=={destination}",
         )
         last_packet = None
@@ -70,12 +295,15 @@ class PcapFile:
             return timestamp
         assert False, "Flow completion time not found"
 
+    @profiling.profiled("tshark")
     def flow_completion_times(
         self, destination: str, tries: int = 0
     ) -> dict[str, float]:
+        # read from the whole capture like flow_completion_time, so that flows
+        # finishing outside the window are not left out
         try:
             pyshark_cap = pyshark.FileCapture(
-                self.filename,
+                self.path,
                 display_filter=f"tcp.flags.fin==1 and tcp.flags.ack==1 and ip.src=={destination}",
             )
 
@@ -84,17 +312,20 @@ class PcapFile:
             }
             pyshark_cap.close()
         except Exception as e:
-            print(f"Failed to load pcap file, attempt={tries}")
+            logging.warning(f"Failed to load pcap file, attempt={tries}")
             time.sleep(tries)
             if tries >= 3:
                 raise e
             return self.flow_completion_times(destination, tries + 1)
         return times
 
+    @profiling.profiled("tshark")
     def number_of_packet_reordering_from_source(self, source: str) -> int:
         file_capture = pyshark.FileCapture(
-            self.filename,
-            display_filter=f"ip.src=={source} and tcp.analysis.out_of_order",
+            self.path,
+            display_filter=self.display_filter(
+                f"ip.src=={source} and tcp.analysis.out_of_order"
+            ),
         )
         packets = list(file_capture)
 
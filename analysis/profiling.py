@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import AbstractContextManager, contextmanager
+from dataclasses import dataclass, field
+from functools import wraps
+from types import FrameType
+from typing import Callable, Iterator, Optional, ParamSpec, TypeVar
+
+import rich.console
+import rich.table
+from pydantic import BaseModel
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+# seconds between the samples of the stack, which bounds the overhead of sampling
+SAMPLING_INTERVAL = 0.005
+
+
+@dataclass
+class Stage:
+    calls: int = 0
+    seconds: float = 0.0
+    packets: int = 0
+    peak_memory: int = 0
+
+
+class ExportedStage(BaseModel):
+    name: str
+    calls: int
+    seconds: float
+    packets: int
+    packets_per_second: Optional[float]
+    peak_memory: Optional[int]
+
+
+@dataclass
+class _Frame:
+    # memory traced when the stage was entered, and the highest seen within it
+    memory: int
+    peak: int
+
+
+@dataclass
+class Profiler:
+    """Accumulates the time, calls, packets and peak memory of every stage, where
+    nested stages count towards their enclosing stages as well"""
+
+    enabled: bool = False
+    memory: bool = True
+    stages: dict[str, Stage] = field(default_factory=dict)
+    _frames: list[_Frame] = field(default_factory=list)
+
+    def start(self, memory: bool = True) -> None:
+        self.memory = memory
+        if memory:
+            tracemalloc.start()
+        self.enabled = True
+
+    def stop(self) -> None:
+        self.enabled = False
+        if self.memory:
+            tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Stage]:
+        """Yields the stage so that the caller can add the packets it processed"""
+        record = self.stages.setdefault(name, Stage())
+        if not self.enabled:
+            yield record
+            return
+        if not self.memory:
+            start = time.perf_counter()
+            try:
+                yield record
+            finally:
+                record.seconds += time.perf_counter() - start
+                record.calls += 1
+            return
+
+        # tracemalloc has a single peak, so it is reset for every stage and the
+        # enclosing stages fold in the peak of the stages within them
+        memory, peak = tracemalloc.get_traced_memory()
+        if self._frames:
+            self._frames[-1].peak = max(self._frames[-1].peak, peak)
+        tracemalloc.reset_peak()
+        self._frames.append(_Frame(memory, memory))
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds += time.perf_counter() - start
+            record.calls += 1
+            frame = self._frames.pop()
+            peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+            record.peak_memory = max(record.peak_memory, peak - frame.memory)
+            if self._frames:
+                self._frames[-1].peak = max(self._frames[-1].peak, peak)
+
+    def report(self) -> list[ExportedStage]:
+        return [
+            ExportedStage(
+                name=name,
+                calls=record.calls,
+                seconds=record.seconds,
+                packets=record.packets,
+                packets_per_second=(
+                    record.packets / record.seconds
+                    if record.packets and record.seconds
+                    else None
+                ),
+                peak_memory=record.peak_memory if self.memory else None,
+            )
+            for name, record in sorted(
+                self.stages.items(), key=lambda item: item[1].seconds, reverse=True
+            )
+            if record.calls
+        ]
+
+
+profiler = Profiler()
+
+
+def stage(name: str) -> AbstractContextManager[Stage]:
+    return profiler.stage(name)
+
+
+def profiled(
+    name: str, packets: Optional[Callable[..., int]] = None
+) -> Callable[[Callable[P, T]], Callable[P, T]]:
+    """Records every call of the function as the stage "name qualname", where packets
+    counts what the call processed from its result followed by its arguments"""
+
+    def decorator(function: Callable[P, T]) -> Callable[P, T]:
+        label = f"{name} {function.__qualname__}"
+
+        @wraps(function)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            if not profiler.enabled:
+                return function(*args, **kwargs)
+            with profiler.stage(label) as record:
+                result = function(*args, **kwargs)
+                if packets is not None:
+                    record.packets += packets(result, *args, **kwargs)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def _collapse(frame: Optional[FrameType]) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        )
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler(threading.Thread):
+    """Samples the stack of a thread, counting the collapsed stacks that flamegraph
+    tools such as flamegraph.pl and speedscope read"""
+
+    def __init__(self, thread: int, interval: float = SAMPLING_INTERVAL) -> None:
+        super().__init__(daemon=True)
+        self.thread = thread
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread)
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+    def store(self, filename: str) -> None:
+        with open(filename, "w") as file:
+            file.writelines(
+                f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+            )
+
+
+def print_report(stages: list[ExportedStage]) -> None:
+    table = rich.table.Table(title="Profile", show_header=True, header_style="bold")
+    table.add_column("Stage")
+    table.add_column("Calls")
+    table.add_column("Time (s)")
+    table.add_column("Packets")
+    table.add_column("Packets/s")
+    table.add_column("Peak memory (MiB)")
+    for exported in stages:
+        table.add_row(
+            exported.name,
+            str(exported.calls),
+            f"{exported.seconds:.3f}",
+            str(exported.packets) if exported.packets else "-",
+            (
+                f"{exported.packets_per_second:,.0f}"
+                if exported.packets_per_second
+                else "-"
+            ),
+            (
+                f"{exported.peak_memory / 2**20:.2f}"
+                if exported.peak_memory is not None
+                else "-"
+            ),
+        )
+    rich.console.Console(stderr=True).print(table)
+
+
+def store_report(filename: str, stages: list[ExportedStage]) -> None:
+    with open(filename, "w") as file:
+        json.dump([exported.model_dump() for exported in stages], file, indent=2)
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from analysis import analysis_cache, decimation
+from analysis.window import Window
+
+# every level groups this many buckets of the level beneath it
+FACTOR = 4
+
+# the most points fetched for a window, matching what a sequence plot draws
+BUDGET = 4 * decimation.DEFAULT_BUCKETS
+
+
+@dataclass(frozen=True, eq=False)
+class Pyramid:
+    """A step time series along with min/max envelopes of it at coarser and coarser
+    resolutions, each level holding the indices of the samples it keeps"""
+
+    times: NDArray[np.float64]
+    values: NDArray[np.int64]
+    levels: tuple[decimation.Indices, ...]
+
+    @classmethod
+    def build(
+        cls,
+        times: NDArray[np.float64],
+        values: NDArray[np.int64],
+        budget: int = BUDGET,
+    ) -> Pyramid:
+        levels: list[decimation.Indices] = []
+        indices = np.arange(len(times))
+        size = FACTOR
+        while len(indices) > budget:
+            size *= FACTOR
+            # buckets nest within those of the level beneath, so the envelope of a
+            # bucket is the envelope of the points its children kept
+            indices = indices[decimation.envelope(indices // size, values[indices])]
+            levels.append(indices)
+        return cls(times, values, tuple(levels))
+
+    @classmethod
+    def from_amounts(
+        cls, amounts: Iterable[tuple[float, int]], budget: int = BUDGET
+    ) -> Pyramid:
+        pairs = np.array(list(amounts), dtype=np.float64).reshape(-1, 2)
+        order = np.argsort(pairs[:, 0], kind="stable")
+        return cls.build(
+            pairs[order, 0], pairs[order, 1].astype(np.int64), budget=budget
+        )
+
+    def store(self, file: str) -> None:
+        # allow_pickle shares the keywords of savez with the arrays, so the mapping
+        # has to be typed loosely
+        arrays: dict[str, Any] = {
+            f"level{n}": level for n, level in enumerate(self.levels, start=1)
+        }
+        np.savez(file, times=self.times, values=self.values, **arrays)
+
+    @classmethod
+    def load(cls, file: str) -> Pyramid:
+        with np.load(file, allow_pickle=False) as data:
+            depth = sum(1 for name in data.files if name.startswith("level"))
+            return cls(
+                data["times"],
+                data["values"],
+                tuple(data[f"level{n}"] for n in range(1, depth + 1)),
+            )
+
+    def window(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        budget: int = BUDGET,
+    ) -> tuple[NDArray[np.float64], NDArray[np.int64]]:
+        """The samples between start and end of the finest level with at most budget
+        of them, along with the samples either side so the steps reach the edges"""
+        for indices in (None, *self.levels):
+            times = self.times if indices is None else self.times[indices]
+            first = 0 if start is None else np.searchsorted(times, start, "right") - 1
+            last = len(times) if end is None else np.searchsorted(times, end) + 1
+            first, last = max(first, 0), min(last, len(times))
+            if last - first <= budget:
+                break
+        selected = np.arange(first, last) if indices is None else indices[first:last]
+        return self.times[selected], self.values[selected]
+
+    def sliced(self, window: Window, budget: int = BUDGET) -> Pyramid:
+        """The samples within the window, along with the one before it so that the
+        step reaches its start"""
+        within = window.slice(self.times)
+        first = max(within.start - 1, 0)
+        return Pyramid.build(
+            self.times[first : within.stop], self.values[first : within.stop], budget
+        )
+
+
+def cached(
+    directory: str, name: str, sources: list[str], compute: Callable[[], Pyramid]
+) -> Pyramid:
+    """Loads the pyramid cached for the traces of a run, building it again when any
+    of the traces it was built from have changed since"""
+    return analysis_cache.cached(
+        directory, name, sources, Pyramid.load, Pyramid.store, compute
+    )
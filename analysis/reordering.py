@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+
+if TYPE_CHECKING:
+    import scapy.packet
+
+# RFC 5236's default displacement threshold, beyond which a packet counts as lost
+DISPLACEMENT_THRESHOLD = 3
+
+
+def arrivals(packets: Sequence[scapy.packet.Packet]) -> NDArray[np.int64]:
+    """The sequence of every data segment the first time it arrived, in arrival order,
+    as both RFCs leave duplicates out"""
+    sequences = np.fromiter(
+        (packet.seq for packet in packets if len(packet["TCP"].payload)), np.int64
+    )
+    _, first = np.unique(sequences, return_index=True)
+    return sequences[np.sort(first)]
+
+
+def extents(sequences: NDArray[np.int64]) -> NDArray[np.int64]:
+    """RFC 4737's reorder extent of every reordered packet, which is how many packets
+    arrived between the first packet with a greater sequence and itself"""
+    highest = np.maximum.accumulate(sequences)
+    reordered = np.flatnonzero(sequences[1:] < highest[:-1]) + 1
+    # the highest sequence only grows, so its first value above the packet's is where
+    # the earliest packet with a greater sequence arrived
+    earliest = np.searchsorted(highest, sequences[reordered], side="right")
+    return reordered - earliest
+
+
+def displacements(sequences: NDArray[np.int64]) -> NDArray[np.int64]:
+    """RFC 5236's displacement of every packet, its position in the arrival order less
+    its position in the sequence order, so that late packets are positive"""
+    expected = np.empty(sequences.size, dtype=np.int64)
+    expected[np.argsort(sequences, kind="stable")] = np.arange(sequences.size)
+    return np.arange(sequences.size) - expected
+
+
+def density(
+    sequences: NDArray[np.int64], threshold: int = DISPLACEMENT_THRESHOLD
+) -> NDArray[np.float64]:
+    """RFC 5236's reorder density, the fraction of the packets displaced by each of
+    -threshold to threshold"""
+    shifts = displacements(sequences)
+    shifts = shifts[np.abs(shifts) <= threshold]
+    return np.bincount(shifts + threshold, minlength=2 * threshold + 1) / max(
+        sequences.size, 1
+    )
+
+
+def displaced(sequences: NDArray[np.int64]) -> float:
+    """The fraction of the packets that did not arrive where they were expected, one
+    less RFC 5236's reorder density at no displacement"""
+    return np.count_nonzero(displacements(sequences)) / max(sequences.size, 1)
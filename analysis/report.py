@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import html
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Literal, NamedTuple, Optional
+
+import rich.console
+import rich.progress
+
+from analysis import graph
+from analysis.discovery import Options
+from analysis.statistic import MultiFlowStatistic, Statistic
+
+Format = Literal["png", "svg"]
+formats: list[Format] = ["png", "svg"]
+
+Chart = Literal["plot", "min_max_plot", "cdf", "scatter"]
+charts: list[Chart] = ["plot", "min_max_plot", "cdf", "scatter"]
+
+# every other statistic is scattered against the flow completion time
+REFERENCE = "time"
+
+console = rich.console.Console()
+
+
+class Section(NamedTuple):
+    title: str
+    property: str
+    statistics: dict[Options, Statistic | MultiFlowStatistic]
+
+
+class Figure(NamedTuple):
+    section: str
+    chart: Chart
+    caption: str
+    filename: str
+
+
+class Job(NamedTuple):
+    figure: Figure
+    statistics: tuple[dict[Options, Statistic | MultiFlowStatistic], ...]
+    labels: graph.Labels
+    variable: Optional[int]
+
+
+def _use_agg() -> None:
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def _cdf_values(
+    statistic: Statistic | MultiFlowStatistic, variable: int
+) -> list[float]:
+    if isinstance(statistic, MultiFlowStatistic):
+        # flows are pooled across the seeds
+        return [value for flows in statistic.plots[variable].data for value in flows]
+    return statistic.plots[variable].data
+
+
+def _single_flow(
+    statistics: dict[Options, Statistic | MultiFlowStatistic],
+) -> dict[Options, Statistic]:
+    # plan only scatters statistics holding a single value for every seed
+    single = {
+        option: statistic
+        for option, statistic in statistics.items()
+        if isinstance(statistic, Statistic)
+    }
+    assert len(single) == len(statistics), "Multi-flow statistics are not scattered"
+    return single
+
+
+def _render(job: Job, target: str) -> None:
+    stats = job.statistics[0]
+    if job.figure.chart == "plot":
+        graph.plot(stats, job.labels, target=target)
+    elif job.figure.chart == "min_max_plot":
+        graph.min_max_plot(stats, job.labels, target=target)
+    elif job.figure.chart == "cdf":
+        assert job.variable is not None
+        graph.cdf_multi_flow(
+            {
+                option: _cdf_values(statistic, job.variable)
+                for option, statistic in stats.items()
+            },
+            job.labels,
+            target=target,
+        )
+    else:
+        graph.correlation_scatter(
+            (_single_flow(stats), _single_flow(job.statistics[1])),
+            job.labels,
+            target=target,
+        )
+
+
+def render(job: Job, output: str, formats: tuple[Format, ...]) -> list[str]:
+    targets = [
+        os.path.join(output, f"{job.figure.filename}.{format}") for format in formats
+    ]
+    for target in targets:
+        _render(job, target)
+    return targets
+
+
+def plan(
+    sections: dict[str, Section], directory: str, selected: tuple[Chart, ...]
+) -> list[Job]:
+    jobs: list[Job] = []
+    reference = sections.get(REFERENCE)
+    for name, section in sections.items():
+        labels = graph.Labels(
+            x_axis=directory, y_axis=section.property, title=section.title
+        )
+        summaries: list[Chart] = ["plot", "min_max_plot"]
+        for chart in summaries:
+            if chart not in selected:
+                continue
+            jobs.append(
+                Job(
+                    Figure(name, chart, chart, f"{name}_{chart}"),
+                    (section.statistics,),
+                    labels,
+                    None,
+                )
+            )
+
+        first = next(iter(section.statistics.values()))
+        for index, variable in enumerate(first.variables if "cdf" in selected else []):
+            jobs.append(
+                Job(
+                    Figure(name, "cdf", f"cdf @ {variable}", f"{name}_cdf_{index}"),
+                    (section.statistics,),
+                    graph.Labels(
+                        x_axis=section.property,
+                        y_axis="Probability of Occurrence",
+                        title=f"{section.title} @ {variable}",
+                    ),
+                    index,
+                )
+            )
+
+        if "scatter" not in selected or reference is None or name == REFERENCE:
+            continue
+        if any(
+            isinstance(statistic, MultiFlowStatistic)
+            for statistics in (section.statistics, reference.statistics)
+            for statistic in statistics.values()
+        ):
+            continue
+        jobs.append(
+            Job(
+                Figure(name, "scatter", f"against {REFERENCE}", f"{name}_scatter"),
+                (section.statistics, reference.statistics),
+                graph.Labels(
+                    x_axis=section.property,
+                    y_axis=reference.property,
+                    title=f"{section.title} against {reference.title}",
+                ),
+                None,
+            )
+        )
+    return jobs
+
+
+def _index(
+    sections: dict[str, Section],
+    rendered: dict[Figure, list[str]],
+    output: str,
+) -> str:
+    body = []
+    for name, section in sections.items():
+        figures = [figure for figure in rendered if figure.section == name]
+        if not figures:
+            continue
+        body.append(f"<h2>{html.escape(section.title)}</h2>")
+        body.append("<div class='figures'>")
+        for figure in figures:
+            files = [os.path.relpath(target, output) for target in rendered[figure]]
+            links = " ".join(
+                f"<a href='{html.escape(file)}'>{html.escape(file.rsplit('.', 1)[1])}</a>"
+                for file in files
+            )
+            body.append(
+                "<figure>"
+                f"<img src='{html.escape(files[0])}' alt='{html.escape(figure.caption)}'>"
+                f"<figcaption>{html.escape(figure.caption)} ({links})</figcaption>"
+                "</figure>"
+            )
+        body.append("</div>")
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Report</title>"
+        "<style>.figures{display:flex;flex-wrap:wrap}"
+        "figure{width:32%;margin:0.5%}img{width:100%}</style></head><body>"
+        + "".join(body)
+        + "</body></html>"
+    )
+
+
+def generate(
+    sections: dict[str, Section],
+    directory: str,
+    output: str,
+    formats: tuple[Format, ...],
+    selected: tuple[Chart, ...] = tuple(charts),
+    workers: Optional[int] = None,
+) -> str:
+    """Renders every chart of every section in a pool of processes, returning the
+    path to the index page linking them"""
+    os.makedirs(output, exist_ok=True)
+    jobs = plan(sections, directory, selected)
+    rendered: dict[Figure, list[str]] = {}
+    with (
+        ProcessPoolExecutor(max_workers=workers, initializer=_use_agg) as pool,
+        rich.progress.Progress(console=console) as progress,
+    ):
+        task = progress.add_task("Rendering", total=len(jobs))
+        futures = {pool.submit(render, job, output, formats): job for job in jobs}
+        for future in as_completed(futures):
+            figure = futures[future].figure
+            try:
+                rendered[figure] = future.result()
+            except Exception as e:
+                console.print(
+                    f":x: [bold red]Failed[/bold red] to render {figure.filename}: [bold red]{e}[/bold red]",
+                    emoji=True,
+                )
+            progress.advance(task)
+
+    # keep the order the charts were planned in rather than the order they finished
+    ordered = {
+        job.figure: rendered[job.figure] for job in jobs if job.figure in rendered
+    }
+    index = os.path.join(output, "index.html")
+    with open(index, "w") as file:
+        file.write(_index(sections, ordered, output))
+    return index
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import json
+import webbrowser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import parse_qs, urlparse
+
+import rich.console
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+    from analysis.pyramid import Pyramid
+
+console = rich.console.Console()
+
+# asks for the traces of the visible window whenever the x-axis is zoomed or panned
+_RELAYOUT_SCRIPT = """
+const plot = document.getElementById("{plot_id}");
+plot.on("plotly_relayout", async (event) => {
+    const range = event["xaxis.range"] || [event["xaxis.range[0]"], event["xaxis.range[1]"]];
+    if (range[0] === undefined && !event["xaxis.autorange"]) return;
+    const query = range[0] === undefined ? "" : `?start=${range[0]}&end=${range[1]}`;
+    const traces = await (await fetch(`/window${query}`)).json();
+    Plotly.restyle(plot, {x: traces.map((t) => t.x), y: traces.map((t) => t.y)},
+                   traces.map((_, i) => i));
+});
+"""
+
+
+def _window(
+    pyramids: list[Pyramid], start: Optional[float], end: Optional[float]
+) -> list[dict[str, list[float]]]:
+    traces = []
+    for pyramid in pyramids:
+        times, values = pyramid.window(start, end)
+        traces.append({"x": times.tolist(), "y": values.tolist()})
+    return traces
+
+
+def show(fig: go.Figure, pyramids: list[Pyramid]) -> None:
+    """Serves the figure locally, where the first len(pyramids) traces are drawn from
+    the level of each pyramid that matches the visible window"""
+    for trace, (times, values) in zip(fig.data, (p.window() for p in pyramids)):
+        trace.update(x=times, y=values)
+    page = fig.to_html(include_plotlyjs=True, post_script=_RELAYOUT_SCRIPT).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            if url.path == "/window":
+                query = parse_qs(url.query)
+                start, end = (
+                    float(query[bound][0]) if bound in query else None
+                    for bound in ("start", "end")
+                )
+                body = json.dumps(_window(pyramids, start, end)).encode()
+                content_type = "application/json"
+            else:
+                body, content_type = page, "text/html"
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None: ...
+
+    with ThreadingHTTPServer(("127.0.0.1", 0), Handler) as server:
+        url = f"http://127.0.0.1:{server.server_address[1]}/"
+        console.print(f"Serving the plot on [bold]{url}[/bold], press Ctrl+C to stop")
+        webbrowser.open(url)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
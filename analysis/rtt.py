@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple, Sequence
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+if TYPE_CHECKING:
+    import scapy.packet
+
+MILLISECOND = 1e-3
+
+
+class Sent(NamedTuple):
+    """The data segments a sender sent, in the order it sent them"""
+
+    times: NDArray[np.float64]
+    sequences: NDArray[np.int64]
+    tsvals: NDArray[np.int64]
+
+
+class Echoes(NamedTuple):
+    """The acknowledgements a sender received, in the order it received them"""
+
+    times: NDArray[np.float64]
+    tsecrs: NDArray[np.int64]
+
+
+class Samples(NamedTuple):
+    """An RTT sample for every segment timed, from when it was sent until the first
+    acknowledgement echoing its TSval arrived"""
+
+    times: NDArray[np.float64]
+    acknowledged: NDArray[np.float64]
+
+    @property
+    def rtts(self) -> NDArray[np.float64]:
+        return self.acknowledged - self.times
+
+    def percentile(self, percentile: float) -> float:
+        """In milliseconds, and 0 when no segment could be timed"""
+        if not self.times.size:
+            return 0.0
+        return float(np.percentile(self.rtts, percentile)) / MILLISECOND
+
+
+def _timestamps(packets: Sequence[scapy.packet.Packet]) -> NDArray[np.int64]:
+    """The TSval and TSecr of every packet as a packets x 2 array"""
+    return np.array(
+        [dict(packet["TCP"].options)["Timestamp"] for packet in packets],
+        dtype=np.int64,
+    ).reshape(len(packets), 2)
+
+
+def _times(packets: Sequence[scapy.packet.Packet]) -> NDArray[np.float64]:
+    return np.fromiter(
+        (float(packet.time) for packet in packets), np.float64, count=len(packets)
+    )
+
+
+def sent(packets: Sequence[scapy.packet.Packet]) -> Sent:
+    segments = [packet for packet in packets if len(packet["TCP"].payload)]
+    return Sent(
+        _times(segments),
+        np.fromiter((packet.seq for packet in segments), np.int64, count=len(segments)),
+        _timestamps(segments)[:, 0],
+    )
+
+
+def echoes(packets: Sequence[scapy.packet.Packet]) -> Echoes:
+    return Echoes(_times(packets), _timestamps(packets)[:, 1])
+
+
+def samples(segments: Sent, acknowledgements: Echoes) -> Samples:
+    """Joins the segments to the acknowledgements echoing their TSval by sorting and
+    searching, where segments sharing a TSval are timed from the first of them.
+
+    Following Karn's rule, a TSval is not timed when any segment carrying it was a
+    retransmission, or was retransmitted later, as the echo could belong to either
+    transmission."""
+    _, sequence, transmissions = np.unique(
+        segments.sequences, return_inverse=True, return_counts=True
+    )
+    retransmitted = transmissions[sequence] > 1
+    tsvals, first, group = np.unique(
+        segments.tsvals, return_index=True, return_inverse=True
+    )
+    ambiguous = np.bincount(group, weights=retransmitted, minlength=tsvals.size) > 0
+
+    # the stable sort keeps the acknowledgements of a TSecr in the order they arrived
+    order = np.argsort(acknowledgements.tsecrs, kind="stable")
+    tsecrs = acknowledgements.tsecrs[order]
+    if not tsecrs.size:
+        return Samples(np.empty(0), np.empty(0))
+    positions = np.minimum(np.searchsorted(tsecrs, tsvals), tsecrs.size - 1)
+    echoed = acknowledgements.times[order[positions]]
+    times = segments.times[first]
+    timed = (tsecrs[positions] == tsvals) & ~ambiguous & (echoed >= times)
+
+    chronological = np.argsort(times[timed], kind="stable")
+    return Samples(times[timed][chronological], echoed[timed][chronological])
+
+
+def during(timed: Samples, events: NDArray[np.float64]) -> NDArray[np.bool_]:
+    """Whether any of the sorted events happened while every sample was in flight"""
+    return np.searchsorted(events, timed.acknowledged, side="right") > np.searchsorted(
+        events, timed.times, side="left"
+    )
+
+
+def inflation(timed: Samples, reroutes: ArrayLike) -> float:
+    """The median RTT of the samples in flight while packets of the flow were being
+    rerouted over the median RTT of the others, 1 when either is missing"""
+    rerouted = during(timed, np.sort(np.asarray(reroutes, dtype=np.float64)))
+    rtts = timed.rtts
+    if rerouted.all() or not rerouted.any():
+        return 1.0
+    return float(np.median(rtts[rerouted]) / np.median(rtts[~rerouted]))
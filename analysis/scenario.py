@@ -1,34 +1,42 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from functools import cached_property, lru_cache, wraps
-from typing import Callable, Concatenate, Optional, ParamSpec, override
-
+from typing import TYPE_CHECKING, Callable, Concatenate, Optional, ParamSpec, TypeVar
 
 import pydantic
 import rich.progress
-import scapy.packet
-
-from analysis import discovery, statistic
-from analysis.graph import MultiFlowPlot, Plot
-from analysis.pcap import Communication, PcapFile
-from analysis.trace_analyzer.dst.reordered_packets import (
-    DroppedRetransmittedPacketCapture,
-    SpuriousOOORTOCapture,
-    SpuriousRetransmissionAnalyzer,
-    congestion_windows,
-    hashable_packet,
+
+from analysis import discovery, goodput, profiling, reordering, rtt, statistic
+from analysis._lazy import lazy_import
+from analysis.classification import SENDER_CONDITIONS
+from analysis.graph import MultiFlowPlot, Plot, PlotColumns
+from analysis.window import Window
+
+if TYPE_CHECKING:
+    import numpy as np
+    from numpy.typing import NDArray
+
+    from analysis.pcap import Communication, PcapFile
+    from analysis.trace_analyzer.source.flow_replay import FlowReplay
+
+# the analyzers pull in scapy and pyshark, which only runs that miss the cache need
+flow_replay = lazy_import("analysis.trace_analyzer.source.flow_replay")
+inspection = lazy_import("analysis.inspection")
+pcap_files = lazy_import("analysis.pcap")
+reordered_packets = lazy_import("analysis.trace_analyzer.dst.reordered_packets")
+replayer = lazy_import("analysis.trace_analyzer.source.replayer")
+retransmission_timeout = lazy_import(
+    "analysis.trace_analyzer.source.retransmission_timeout"
 )
-from analysis.trace_analyzer.source.packet_capture import PacketCapture
-from analysis.trace_analyzer.source.replayer import TcpSourceReplayer
-from analysis.trace_analyzer.source.socket_state import SocketState
-from analysis.trace_analyzer.source.spurious_sack_fast_transmit import (
-    TotalTimeInRecovery,
+spurious_sack_fast_transmit = lazy_import(
+    "analysis.trace_analyzer.source.spurious_sack_fast_transmit"
 )
 
 
 P = ParamSpec("P")
+S = TypeVar("S", statistic.Statistic, statistic.MultiFlowStatistic)
 console = rich.console.Console()
 
 
@@ -47,27 +55,9 @@ def extract_numerical_value_from_string(string: str) -> float:
         return float(string)
 
 
-@dataclass
-class RTOWaitingForUnsent(PacketCapture):
-    wait_time: float = field(default_factory=float)
-
-    @override
-    def on_retransmission_timeout(
-        self, packet: scapy.packet.Packet, state: SocketState
-    ) -> None:
-        if state.high_tx_mark < 997_000:
-            self.wait_time += float(packet.time) - state.last_send_timestamp
-
-
-@dataclass
-class WaitTimeAfterRTO(PacketCapture):
-    wait_time: float = field(default_factory=float)
-
-    @override
-    def on_retransmission_timeout(
-        self, packet: scapy.packet.Packet, state: SocketState
-    ) -> None:
-        self.wait_time += float(packet.time) - state.last_send_timestamp
+def extract_axis_value(variable: str, axis: int = 0) -> float:
+    # multi-variable runs are stored as the values joined by underscores
+    return extract_numerical_value_from_string(variable.split("_")[axis])
 
 
 @dataclass(frozen=True)
@@ -76,6 +66,9 @@ class VariableRun:
     option: discovery.Options
     seed: discovery.Seed
     variables: tuple[discovery.Variable, ...]
+    axis: int = 0
+    # every capture of the run is only read within the window
+    window: Window = Window()
 
     @property
     def path(self) -> str:
@@ -85,7 +78,9 @@ class VariableRun:
     def pcap(
         self, variable: discovery.Variable, device: discovery.Devices, link: int
     ) -> PcapFile:
-        return PcapFile(f"{self.path}/{variable}/-{device}-{link}.pcap")
+        return pcap_files.PcapFile(
+            f"{self.path}/{variable}/-{device}-{link}.pcap", self.window
+        )
 
     @cached_property
     def number_of_senders(self) -> int:
@@ -95,7 +90,9 @@ class VariableRun:
     def senders(self) -> dict[discovery.Variable, list[PcapFile]]:
         return {
             variable: [
-                PcapFile(os.path.join(self.path, variable, file))
+                pcap_files.PcapFile(
+                    os.path.join(self.path, variable, file), self.window
+                )
                 for file in discovery.discover_senders(
                     self.directory, self.option, self.seed, variable
                 )
@@ -115,6 +112,9 @@ class VariableRun:
     def cwnd_filename(self, variable: str, sender: int) -> str:
         return f"{self.path}/{variable}/n{sender}.dat"
 
+    def queue_filename(self, variable: str, queue: discovery.Queues) -> str:
+        return f"{self.path}/{variable}/{queue}.dat"
+
     def packet_loss_at(self, variable: str) -> float:
         addresses = self.ip_addresses(variable)
         source_pcap = self.pcap(variable, "TrafficSender0", 1)
@@ -127,7 +127,9 @@ class VariableRun:
 
     def calculate_average_congestion_window(self, variable: str, sender: int) -> float:
         # [(0, 10), (1, 20), (2, 30)] => (10 + 20) / 2 = 15
-        cwnds = congestion_windows(self.cwnd_filename(variable, sender))
+        cwnds = reordered_packets.congestion_windows(
+            self.cwnd_filename(variable, sender)
+        )
         return (
             sum(
                 (second[0] - first[0]) * first[1]
@@ -137,8 +139,8 @@ class VariableRun:
         )
 
     def calculate_rto_wait_time_for_unsent(self, variable: str) -> float:
-        capture = RTOWaitingForUnsent()
-        TcpSourceReplayer(
+        capture = retransmission_timeout.RTOWaitingForUnsent()
+        replayer.TcpSourceReplayer(
             self.pcap(variable, "TrafficSender0", 1),
             *self.ip_addresses(variable),
             capture,
@@ -146,8 +148,8 @@ class VariableRun:
         return capture.wait_time
 
     def calculate_rto_wait_time(self, variable: str) -> float:
-        capture = WaitTimeAfterRTO()
-        TcpSourceReplayer(
+        capture = retransmission_timeout.WaitTimeAfterRTO()
+        replayer.TcpSourceReplayer(
             self.pcap(variable, "TrafficSender0", 1),
             *self.ip_addresses(variable),
             capture,
@@ -155,8 +157,8 @@ class VariableRun:
         return capture.wait_time
 
     def calculate_recovery_time(self, variable: str) -> float:
-        capture = TotalTimeInRecovery()
-        TcpSourceReplayer(
+        capture = spurious_sack_fast_transmit.TotalTimeInRecovery()
+        replayer.TcpSourceReplayer(
             self.pcap(variable, "TrafficSender0", 1),
             *self.ip_addresses(variable),
             capture,
@@ -210,8 +212,8 @@ class VariableRun:
         return (self.udp_packets_rerouted_at(variable) / udp_packets_sent) * 100
 
     def calculate_dropped_retransmitted_packets(self, variable: str) -> int:
-        dropped_packets_capture = DroppedRetransmittedPacketCapture()
-        TcpSourceReplayer(
+        dropped_packets_capture = reordered_packets.DroppedRetransmittedPacketCapture()
+        replayer.TcpSourceReplayer(
             self.pcap(variable, "TrafficSender0", 1),
             *self.ip_addresses(variable),
             dropped_packets_capture,
@@ -226,15 +228,17 @@ class VariableRun:
     def calculate_longest_number_of_packets_spuriously_retransmitted_before_rto(
         self, variable: str
     ) -> int:
-        spur_ooo_packets = SpuriousRetransmissionAnalyzer(
+        spur_ooo_packets = reordered_packets.SpuriousRetransmissionAnalyzer(
             self.pcap(variable, "TrafficSender0", 1),
             self.pcap(variable, "Receiver", 1),
         ).filter_packets(*self.ip_addresses(variable))
 
-        burst_capture = SpuriousOOORTOCapture(
-            spurious_ooo_packets=[hashable_packet(p) for p in spur_ooo_packets]
+        burst_capture = reordered_packets.SpuriousOOORTOCapture(
+            spurious_ooo_packets=[
+                reordered_packets.hashable_packet(p) for p in spur_ooo_packets
+            ]
         )
-        TcpSourceReplayer(
+        replayer.TcpSourceReplayer(
             self.pcap(variable, "TrafficSender0", 1),
             *self.ip_addresses(variable),
             burst_capture,
@@ -243,15 +247,17 @@ class VariableRun:
         return burst_capture.longest_spurious_ooo_burst_count
 
     def calculate_spurious_retransmissions_from_reordering(self, variable: str) -> int:
-        spur_ooo_packets = SpuriousRetransmissionAnalyzer(
+        spur_ooo_packets = reordered_packets.SpuriousRetransmissionAnalyzer(
             self.pcap(variable, "TrafficSender0", 1),
             self.pcap(variable, "Receiver", 1),
         ).filter_packets(*self.ip_addresses(variable))
 
-        burst_capture = SpuriousOOORTOCapture(
-            spurious_ooo_packets=[hashable_packet(p) for p in spur_ooo_packets]
+        burst_capture = reordered_packets.SpuriousOOORTOCapture(
+            spurious_ooo_packets=[
+                reordered_packets.hashable_packet(p) for p in spur_ooo_packets
+            ]
         )
-        TcpSourceReplayer(
+        replayer.TcpSourceReplayer(
             self.pcap(variable, "TrafficSender0", 1),
             *self.ip_addresses(variable),
             burst_capture,
@@ -260,12 +266,12 @@ class VariableRun:
         return burst_capture.longest_spurious_ooo_burst_count
 
     def _map_multi_flow_plots(
-        self, method: Callable[[str], list[float]]
+        self, method: Callable[[discovery.Variable], list[float]]
     ) -> list[MultiFlowPlot]:
         return sorted(
             (
                 MultiFlowPlot(
-                    variable=extract_numerical_value_from_string(variable),
+                    variable=extract_axis_value(variable, self.axis),
                     value=method(variable),
                 )
                 for variable in self.variables
@@ -273,63 +279,57 @@ class VariableRun:
             key=lambda plot: plot.variable,
         )
 
-    def _map_plots(self, method: Callable[[str], float]) -> list[Plot]:
-        return sorted(
-            (
-                Plot(
-                    variable=extract_numerical_value_from_string(variable),
-                    value=method(variable),
-                )
-                for variable in self.variables
-            ),
-            key=lambda plot: plot.variable,
+    def _map_plots(self, method: Callable[[discovery.Variable], float]) -> PlotColumns:
+        return PlotColumns.from_pairs(
+            [extract_axis_value(variable, self.axis) for variable in self.variables],
+            [method(variable) for variable in self.variables],
         )
 
-    def packet_rerouted(self) -> list[Plot]:
+    def packet_rerouted(self) -> PlotColumns:
         return self._map_plots(self.packets_rerouted_at)
 
-    def packet_rerouted_percentage(self) -> list[Plot]:
+    def packet_rerouted_percentage(self) -> PlotColumns:
         return self._map_plots(self.packets_rerouted_percentage_at)
 
-    def spurious_retransmissions(self) -> list[Plot]:
+    def spurious_retransmissions(self) -> PlotColumns:
         return self._map_plots(
             lambda variable: len(
-                SpuriousRetransmissionAnalyzer(
+                reordered_packets.SpuriousRetransmissionAnalyzer(
                     self.pcap(variable, "TrafficSender0", 1),
                     self.pcap(variable, "Receiver", 1),
                 ).filter_packets(*self.ip_addresses(variable))
             )
         )
 
-    def spurious_retransmissions_from_reordering(self) -> list[Plot]:
+    def spurious_retransmissions_from_reordering(self) -> PlotColumns:
         return self._map_plots(self.calculate_spurious_retransmissions_from_reordering)
 
     def longest_number_of_packets_spuriously_retransmitted_before_rto(
         self,
-    ) -> list[Plot]:
+    ) -> PlotColumns:
         return self._map_plots(
             self.calculate_longest_number_of_packets_spuriously_retransmitted_before_rto
         )
 
-    def packet_loss(self) -> list[Plot]:
+    def packet_loss(self) -> PlotColumns:
         return self._map_plots(self.packet_loss_at)
 
-    def packets_lost(self) -> list[Plot]:
+    def packets_lost(self) -> PlotColumns:
         return self._map_plots(self.packets_lost_at)
 
-    def udp_lost(self) -> list[Plot]:
+    def udp_lost(self) -> PlotColumns:
         return self._map_plots(self.udp_packets_lost_at)
 
-    def udp_loss(self) -> list[Plot]:
+    def udp_loss(self) -> PlotColumns:
         return self._map_plots(self.udp_packets_loss_at)
 
-    def udp_rerouted(self) -> list[Plot]:
+    def udp_rerouted(self) -> PlotColumns:
         return self._map_plots(self.udp_packets_rerouted_at)
 
-    def udp_rerouted_percentage(self) -> list[Plot]:
+    def udp_rerouted_percentage(self) -> PlotColumns:
         return self._map_plots(self.udp_packets_rerouted_percentage_at)
 
-    def packet_reordering(self) -> list[Plot]:
+    def packet_reordering(self) -> PlotColumns:
         return self._map_plots(
             lambda variable: self.pcap(
                 variable, "Receiver", 1
@@ -338,31 +338,43 @@ class VariableRun:
             )
         )
 
-    def total_time_in_recovery(self) -> list[Plot]:
+    def total_time_in_recovery(self) -> PlotColumns:
         return self._map_plots(self.calculate_recovery_time)
 
-    def rto_wait_time_for_unsent(self) -> list[Plot]:
+    def classified_packets(self, condition: str) -> PlotColumns:
+        return self._map_plots(
+            lambda variable: inspection.sender_classification(self, variable, 0).count(
+                SENDER_CONDITIONS[condition]
+            )
+        )
+
+    def rto_wait_time_for_unsent(self) -> PlotColumns:
         return self._map_plots(self.calculate_rto_wait_time_for_unsent)
 
-    def rto_wait_time(self) -> list[Plot]:
+    def rto_wait_time(self) -> PlotColumns:
         return self._map_plots(self.calculate_rto_wait_time)
 
-    def dropped_retransmitted_packets(self) -> list[Plot]:
+    def dropped_retransmitted_packets(self) -> PlotColumns:
         return self._map_plots(self.calculate_dropped_retransmitted_packets)
 
     @lru_cache
     def ip_addresses(self, variable: discovery.Variable) -> Communication:
-        # TODO: replace with a method to handle multiple flows
+        # TODO: the statistics read through these addresses only cover the flow of
+        # TrafficSender0: packet loss, the rerouted percentage, reordering, spurious
+        # retransmissions, the retransmissions spurious before an RTO and time, as
+        # well as the analyzers of metrics.py and the true bytes in flight of
+        # inspection.py. Those with a *_multi_flow counterpart, which goes through
+        # flow_ip_addresses and the demultiplexed captures, cover every flow
         return self.pcap(variable, "TrafficSender0", 1).first_addresses
 
-    def time(self) -> list[Plot]:
+    def time(self) -> PlotColumns:
         return self._map_plots(
             lambda variable: self.pcap(variable, "Receiver", 1).flow_completion_time(
                 *self.ip_addresses(variable)
             )
         )
 
-    def average_congestion_window(self) -> list[Plot]:
+    def average_congestion_window(self) -> PlotColumns:
         return self._map_plots(
             lambda variable: self.calculate_average_congestion_window(variable, 0)
         )
@@ -372,6 +384,200 @@ class VariableRun:
         results = [sender.first_addresses for sender in self.senders[variable]]
         return results
 
+    @lru_cache
+    def flow_replays(self, variable: discovery.Variable) -> list[FlowReplay]:
+        # every sender is replayed once for all of the replay-based metrics
+        return [
+            flow_replay.FlowReplay.replay(sender, *addresses)
+            for sender, addresses in zip(
+                self.senders[variable], self.flow_ip_addresses(variable), strict=True
+            )
+        ]
+
+    @lru_cache
+    def goodput_timeline(
+        self,
+        variable: discovery.Variable,
+        width: float = goodput.BUCKET_WIDTH,
+        throughput: bool = False,
+    ) -> goodput.Timeline:
+        """The rate of every flow at the receiver, counting the bytes it delivered or,
+        for the throughput, every payload byte that reached it"""
+        receiver = self.pcap(variable, "Receiver", 1)
+        return goodput.Timeline.from_transfers(
+            [
+                (
+                    goodput.received(receiver.packets_between(source, destination))
+                    if throughput
+                    else goodput.delivered(
+                        receiver.packets_between(destination, source)
+                    )
+                )
+                for source, destination in self.flow_ip_addresses(variable)
+            ],
+            width,
+        )
+
+    def peak_goodput_multi_flow(self) -> list[MultiFlowPlot]:
+        return self._map_multi_flow_plots(
+            lambda variable: (
+                self.goodput_timeline(variable).peak / goodput.MEGABIT
+            ).tolist()
+        )
+
+    def median_goodput_multi_flow(self) -> list[MultiFlowPlot]:
+        return self._map_multi_flow_plots(
+            lambda variable: (
+                self.goodput_timeline(variable).median / goodput.MEGABIT
+            ).tolist()
+        )
+
+    def goodput_fairness(self) -> PlotColumns:
+        return self._map_plots(
+            lambda variable: self.goodput_timeline(variable).mean_fairness()
+        )
+
+    @lru_cache
+    def rtt_samples(self, variable: discovery.Variable) -> list[rtt.Samples]:
+        return [
+            rtt.samples(
+                rtt.sent(sender.packets_between(source, destination)),
+                rtt.echoes(sender.packets_between(destination, source)),
+            )
+            for sender, (source, destination) in zip(
+                self.senders[variable], self.flow_ip_addresses(variable), strict=True
+            )
+        ]
+
+    def rtt_multi_flow(self) -> list[MultiFlowPlot]:
+        # every sample of every flow, so that the percentiles are over the packets
+        return self._map_multi_flow_plots(
+            lambda variable: [
+                sample
+                for samples in self.rtt_samples(variable)
+                for sample in (samples.rtts / rtt.MILLISECOND).tolist()
+            ]
+        )
+
+    def median_rtt_multi_flow(self) -> list[MultiFlowPlot]:
+        return self._map_multi_flow_plots(
+            lambda variable: [
+                samples.percentile(50) for samples in self.rtt_samples(variable)
+            ]
+        )
+
+    def p95_rtt_multi_flow(self) -> list[MultiFlowPlot]:
+        return self._map_multi_flow_plots(
+            lambda variable: [
+                samples.percentile(95) for samples in self.rtt_samples(variable)
+            ]
+        )
+
+    def rtt_inflation_multi_flow(self) -> list[MultiFlowPlot]:
+        def inflation(variable: discovery.Variable) -> list[float]:
+            router = self.pcap(variable, "Router03", 2)
+            return [
+                rtt.inflation(
+                    samples,
+                    [float(pkt.time) for pkt in router.packets_from(addresses.source)],
+                )
+                for samples, addresses in zip(
+                    self.rtt_samples(variable),
+                    self.flow_ip_addresses(variable),
+                    strict=True,
+                )
+            ]
+
+        return self._map_multi_flow_plots(inflation)
+
+    @lru_cache
+    def arrivals(self, variable: discovery.Variable) -> list[NDArray[np.int64]]:
+        receiver = self.pcap(variable, "Receiver", 1)
+        return [
+            reordering.arrivals(receiver.packets_between(source, destination))
+            for source, destination in self.flow_ip_addresses(variable)
+        ]
+
+    def reorder_extent(self) -> list[MultiFlowPlot]:
+        # the extent of every reordered packet of every flow
+        return self._map_multi_flow_plots(
+            lambda variable: [
+                extent
+                for sequences in self.arrivals(variable)
+                for extent in reordering.extents(sequences).tolist()
+            ]
+        )
+
+    def reorder_displacement(self) -> list[MultiFlowPlot]:
+        return self._map_multi_flow_plots(
+            lambda variable: [
+                displacement
+                for sequences in self.arrivals(variable)
+                for displacement in reordering.displacements(sequences).tolist()
+            ]
+        )
+
+    def displaced_multi_flow(self) -> list[MultiFlowPlot]:
+        return self._map_multi_flow_plots(
+            lambda variable: [
+                reordering.displaced(sequences) for sequences in self.arrivals(variable)
+            ]
+        )
+
+    def packets_lost_per_flow(self, variable: discovery.Variable) -> list[float]:
+        receiver = self.pcap(variable, "Receiver", 1)
+        return [
+            sender.number_of_packets_from_source(addresses.source)
+            - receiver.number_of_packets_from_source(addresses.source)
+            for sender, addresses in zip(
+                self.senders[variable], self.flow_ip_addresses(variable), strict=True
+            )
+        ]
+
+    def packets_lost_multi_flow(self) -> list[MultiFlowPlot]:
+        return self._map_multi_flow_plots(self.packets_lost_per_flow)
+
+    def packets_rerouted_multi_flow(self) -> list[MultiFlowPlot]:
+        return self._map_multi_flow_plots(
+            lambda variable: [
+                self.pcap(variable, "Router03", 2).number_of_packets_from_source(
+                    addresses.source
+                )
+                for addresses in self.flow_ip_addresses(variable)
+            ]
+        )
+
+    def total_time_in_recovery_multi_flow(self) -> list[MultiFlowPlot]:
+        return self._map_multi_flow_plots(
+            lambda variable: [
+                flow.recovery.total_time_in_recovery
+                for flow in self.flow_replays(variable)
+            ]
+        )
+
+    def rto_wait_time_multi_flow(self) -> list[MultiFlowPlot]:
+        return self._map_multi_flow_plots(
+            lambda variable: [
+                flow.rto_wait_time.wait_time for flow in self.flow_replays(variable)
+            ]
+        )
+
+    def rto_wait_time_for_unsent_multi_flow(self) -> list[MultiFlowPlot]:
+        return self._map_multi_flow_plots(
+            lambda variable: [
+                flow.rto_wait_time_for_unsent.wait_time
+                for flow in self.flow_replays(variable)
+            ]
+        )
+
+    def dropped_retransmitted_packets_multi_flow(self) -> list[MultiFlowPlot]:
+        return self._map_multi_flow_plots(
+            lambda variable: [
+                len(flow.dropped_retransmitted.dropped_packets)
+                for flow in self.flow_replays(variable)
+            ]
+        )
+
     def time_multi_flow(self) -> list[MultiFlowPlot]:
         ip_address = self.ip_addresses(self.variables[0])
 
@@ -384,7 +590,7 @@ class VariableRun:
 
         return self._map_multi_flow_plots(get_flows)
 
-    def average_time(self) -> list[Plot]:
+    def average_time(self) -> PlotColumns:
         ip_addresses = self.ip_addresses(self.variables[0])
 
         return self._map_plots(
@@ -396,7 +602,7 @@ class VariableRun:
             / self.number_of_senders
         )
 
-    def max_flow_time(self) -> list[Plot]:
+    def max_flow_time(self) -> PlotColumns:
         ip_addresses = self.ip_addresses(self.variables[0])
 
         return self._map_plots(
@@ -408,20 +614,17 @@ class VariableRun:
         )
 
 
-def _cache_statistic(
-    property: str,
+def _cache(
+    property: str, kind: type[S]
 ) -> Callable[
-    [Callable[Concatenate[Scenario, P], statistic.Statistic]],
-    Callable[Concatenate[Scenario, P], statistic.Statistic],
+    [Callable[Concatenate[Scenario, P], S]], Callable[Concatenate[Scenario, P], S]
 ]:
     def decorator(
-        func: Callable[Concatenate[Scenario, P], statistic.Statistic],
-    ) -> Callable[Concatenate[Scenario, P], statistic.Statistic]:
+        func: Callable[Concatenate[Scenario, P], S],
+    ) -> Callable[Concatenate[Scenario, P], S]:
         @wraps(func)
-        def wrapper(
-            self: Scenario, *args: P.args, **kwargs: P.kwargs
-        ) -> statistic.Statistic:
-            if stat := self._load_statistic(property):
+        def wrapper(self: Scenario, *args: P.args, **kwargs: P.kwargs) -> S:
+            if stat := self._load_statistic(property, kind):
                 console.print(
                     f":zap: [bold yellow]Loaded statistics[/bold yellow] for {self.option}'s {property} cache",
                     emoji=True,
@@ -436,8 +639,42 @@ def _cache_statistic(
     return decorator
 
 
-class CachedData(pydantic.BaseModel):
-    data: dict[discovery.Seed, list[Plot]]
+def _cache_statistic(
+    property: str,
+) -> Callable[
+    [Callable[Concatenate[Scenario, P], statistic.Statistic]],
+    Callable[Concatenate[Scenario, P], statistic.Statistic],
+]:
+    return _cache(property, statistic.Statistic)
+
+
+def _cache_multi_flow_statistic(
+    property: str,
+) -> Callable[
+    [Callable[Concatenate[Scenario, P], statistic.MultiFlowStatistic]],
+    Callable[Concatenate[Scenario, P], statistic.MultiFlowStatistic],
+]:
+    return _cache(property, statistic.MultiFlowStatistic)
+
+
+def _classified_statistic(condition: str) -> cached_property[statistic.Statistic]:
+    """The packets of the first sender labelled by condition, one property for each
+    so that the daemon serves them like any other statistic"""
+
+    def classified_packets(run: VariableRun) -> PlotColumns:
+        return run.classified_packets(condition)
+
+    classified_packets.__name__ = f"classified_{condition}"
+
+    @_cache_statistic(f"classified_{condition}")
+    def compute(self: Scenario) -> statistic.Statistic:
+        return self._map_statistic(classified_packets)
+
+    return cached_property(compute)
+
+
+class ExportedStatistic(pydantic.BaseModel):
+    data: dict[discovery.Seed, list[Plot]] | dict[discovery.Seed, list[MultiFlowPlot]]
 
 
 # TODO: simplify the storage of results mechanism, and allow for joining of multiple results
@@ -447,6 +684,8 @@ class Scenario:
     option: discovery.Options
     seeds: list[discovery.Seed]
     variables: tuple[discovery.Variable, ...]
+    axis: int = 0
+    window: Window = Window()
 
     @cached_property
     def path(self) -> str:
@@ -457,23 +696,28 @@ class Scenario:
         return f".analysis_cache/{self.directory}/{self.option}"
 
     def _cache_file(self, property: str) -> str:
-        return f"{self._cache_dir}_{property}.json"
+        if self.axis:
+            return (
+                f"{self._cache_dir}_{property}_axis{self.axis}{self.window.suffix}.npz"
+            )
+        return f"{self._cache_dir}_{property}{self.window.suffix}.npz"
 
-    def _store_results(self, property: str, stat: statistic.Statistic) -> None:
+    def _store_results(
+        self,
+        property: str,
+        stat: statistic.Statistic | statistic.MultiFlowStatistic,
+    ) -> None:
         if not os.path.exists(self._cache_dir):
             os.makedirs(self._cache_dir)
 
-        with open(self._cache_file(property), "w") as file:
-            try:
-                file.write(
-                    CachedData.model_validate({"data": stat.data}).model_dump_json()
-                )
-            except Exception as e:
-                console.print(
-                    f":x:  [bold red]Failed[/bold red] to store results in cache for {property}: [bold red]{e}[/bold red]",
-                )
+        try:
+            stat.store(self._cache_file(property), self._points)
+        except Exception as e:
+            console.print(
+                f":x:  [bold red]Failed[/bold red] to store results in cache for {property}: [bold red]{e}[/bold red]",
+            )
 
-    def _load_statistic(self, property: str) -> Optional[statistic.Statistic]:
+    def _load_statistic(self, property: str, kind: type[S]) -> Optional[S]:
         filename = self._cache_file(property)
 
         if not os.path.exists(filename):
@@ -483,77 +727,68 @@ class Scenario:
             os.remove(filename)
             return None
 
-        with open(filename, "r") as cache_file:
-            try:
-                data = CachedData.model_validate_json(cache_file.read()).data
-            except Exception as e:
-                console.print(
-                    f":x:  [bold red]Failed[/bold red] to load results from cache for {property}: [bold red]{e}[/bold red]",
-                )
-                os.remove(filename)
-            else:
-                if not set(self.seeds).issubset(set(data.keys())):
-                    return None  # Cache is outdated
-
-                numerical_variables = {
-                    extract_numerical_value_from_string(variable)
-                    for variable in self.variables
-                }
-                if any(
-                    not numerical_variables.issubset(
-                        {plot.variable for plot in data[seed]}
-                    )
-                    for seed in data
-                ):
-                    # missing variables
-                    return None
-                return statistic.Statistic(
-                    {
-                        discovery.Seed(seed): [
-                            plot
-                            for plot in data[seed]
-                            if plot.variable in numerical_variables
-                        ]
-                        for seed in self.seeds
-                    }
-                )
+        try:
+            # None when the cache is missing seeds or variables
+            return kind.load(filename, self.seeds, self._points)
+        except Exception as e:
+            console.print(
+                f":x:  [bold red]Failed[/bold red] to load results from cache for {property}: [bold red]{e}[/bold red]",
+            )
+            os.remove(filename)
+            return None
 
-        return None
+    @cached_property
+    def _points(self) -> list[discovery.Variable]:
+        """The variables in the order of the columns of every statistic, by their value
+        on the axis, which design points with several variables can share"""
+        return sorted(
+            self.variables,
+            key=lambda variable: extract_axis_value(variable, self.axis),
+        )
 
     @cached_property
     def runs(self) -> dict[discovery.Seed, VariableRun]:
         return {
-            seed: VariableRun(self.directory, self.option, seed, self.variables)
+            seed: VariableRun(
+                self.directory,
+                self.option,
+                seed,
+                self.variables,
+                self.axis,
+                self.window,
+            )
             for seed in self.seeds
         }
 
     def _map_statistic(
-        self, method: Callable[[VariableRun], list[Plot]]
+        self, method: Callable[[VariableRun], PlotColumns]
     ) -> statistic.Statistic:
-        return statistic.Statistic(
-            {
-                seed: method(run)
-                for seed, run in rich.progress.track(
-                    self.runs.items(),
-                    console=console,
-                    description=f"Calculating {method.__name__} for {self.option}",
-                )
-            }
-        )
+        with profiling.stage(f"statistic {method.__name__}"):
+            return statistic.Statistic.from_columns(
+                {
+                    seed: method(run)
+                    for seed, run in rich.progress.track(
+                        self.runs.items(),
+                        console=console,
+                        description=f"Calculating {method.__name__} for {self.option}",
+                    )
+                }
+            )
 
     def _map_multi_flow_statistic(
         self, method: Callable[[VariableRun], list[MultiFlowPlot]]
     ) -> statistic.MultiFlowStatistic:
-        return statistic.MultiFlowStatistic(
-            {
-                seed: method(run)
-                for seed, run in rich.progress.track(
-                    self.runs.items(),
-                    console=console,
-                    description=f"Calculating {method.__name__} for {self.option}",
-                )
-            }
-        )
+        with profiling.stage(f"statistic {method.__name__}"):
+            return statistic.MultiFlowStatistic.from_plots(
+                {
+                    seed: method(run)
+                    for seed, run in rich.progress.track(
+                        self.runs.items(),
+                        console=console,
+                        description=f"Calculating {method.__name__} for {self.option}",
+                    )
+                }
+            )
 
     @cached_property
     @_cache_statistic("average_time")
@@ -571,9 +806,102 @@ class Scenario:
         return self._map_statistic(VariableRun.time)
 
     @cached_property
+    @_cache_multi_flow_statistic("times_multi_flow")
     def times_multi_flow(self) -> statistic.MultiFlowStatistic:
         return self._map_multi_flow_statistic(VariableRun.time_multi_flow)
 
+    @cached_property
+    def flow_fairness(self) -> statistic.Statistic:
+        return self.times_multi_flow.fairness
+
+    @cached_property
+    @_cache_multi_flow_statistic("peak_goodput_multi_flow")
+    def peak_goodput_multi_flow(self) -> statistic.MultiFlowStatistic:
+        return self._map_multi_flow_statistic(VariableRun.peak_goodput_multi_flow)
+
+    @cached_property
+    @_cache_multi_flow_statistic("median_goodput_multi_flow")
+    def median_goodput_multi_flow(self) -> statistic.MultiFlowStatistic:
+        return self._map_multi_flow_statistic(VariableRun.median_goodput_multi_flow)
+
+    @cached_property
+    @_cache_statistic("goodput_fairness")
+    def goodput_fairness(self) -> statistic.Statistic:
+        return self._map_statistic(VariableRun.goodput_fairness)
+
+    @cached_property
+    @_cache_multi_flow_statistic("rtt_multi_flow")
+    def rtt_multi_flow(self) -> statistic.MultiFlowStatistic:
+        return self._map_multi_flow_statistic(VariableRun.rtt_multi_flow)
+
+    @cached_property
+    @_cache_multi_flow_statistic("median_rtt_multi_flow")
+    def median_rtt_multi_flow(self) -> statistic.MultiFlowStatistic:
+        return self._map_multi_flow_statistic(VariableRun.median_rtt_multi_flow)
+
+    @cached_property
+    @_cache_multi_flow_statistic("p95_rtt_multi_flow")
+    def p95_rtt_multi_flow(self) -> statistic.MultiFlowStatistic:
+        return self._map_multi_flow_statistic(VariableRun.p95_rtt_multi_flow)
+
+    @cached_property
+    @_cache_multi_flow_statistic("rtt_inflation_multi_flow")
+    def rtt_inflation_multi_flow(self) -> statistic.MultiFlowStatistic:
+        return self._map_multi_flow_statistic(VariableRun.rtt_inflation_multi_flow)
+
+    @cached_property
+    @_cache_multi_flow_statistic("reorder_extent")
+    def reorder_extent(self) -> statistic.MultiFlowStatistic:
+        return self._map_multi_flow_statistic(VariableRun.reorder_extent)
+
+    @cached_property
+    @_cache_multi_flow_statistic("reorder_displacement")
+    def reorder_displacement(self) -> statistic.MultiFlowStatistic:
+        return self._map_multi_flow_statistic(VariableRun.reorder_displacement)
+
+    @cached_property
+    @_cache_multi_flow_statistic("displaced_multi_flow")
+    def displaced_multi_flow(self) -> statistic.MultiFlowStatistic:
+        return self._map_multi_flow_statistic(VariableRun.displaced_multi_flow)
+
+    @cached_property
+    @_cache_multi_flow_statistic("packets_lost_multi_flow")
+    def packets_lost_multi_flow(self) -> statistic.MultiFlowStatistic:
+        return self._map_multi_flow_statistic(VariableRun.packets_lost_multi_flow)
+
+    @cached_property
+    @_cache_multi_flow_statistic("packets_rerouted_multi_flow")
+    def packets_rerouted_multi_flow(self) -> statistic.MultiFlowStatistic:
+        return self._map_multi_flow_statistic(VariableRun.packets_rerouted_multi_flow)
+
+    @cached_property
+    @_cache_multi_flow_statistic("total_recovery_time_multi_flow")
+    def total_recovery_time_multi_flow(self) -> statistic.MultiFlowStatistic:
+        return self._map_multi_flow_statistic(
+            VariableRun.total_time_in_recovery_multi_flow
+        )
+
+    @cached_property
+    @_cache_multi_flow_statistic("rto_wait_time_multi_flow")
+    def rto_wait_time_multi_flow(self) -> statistic.MultiFlowStatistic:
+        return self._map_multi_flow_statistic(VariableRun.rto_wait_time_multi_flow)
+
+    @cached_property
+    @_cache_multi_flow_statistic("rto_wait_time_for_unsent_multi_flow")
+    def rto_wait_time_for_unsent_multi_flow(self) -> statistic.MultiFlowStatistic:
+        return self._map_multi_flow_statistic(
+            VariableRun.rto_wait_time_for_unsent_multi_flow
+        )
+
+    @cached_property
+    @_cache_multi_flow_statistic("dropped_retransmitted_packets_multi_flow")
+    def dropped_retransmitted_packets_multi_flow(
+        self,
+    ) -> statistic.MultiFlowStatistic:
+        return self._map_multi_flow_statistic(
+            VariableRun.dropped_retransmitted_packets_multi_flow
+        )
+
     @cached_property
     @_cache_statistic("packets_lost")
     def packets_lost(self) -> statistic.Statistic:
@@ -664,3 +992,10 @@ class Scenario:
     @_cache_statistic("total_recovery_time")
     def total_recovery_time(self) -> statistic.Statistic:
         return self._map_statistic(VariableRun.total_time_in_recovery)
+
+    classified_spurious_ooo = _classified_statistic("spurious_ooo")
+    classified_single_dup_ack = _classified_statistic("single_dup_ack")
+    classified_sack_fast_retransmit = _classified_statistic("sack_fast_retransmit")
+    classified_fast_retransmission = _classified_statistic("fast_retransmission")
+    classified_dropped = _classified_statistic("dropped")
+    classified_out_of_order = _classified_statistic("out_of_order")
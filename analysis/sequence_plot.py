@@ -1,11 +1,20 @@
-from dataclasses import field
-from typing import Callable
+from __future__ import annotations
 
-from scapy.all import dataclass
-import scapy.packet
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple, Optional
 
+import numpy as np
 import plotly.graph_objects as go
-from analysis.trace_analyzer.analyzer import PacketAnalyzer
+from numpy.typing import NDArray
+
+from analysis import decimation, resampling
+
+if TYPE_CHECKING:
+    import scapy.packet
+
+    from analysis.classification import Classification
+    from analysis.goodput import Band
+    from analysis.pyramid import Pyramid
 
 LINE_COLOURS = [
     "red",
@@ -37,30 +46,54 @@ SYMBOLS = [
 ]
 
 
+class Points(NamedTuple):
+    times: NDArray[np.float64]
+    values: NDArray[np.int64]
+
+    def take(self, indices: NDArray[np.int64]) -> Points:
+        return Points(self.times[indices], self.values[indices])
+
+
+@dataclass(frozen=True)
+class Series:
+    """The plotted points of a packet list, which unlike the packets themselves are
+    cheap to send from the analysis daemon"""
+
+    origin: str
+    points: Points
+    conditions: dict[str, Points] = field(default_factory=dict)
+
+
 @dataclass(frozen=True)
 class Packets:
     origin: str
     packets: list[scapy.packet.Packet]
     extract: Callable[[scapy.packet.Packet], int]
-    conditions: dict[str, list[scapy.packet.Packet]] = field(default_factory=dict)
-
-
-def build_conditions(
-    *analyzers: PacketAnalyzer, source: str, destination: str
-) -> dict[str, list[scapy.packet.Packet]]:
-    conditions = {}
-    filtered_packets = set()
-    for analyzer in analyzers:
-        packets = analyzer.filter_packets(source, destination)
-        conditions[analyzer.name] = [
-            packet
-            for packet in packets
-            if (packet.seq, packet.ack, float(packet.time)) not in filtered_packets
-        ]
-        filtered_packets.update(
-            (packet.seq, packet.ack, float(packet.time)) for packet in packets
+    classification: Optional[Classification] = None
+
+    def _points(self, packets: list[scapy.packet.Packet]) -> Points:
+        return Points(
+            np.fromiter(
+                (float(pkt.time) for pkt in packets), np.float64, count=len(packets)
+            ),
+            np.fromiter(
+                (self.extract(pkt) for pkt in packets), np.int64, count=len(packets)
+            ),
+        )
+
+    @property
+    def series(self) -> Series:
+        points = self._points(self.packets)
+        if self.classification is None:
+            return Series(self.origin, points)
+        return Series(
+            self.origin,
+            points,
+            {
+                condition: points.take(self.classification.indices(condition))
+                for condition in self.classification.conditions
+            },
         )
-    return conditions
 
 
 def assign_from(assignments: dict[str, str], condition: str, values: list[str]) -> str:
@@ -71,46 +104,70 @@ def assign_from(assignments: dict[str, str], condition: str, values: list[str])
     assert False, "Too many conditions to plot, add more colours"
 
 
+def decimate_series(
+    series: Series,
+    method: decimation.Decimation = "minmax",
+    buckets: int = decimation.DEFAULT_BUCKETS,
+) -> Points:
+    """Thins out the step series, keeping every packet that a condition marks"""
+    markers = [points.times for points in series.conditions.values()]
+    keep = decimation.matching(
+        series.points.times, np.concatenate(markers) if markers else np.empty(0)
+    )
+    return series.points.take(
+        decimation.decimate(
+            series.points.times, series.points.values, method, buckets, keep
+        )
+    )
+
+
 def plot_sequence_plot(
-    packets: Packets,
+    series: Series,
     fig: go.Figure,
     assigned_colours: dict[str, str],
     assigned_symbols: dict[str, str],
+    method: decimation.Decimation = "minmax",
+    buckets: int = decimation.DEFAULT_BUCKETS,
 ) -> None:
-    origin_colour = assign_from(assigned_colours, packets.origin, values=LINE_COLOURS)
-    for condition in packets.conditions:
+    origin_colour = assign_from(assigned_colours, series.origin, values=LINE_COLOURS)
+    for condition in series.conditions:
         assign_from(assigned_colours, condition, values=PREMADE_COLORS)
         assign_from(assigned_symbols, condition, values=SYMBOLS)
 
+    points = decimate_series(series, method, buckets)
     fig.add_trace(
-        go.Scatter(
-            x=[float(pkt.time) for pkt in packets.packets],
-            y=[packets.extract(pkt) for pkt in packets.packets],
+        go.Scattergl(
+            x=points.times,
+            y=points.values,
             mode="lines+markers",
             line_shape="hv",  # Step plot style
-            name=packets.origin,
+            name=series.origin,
             line=dict(color=origin_colour),
             marker=dict(color=origin_colour),
             hovertemplate="Time: %{x}<br>Seq: %{y}<extra></extra>",
         )
     )
-    for condition in packets.conditions:
+    for condition, points in series.conditions.items():
         fig.add_trace(
-            go.Scatter(
-                x=[float(pkt.time) for pkt in packets.conditions[condition]],
-                y=[packets.extract(pkt) for pkt in packets.conditions[condition]],
+            go.Scattergl(
+                x=points.times,
+                y=points.values,
                 mode="markers",
                 marker=dict(
                     color=assigned_colours[condition],
                     symbol=assigned_symbols[condition],
                     size=12,
                 ),
-                name=f"{packets.origin}: {condition}",
+                name=f"{series.origin}: {condition}",
             )
         )
 
 
-def plot_sequence(*packets_list: Packets) -> None:
+def plot_sequence(
+    *series_list: Series,
+    method: decimation.Decimation = "minmax",
+    buckets: int = decimation.DEFAULT_BUCKETS,
+) -> None:
     """
     Plots the sequence numbers for sender and receiver on a single graph with
     custom markers for packets matching specific conditions.
@@ -125,8 +182,10 @@ def plot_sequence(*packets_list: Packets) -> None:
     fig = go.Figure()
     assigned_colours: dict[str, str] = dict()
     assigned_symbols: dict[str, str] = dict()
-    for packets in packets_list:
-        plot_sequence_plot(packets, fig, assigned_colours, assigned_symbols)
+    for series in series_list:
+        plot_sequence_plot(
+            series, fig, assigned_colours, assigned_symbols, method, buckets
+        )
 
     fig.update_layout(
         title="Interactive Stevens Step Sequence Plot",
@@ -147,45 +206,49 @@ def plot_sequence(*packets_list: Packets) -> None:
     fig.show()
 
 
-AmountAtTime = tuple[float, int]
+def _step_trace(name: str, hovertemplate: str, **kwargs: Any) -> go.Scattergl:
+    return go.Scattergl(
+        mode="lines+markers",
+        line_shape="hv",  # Step plot style
+        name=name,
+        hovertemplate=hovertemplate,
+        **kwargs,
+    )
 
 
 def plot_bytesInFlight(
-    true_bytesInFlight: list[AmountAtTime],
-    bytesInFlight: list[AmountAtTime],
-    cwnds: list[AmountAtTime],
+    true_bytesInFlight: Pyramid,
+    bytesInFlight: Pyramid,
+    cwnds: Pyramid,
+    queues: dict[str, Pyramid],
 ):
     fig = go.Figure()
     fig.add_trace(
-        go.Scatter(
-            x=[flight[0] for flight in true_bytesInFlight],
-            y=[flight[1] for flight in true_bytesInFlight],
-            mode="lines+markers",
-            line_shape="hv",  # Step plot style
-            name="True Bytes in Flight",
-            hovertemplate="Time: %{x}<br>BytesInFlight: %{y}<extra></extra>",
+        _step_trace(
+            "True Bytes in Flight",
+            "Time: %{x}<br>BytesInFlight: %{y}<extra></extra>",
         )
     )
     fig.add_trace(
-        go.Scatter(
-            x=[flight[0] for flight in bytesInFlight],
-            y=[flight[1] for flight in bytesInFlight],
-            mode="lines+markers",
-            line_shape="hv",  # Step plot style
-            name="TCP Bytes in Flight",
-            hovertemplate="Time: %{x}<br>BytesInFlight: %{y}<extra></extra>",
+        _step_trace(
+            "TCP Bytes in Flight",
+            "Time: %{x}<br>BytesInFlight: %{y}<extra></extra>",
         )
     )
     fig.add_trace(
-        go.Scatter(
-            x=[cwnd[0] for cwnd in cwnds],
-            y=[cwnd[1] for cwnd in cwnds],
-            mode="lines+markers",
-            line_shape="hv",  # Step plot style
-            name="Congestion Windows",
-            hovertemplate="Time: %{x}<br>Congestion Window Size (Segments): %{y}<extra></extra>",
+        _step_trace(
+            "Congestion Windows",
+            "Time: %{x}<br>Congestion Window Size (Segments): %{y}<extra></extra>",
         )
     )
+    for queue in queues:
+        fig.add_trace(
+            _step_trace(
+                queue,
+                "Time: %{x}<br>Packets in Queue: %{y}<extra></extra>",
+                visible="legendonly",
+            )
+        )
 
     fig.update_layout(
         title="Interactive Bytes in Flight Plot",
@@ -202,4 +265,54 @@ def plot_bytesInFlight(
         hovermode="x unified",
     )
 
+    resampling.show(fig, [true_bytesInFlight, bytesInFlight, cwnds, *queues.values()])
+
+
+def plot_goodput(bands: list[Band], property: str = "Goodput") -> None:
+    """Plots the mean rate of every flow in Mbps, shading the percentile band
+    around it"""
+    fig = go.Figure()
+    for flow, band in enumerate(bands):
+        colour = PREMADE_COLORS[flow % len(PREMADE_COLORS)]
+        fig.add_trace(
+            go.Scatter(
+                x=np.concatenate([band.times, band.times[::-1]]),
+                y=np.concatenate([band.upper, band.lower[::-1]]) / 1e6,
+                fill="toself",
+                fillcolor=colour,
+                opacity=0.2,
+                line=dict(width=0),
+                hoverinfo="skip",
+                legendgroup=str(flow),
+                showlegend=False,
+            )
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=band.times,
+                y=band.mean / 1e6,
+                mode="lines",
+                line_shape="hv",
+                line=dict(color=colour),
+                name=f"Flow {flow}",
+                legendgroup=str(flow),
+                hovertemplate=f"Time: %{{x}}<br>{property}: %{{y:.3f}} Mbps<extra></extra>",
+            )
+        )
+
+    fig.update_layout(
+        title=f"Interactive {property} Plot",
+        xaxis=dict(
+            title=dict(text="Timestamp", font=dict(size=20)), tickfont=dict(size=20)
+        ),
+        yaxis=dict(
+            title=dict(text=f"{property} (Mbps)", font=dict(size=20)),
+            tickfont=dict(size=20),
+        ),
+        legend=dict(font=dict(size=20)),
+        legend_title="Legend",
+        template="plotly_white",
+        hovermode="x unified",
+    )
+
     fig.show()
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import glob
+import hashlib
+import os
+import shutil
+from typing import TYPE_CHECKING, Iterable, Optional
+
+if TYPE_CHECKING:
+    from analysis.generator import Command
+
+CACHE_DIRECTORY = ".simulation_cache"
+# written into a run directory once its run finished successfully, holding its key
+COMPLETION_MARKER = ".simulation_complete"
+
+SIMULATION_BINARIES = ("build/**/scratch/*simulation*",)
+SIMULATION_SOURCES = ("scratch/simulation.cc", "libs/*.h", "libs/*.hpp", "libs/*.cc")
+
+# options that the simulation ignores under the given conditions
+UDP_OPTIONS = ("udp_", "bandwidth_udp", "delay_udp")
+REROUTING_OPTIONS = ("fast_rerouting_scheme", "policy_threshold")
+
+
+def fingerprint(
+    patterns: tuple[str, ...] = SIMULATION_BINARIES + SIMULATION_SOURCES,
+) -> str:
+    """Hashes the simulation binary together with the sources it is built from,
+    as ns-3 rebuilds the binary on the next run if the sources are newer"""
+    digest = hashlib.sha256()
+    for filename in sorted(
+        {
+            filename
+            for pattern in patterns
+            for filename in glob.glob(pattern, recursive=True)
+            if os.path.isfile(filename)
+        }
+    ):
+        digest.update(filename.encode())
+        with open(filename, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _is_ignored(option: str, command: Command) -> bool:
+    name = option.removeprefix("--").split("=")[0]
+    if not command.conditions.congestion and name.startswith(UDP_OPTIONS):
+        return True
+    if not command.conditions.fast_rerouting and name in REROUTING_OPTIONS:
+        return True
+    return name == "dir"
+
+
+def effective_options(command: Command) -> list[str]:
+    return sorted(
+        option for option in command.options() if not _is_ignored(option, command)
+    )
+
+
+def cache_key(command: Command) -> str:
+    assert command.fingerprint is not None, "Caching is disabled for this command"
+    digest = hashlib.sha256(command.fingerprint.encode())
+    if command.simulator is not None:
+        # a stand-in does not produce what ns-3 would, so it never shares its runs
+        digest.update(b"\0" + command.simulator.encode())
+    for option in effective_options(command):
+        digest.update(b"\0" + option.encode())
+    return digest.hexdigest()
+
+
+def _entry(key: str) -> str:
+    return os.path.join(CACHE_DIRECTORY, key[:2], key)
+
+
+def _is_complete(directory: str, key: str) -> bool:
+    # a rerun clears the directory first, so a failed rerun leaves no marker behind
+    marker = os.path.join(directory, COMPLETION_MARKER)
+    if not os.path.exists(marker):
+        return False
+    with open(marker, "r") as file:
+        return file.read().strip() == key
+
+
+def lookup(command: Command) -> Optional[str]:
+    key = cache_key(command)
+    entry = _entry(key)
+    if not os.path.exists(entry):
+        return None
+    with open(entry, "r") as file:
+        directory = file.read().strip()
+    if os.path.abspath(directory) == os.path.abspath(
+        command.directory
+    ) or not _is_complete(directory, key):
+        return None
+    return directory
+
+
+def store(command: Command) -> None:
+    key = cache_key(command)
+    with open(os.path.join(command.directory, COMPLETION_MARKER), "w") as file:
+        file.write(key)
+    entry = _entry(key)
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    temporary = f"{entry}.{os.getpid()}"
+    with open(temporary, "w") as file:
+        file.write(os.path.abspath(command.directory))
+    os.replace(temporary, entry)
+
+
+def group(commands: Iterable[Command]) -> list[list[Command]]:
+    """Groups the commands that simulate the same run, in the order they first appear,
+    as identical runs in flight at once would all miss the cache. Commands that are not
+    cached are each a group of their own."""
+    groups: dict[str, list[Command]] = {}
+    for command in commands:
+        key = command.directory if command.fingerprint is None else cache_key(command)
+        groups.setdefault(key, []).append(command)
+    return list(groups.values())
+
+
+def reuse(source: str, destination: str) -> None:
+    for filename in os.listdir(source):
+        source_file = os.path.join(source, filename)
+        destination_file = os.path.join(destination, filename)
+        try:
+            os.link(source_file, destination_file)
+        except OSError:
+            # hardlinks cannot cross filesystems
+            shutil.copy2(source_file, destination_file)
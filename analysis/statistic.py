@@ -1,10 +1,18 @@
+from __future__ import annotations
+
 from dataclasses import dataclass
 from functools import cached_property
-from typing import NamedTuple
+from typing import Iterable, NamedTuple, Optional, Sequence
 
+import numpy as np
+from numpy.typing import NDArray
 
 from analysis import discovery, graph
 
+CONFIDENCE = 0.95
+BOOTSTRAP_RESAMPLES = 1_000
+BOOTSTRAP_SEED = 0
+
 
 class PlotList(NamedTuple):
     variable: float
@@ -16,164 +24,449 @@ class MultiFlowPlotList(NamedTuple):
     data: list[list[float]]
 
 
-def _variance(values: list[float], average: float) -> float:
-    return sum([(value - average) ** 2 for value in values]) / (len(values) - 1)
+class ConfidenceInterval(NamedTuple):
+    lower: list[graph.Plot]
+    upper: list[graph.Plot]
+
+
+def bootstrap_means(
+    values: NDArray[np.float64],
+    resamples: int = BOOTSTRAP_RESAMPLES,
+    seed: int = BOOTSTRAP_SEED,
+) -> NDArray[np.float64]:
+    """Resamples the rows of the seeds x variables array with replacement, returning
+    the resamples x variables means of every resample"""
+    samples = values.shape[0]
+    generator = np.random.default_rng(seed)
+    # counting how often each seed is drawn avoids materialising every resample
+    counts = generator.multinomial(samples, np.full(samples, 1 / samples), resamples)
+    return counts @ values / samples
+
+
+def _selection(
+    stored_seeds: list[discovery.Seed],
+    stored_points: list[str],
+    seeds: Iterable[discovery.Seed],
+    points: Sequence[str],
+) -> Optional[tuple[list[int], list[int]]]:
+    """The rows of the seeds, sorted, and the columns of the points within what is
+    stored, or None if some are missing"""
+    rows = {seed: row for row, seed in enumerate(stored_seeds)}
+    columns = {point: column for column, point in enumerate(stored_points)}
+    seeds = sorted(seeds)
+    if any(seed not in rows for seed in seeds) or any(
+        point not in columns for point in points
+    ):
+        return None
+    return [rows[seed] for seed in seeds], [columns[point] for point in points]
+
 
+def _to_plots(variables: list[float], values: NDArray[np.float64]) -> list[graph.Plot]:
+    return [
+        graph.Plot(variable=variable, value=value)
+        for variable, value in zip(variables, values.tolist())
+    ]
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, eq=False)
 class Statistic:
-    data: dict[discovery.Seed, list[graph.Plot]]
+    """The value of every seed at every variable, held as a seeds x variables array"""
 
-    @cached_property
-    def seeds(self) -> list[discovery.Seed]:
-        return sorted(list(self.data.keys()))
+    seeds: list[discovery.Seed]
+    variables: list[float]
+    values: NDArray[np.float64]
+
+    @staticmethod
+    def from_plots(data: dict[discovery.Seed, list[graph.Plot]]) -> Statistic:
+        seeds = sorted(data.keys())
+        variables = sorted(plot.variable for plot in data[seeds[0]])
+        values = np.empty((len(seeds), len(variables)))
+        for row, seed in enumerate(seeds):
+            plots = sorted(data[seed], key=lambda plot: plot.variable)
+            assert [plot.variable for plot in plots] == variables, (
+                "Variables do not match"
+            )
+            values[row] = [plot.value for plot in plots]
+        return Statistic(seeds, variables, values)
+
+    @staticmethod
+    def from_columns(data: dict[discovery.Seed, graph.PlotColumns]) -> Statistic:
+        seeds = sorted(data.keys())
+        variables = data[seeds[0]].variables
+        for seed in seeds:
+            assert np.array_equal(data[seed].variables, variables), (
+                "Variables do not match"
+            )
+        return Statistic(
+            seeds,
+            variables.tolist(),
+            np.stack([data[seed].values for seed in seeds]),
+        )
+
+    def store(self, filename: str, points: Sequence[str]) -> None:
+        """Stores the statistic along with the design point of every variable, such as
+        the directory of its runs, as several points can share a value on the axis"""
+        assert len(points) == len(self.variables), "Every variable needs its point"
+        with open(filename, "wb") as file:
+            np.savez(
+                file,
+                seeds=np.array(self.seeds, dtype=np.str_),
+                variables=np.array(self.variables, dtype=np.float64),
+                values=self.values,
+                points=np.array(points, dtype=np.str_),
+            )
+
+    @staticmethod
+    def load(
+        filename: str, seeds: Iterable[discovery.Seed], points: Sequence[str]
+    ) -> Optional[Statistic]:
+        """The stored statistic restricted to the seeds and to the design points in
+        the order given, or None if some are missing"""
+        with np.load(filename, allow_pickle=False) as stored:
+            selection = _selection(
+                stored["seeds"].tolist(), stored["points"].tolist(), seeds, points
+            )
+            if selection is None:
+                return None
+            rows, columns = selection
+            return Statistic(
+                sorted(seeds),
+                stored["variables"][columns].tolist(),
+                stored["values"][np.ix_(rows, columns)],
+            )
 
     @cached_property
-    def variables(self):
-        return sorted([plot.variable for plot in list(self.data.values())[0]])
+    def data(self) -> dict[discovery.Seed, list[graph.Plot]]:
+        return {seed: self._to_plots(row) for seed, row in zip(self.seeds, self.values)}
 
     @cached_property
     def plots(self) -> list[PlotList]:
-        plot_lists = [PlotList(variable, []) for variable in self.variables]
-        for seed in self.seeds:
-            for plot_list, seed_plot in zip(plot_lists, self.data[seed]):
-                assert plot_list.variable == seed_plot.variable, (
-                    "Variables do not match"
-                )
-                plot_list.data.append(seed_plot.value)
-        return plot_lists
-
-    @property
-    def minimum(self) -> list[graph.Plot]:
-        assert self.data
         return [
-            graph.Plot(variable=plot.variable, value=min(plot.data))
-            for plot in self.plots
+            PlotList(variable, column.tolist())
+            for variable, column in zip(self.variables, self.values.T)
         ]
 
-    @property
+    def _to_plots(self, values: NDArray[np.float64]) -> list[graph.Plot]:
+        return _to_plots(self.variables, values)
+
+    @cached_property
+    def minimum(self) -> list[graph.Plot]:
+        assert self.seeds
+        return self._to_plots(self.values.min(axis=0))
+
+    @cached_property
     def maximum(self) -> list[graph.Plot]:
-        assert self.data
-        return [
-            graph.Plot(variable=plot.variable, value=max(plot.data))
-            for plot in self.plots
-        ]
+        assert self.seeds
+        return self._to_plots(self.values.max(axis=0))
 
-    @property
+    @cached_property
     def average(self) -> list[graph.Plot]:
-        assert self.data
-        return [
-            graph.Plot(variable=plot.variable, value=sum(plot.data) / len(plot.data))
-            for plot in self.plots
-        ]
+        assert self.seeds
+        return self._to_plots(self.values.mean(axis=0))
 
-    @property
+    @cached_property
+    def _variances(self) -> NDArray[np.float64]:
+        if len(self.seeds) < 2:
+            return np.zeros(len(self.variables))
+        return self.values.var(axis=0, ddof=1)
+
+    @cached_property
     def variance(self) -> list[graph.Plot]:
-        assert self.data
-        if len(self.data) < 2:
-            return [
-                graph.Plot(variable=plot.variable, value=0.0) for plot in self.plots
-            ]
-        return [
-            graph.Plot(
-                variable=plot.variable, value=_variance(plot.data, average.value)
-            )
-            for average, plot in zip(self.average, self.plots)
-        ]
+        assert self.seeds
+        return self._to_plots(self._variances)
 
-    @property
+    @cached_property
     def standard_deviation(self) -> list[graph.Plot]:
-        assert self.data
+        assert self.seeds
+        return self._to_plots(np.sqrt(self._variances))
+
+    def percentiles(self, *percentiles: float) -> list[list[graph.Plot]]:
+        assert self.seeds
         return [
-            graph.Plot(variable=plot.variable, value=variance.value**0.5)
-            for variance, plot in zip(self.variance, self.plots)
+            self._to_plots(row)
+            for row in np.percentile(self.values, percentiles, axis=0)
         ]
 
+    def percentile(self, percentile: float) -> list[graph.Plot]:
+        return self.percentiles(percentile)[0]
+
+    @cached_property
+    def median(self) -> list[graph.Plot]:
+        return self.percentile(50)
+
+    def bootstrap_confidence_interval(
+        self,
+        confidence: float = CONFIDENCE,
+        resamples: int = BOOTSTRAP_RESAMPLES,
+        seed: int = BOOTSTRAP_SEED,
+    ) -> ConfidenceInterval:
+        """Percentile bootstrap interval of the mean of every variable"""
+        assert self.seeds
+        tail = (1 - confidence) / 2 * 100
+        lower, upper = np.percentile(
+            bootstrap_means(self.values, resamples, seed),
+            (tail, 100 - tail),
+            axis=0,
+        )
+        return ConfidenceInterval(self._to_plots(lower), self._to_plots(upper))
+
+    @cached_property
+    def confidence_interval(self) -> ConfidenceInterval:
+        return self.bootstrap_confidence_interval()
+
+
+def jains_fairness_index(
+    sums: NDArray[np.float64],
+    sums_of_squares: NDArray[np.float64],
+    counts: NDArray[np.int64],
+) -> NDArray[np.float64]:
+    """(sum x)^2 / (n * sum x^2), 1 when every flow is equal and 1/n when one flow
+    takes everything"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(sums_of_squares > 0, sums**2 / (counts * sums_of_squares), 1.0)
 
-def average(values: list[float]) -> float:
-    if not values:
-        return 0.0
-    return sum(values) / len(values)
 
+def ragged_percentiles(
+    values: NDArray[np.float64],
+    offsets: NDArray[np.int64],
+    percentiles: NDArray[np.float64],
+) -> NDArray[np.float64]:
+    """Linearly interpolated percentiles of every group of the ragged array whose
+    values are already sorted within each group, as a percentiles x groups array"""
+    starts, counts = offsets[:-1], np.diff(offsets)
+    positions = starts + np.outer(percentiles / 100, np.maximum(counts - 1, 0))
+    below = np.floor(positions).astype(np.int64)
+    above = np.minimum(below + 1, np.maximum(offsets[1:] - 1, starts))
+    fraction = positions - below
+    result = values[below] * (1 - fraction) + values[above] * fraction
+    return np.where(counts > 0, result, np.nan)
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, eq=False)
 class MultiFlowStatistic:
-    data: dict[discovery.Seed, list[graph.MultiFlowPlot]]
+    """The value of every flow of every seed at every variable, held as a ragged array
+    whose cell for a seed and variable is values[offsets[cell]:offsets[cell + 1]]
+    where cell = seed index * number of variables + variable index"""
 
-    @cached_property
-    def seeds(self) -> list[discovery.Seed]:
-        return sorted(list(self.data.keys()))
+    seeds: list[discovery.Seed]
+    variables: list[float]
+    values: NDArray[np.float64]
+    offsets: NDArray[np.int64]
+
+    @staticmethod
+    def from_plots(
+        data: dict[discovery.Seed, list[graph.MultiFlowPlot]],
+    ) -> MultiFlowStatistic:
+        seeds = sorted(data.keys())
+        variables = sorted(plot.variable for plot in data[seeds[0]])
+        cells: list[list[float]] = []
+        for seed in seeds:
+            plots = sorted(data[seed], key=lambda plot: plot.variable)
+            assert [plot.variable for plot in plots] == variables, (
+                "Variables do not match"
+            )
+            cells.extend(plot.value for plot in plots)
+        offsets = np.zeros(len(cells) + 1, dtype=np.int64)
+        np.cumsum([len(cell) for cell in cells], out=offsets[1:])
+        values = np.fromiter(
+            (flow for cell in cells for flow in cell),
+            dtype=np.float64,
+            count=offsets[-1],
+        )
+        return MultiFlowStatistic(seeds, variables, values, offsets)
+
+    def store(self, filename: str, points: Sequence[str]) -> None:
+        """Stores the statistic along with the design point of every variable, as
+        Statistic.store does"""
+        assert len(points) == len(self.variables), "Every variable needs its point"
+        with open(filename, "wb") as file:
+            np.savez(
+                file,
+                seeds=np.array(self.seeds, dtype=np.str_),
+                variables=np.array(self.variables, dtype=np.float64),
+                values=self.values,
+                offsets=self.offsets,
+                points=np.array(points, dtype=np.str_),
+            )
+
+    @staticmethod
+    def load(
+        filename: str, seeds: Iterable[discovery.Seed], points: Sequence[str]
+    ) -> Optional[MultiFlowStatistic]:
+        """The stored statistic restricted to the seeds and to the design points in
+        the order given, or None if some are missing"""
+        with np.load(filename, allow_pickle=False) as stored:
+            selection = _selection(
+                stored["seeds"].tolist(), stored["points"].tolist(), seeds, points
+            )
+            if selection is None:
+                return None
+            rows, columns = selection
+            offsets = stored["offsets"]
+            cells = (
+                np.asarray(rows, dtype=np.int64)[:, None] * len(stored["points"])
+                + np.asarray(columns, dtype=np.int64)
+            ).ravel()
+            counts = offsets[cells + 1] - offsets[cells]
+            selected = np.zeros(cells.size + 1, dtype=np.int64)
+            np.cumsum(counts, out=selected[1:])
+            # the position of every selected flow within the stored values
+            flows = np.repeat(offsets[cells] - selected[:-1], counts) + np.arange(
+                selected[-1]
+            )
+            return MultiFlowStatistic(
+                sorted(seeds),
+                stored["variables"][columns].tolist(),
+                stored["values"][flows],
+                selected,
+            )
+
+    @property
+    def _shape(self) -> tuple[int, int]:
+        return len(self.seeds), len(self.variables)
+
+    def _cell(self, row: int, column: int) -> list[float]:
+        cell = row * len(self.variables) + column
+        return self.values[self.offsets[cell] : self.offsets[cell + 1]].tolist()
 
     @cached_property
-    def variables(self):
-        return sorted([plot.variable for plot in list(self.data.values())[0]])
+    def data(self) -> dict[discovery.Seed, list[graph.MultiFlowPlot]]:
+        return {
+            seed: [
+                graph.MultiFlowPlot(variable=variable, value=self._cell(row, column))
+                for column, variable in enumerate(self.variables)
+            ]
+            for row, seed in enumerate(self.seeds)
+        }
 
     @cached_property
     def plots(self) -> list[MultiFlowPlotList]:
-        plot_lists = [MultiFlowPlotList(variable, []) for variable in self.variables]
-        for seed in self.seeds:
-            for plot_list, seed_plot in zip(plot_lists, self.data[seed]):
-                assert plot_list.variable == seed_plot.variable, (
-                    "Variables do not match"
-                )
-                plot_list.data.append(seed_plot.value)
-        return plot_lists
-
-    @property
-    def minimum(self) -> list[graph.Plot]:
-        assert self.data
         return [
-            graph.Plot(
-                variable=plot.variable,
-                value=average([min(flows) for flows in plot.data]),
+            MultiFlowPlotList(
+                variable, [self._cell(row, column) for row in range(len(self.seeds))]
             )
-            for plot in self.plots
+            for column, variable in enumerate(self.variables)
         ]
 
-    @property
+    @cached_property
+    def _counts(self) -> NDArray[np.int64]:
+        return np.diff(self.offsets).reshape(self._shape)
+
+    def _reduce(self, ufunc: np.ufunc, values: NDArray[np.float64]) -> NDArray:
+        # reduceat yields the element at the offset for empty cells, so mask them
+        counts = np.diff(self.offsets)
+        if not len(values):
+            return np.full(self._shape, np.nan)
+        starts = np.minimum(self.offsets[:-1], len(values) - 1)
+        return np.where(counts > 0, ufunc.reduceat(values, starts), np.nan).reshape(
+            self._shape
+        )
+
+    @cached_property
+    def _sums(self) -> NDArray[np.float64]:
+        return np.nan_to_num(self._reduce(np.add, self.values))
+
+    @cached_property
+    def _seed_averages(self) -> Statistic:
+        # the spread across seeds is taken over the average flow of every seed
+        with np.errstate(divide="ignore", invalid="ignore"):
+            averages = np.where(self._counts > 0, self._sums / self._counts, 0.0)
+        return Statistic(self.seeds, self.variables, averages)
+
+    @cached_property
+    def minimum(self) -> list[graph.Plot]:
+        assert self.seeds
+        return _to_plots(
+            self.variables, self._reduce(np.minimum, self.values).mean(axis=0)
+        )
+
+    @cached_property
     def maximum(self) -> list[graph.Plot]:
-        assert self.data
-        return [
-            graph.Plot(
-                variable=plot.variable,
-                value=average([max(flows) for flows in plot.data]),
-            )
-            for plot in self.plots
-        ]
+        assert self.seeds
+        return _to_plots(
+            self.variables, self._reduce(np.maximum, self.values).mean(axis=0)
+        )
 
-    @property
+    @cached_property
+    def _averages(self) -> NDArray[np.float64]:
+        counts = self._counts.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(counts > 0, self._sums.sum(axis=0) / counts, 0.0)
+
+    @cached_property
     def average(self) -> list[graph.Plot]:
-        assert self.data
-        return [
-            graph.Plot(
-                variable=plot.variable,
-                value=average([flow for flows in plot.data for flow in flows]),
-            )
-            for plot in self.plots
-        ]
+        assert self.seeds
+        return _to_plots(self.variables, self._averages)
 
-    @property
+    @cached_property
+    def _variances(self) -> NDArray[np.float64]:
+        if len(self.seeds) < 2:
+            return np.zeros(len(self.variables))
+        deviations = self._seed_averages.values - self._averages
+        return (deviations**2).sum(axis=0) / (len(self.seeds) - 1)
+
+    @cached_property
     def variance(self) -> list[graph.Plot]:
-        assert self.data
-        if len(self.data) < 2:
-            return [
-                graph.Plot(variable=plot.variable, value=0.0) for plot in self.plots
-            ]
-        return [
-            graph.Plot(
-                variable=plot.variable,
-                value=_variance(
-                    [average(flows) for flows in plot.data],
-                    plot_average.value,
-                ),
-            )
-            for plot_average, plot in zip(self.average, self.plots)
-        ]
+        assert self.seeds
+        return _to_plots(self.variables, self._variances)
 
-    @property
+    @cached_property
     def standard_deviation(self) -> list[graph.Plot]:
-        assert self.data
+        assert self.seeds
+        return _to_plots(self.variables, np.sqrt(self._variances))
+
+    @cached_property
+    def _flows_by_variable(self) -> tuple[NDArray[np.float64], NDArray[np.int64]]:
+        # pools the flows of every seed per variable, sorted within each variable
+        columns = np.repeat(
+            np.tile(np.arange(len(self.variables)), len(self.seeds)),
+            np.diff(self.offsets),
+        )
+        order = np.lexsort((self.values, columns))
+        offsets = np.zeros(len(self.variables) + 1, dtype=np.int64)
+        np.cumsum(self._counts.sum(axis=0), out=offsets[1:])
+        return self.values[order], offsets
+
+    def percentiles(self, *percentiles: float) -> list[list[graph.Plot]]:
+        """Percentiles of the individual flows pooled across seeds"""
+        assert self.seeds
         return [
-            graph.Plot(variable=plot.variable, value=variance.value**0.5)
-            for variance, plot in zip(self.variance, self.plots)
+            _to_plots(self.variables, row)
+            for row in ragged_percentiles(
+                *self._flows_by_variable, np.asarray(percentiles, dtype=np.float64)
+            )
         ]
+
+    def percentile(self, percentile: float) -> list[graph.Plot]:
+        return self.percentiles(percentile)[0]
+
+    @cached_property
+    def median(self) -> list[graph.Plot]:
+        return self.percentile(50)
+
+    def bootstrap_confidence_interval(
+        self,
+        confidence: float = CONFIDENCE,
+        resamples: int = BOOTSTRAP_RESAMPLES,
+        seed: int = BOOTSTRAP_SEED,
+    ) -> ConfidenceInterval:
+        return self._seed_averages.bootstrap_confidence_interval(
+            confidence, resamples, seed
+        )
+
+    @cached_property
+    def confidence_interval(self) -> ConfidenceInterval:
+        return self._seed_averages.confidence_interval
+
+    @cached_property
+    def fairness(self) -> Statistic:
+        """Jain's fairness index across the flows of every seed and variable"""
+        return Statistic(
+            self.seeds,
+            self.variables,
+            jains_fairness_index(
+                self._sums,
+                np.nan_to_num(self._reduce(np.add, self.values**2)),
+                self._counts,
+            ),
+        )
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import os
+import re
+from collections import defaultdict
+from typing import TYPE_CHECKING, Iterable, NamedTuple, Optional
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from analysis.generator import Command
+
+TELEMETRY_FILENAME = ".telemetry.jsonl"
+
+# rough defaults used until there is history to calibrate the cost model against
+DEFAULT_SECONDS_PER_PACKET = 2e-4
+DEFAULT_BYTES_PER_PACKET = 3_000
+
+RATE_UNITS = {
+    "bps": 1,
+    "kbps": 1e3,
+    "mbps": 1e6,
+    "gbps": 1e9,
+    "Bps": 8,
+    "KBps": 8e3,
+    "MBps": 8e6,
+    "GBps": 8e9,
+}
+
+_QUANTITY = re.compile(r"^\s*([0-9]*\.?[0-9]+)\s*([A-Za-z]*)\s*$")
+
+
+def _split_quantity(quantity: str) -> tuple[float, str]:
+    match = _QUANTITY.match(str(quantity))
+    if match is None:
+        raise ValueError(f"Unable to parse quantity {quantity}")
+    return float(match.group(1)), match.group(2)
+
+
+def parse_rate(rate: str) -> float:
+    """Converts an ns-3 DataRate string such as 3Mbps into bits per second"""
+    value, unit = _split_quantity(rate)
+    if unit in RATE_UNITS:
+        return value * RATE_UNITS[unit]
+    return value * RATE_UNITS[unit.lower()]
+
+
+def parse_queue_size(size: str) -> int:
+    value, _ = _split_quantity(size)
+    return int(value)
+
+
+class Telemetry(BaseModel):
+    directory: str
+    key: str
+    work: float
+    wall_time: float
+    peak_rss: int
+    output_bytes: int
+    exit_status: int
+    cached_from: Optional[str] = None
+
+
+class Estimate(NamedTuple):
+    wall_time: float
+    output_bytes: float
+
+
+def packet_events(command: Command) -> float:
+    """Estimated number of packets the simulation has to push through, which
+    dominates the wall time of ns-3 as well as the size of the traces"""
+    settings = command.effective_settings
+    segments = settings.tcp_senders * settings.tcp_bytes / settings.tcp_segment_size
+    # a slow bottleneck stretches the run, and a deep queue keeps retransmitting
+    # flows busy for longer, both of which scale the number of events
+    bottleneck = min(
+        parse_rate(settings.bandwidth_primary), parse_rate(settings.bandwidth_tcp)
+    )
+    transfer_time = settings.tcp_senders * settings.tcp_bytes * 8 / bottleneck
+    simulated_time = max(transfer_time, settings.tcp_end_time - settings.tcp_start_time)
+    queueing = 1 + parse_queue_size(settings.traffic_queue_size) / 1_000
+
+    events = segments * 2 * queueing
+    if command.conditions.congestion:
+        duty_cycle = settings.udp_on_time_mean / (
+            settings.udp_on_time_mean + settings.udp_off_time_mean
+        )
+        udp_time = min(settings.udp_end_time, simulated_time) - settings.udp_start_time
+        events += (
+            parse_rate(settings.bandwidth_udp)
+            * max(udp_time, 0)
+            * duty_cycle
+            / (settings.udp_segment_size * 8)
+        )
+    if command.conditions.enable_logging:
+        events *= 2
+    return events
+
+
+def telemetry_filename(directory: str) -> str:
+    return os.path.join(directory, TELEMETRY_FILENAME)
+
+
+def load_history(directory: str) -> list[Telemetry]:
+    filename = telemetry_filename(directory)
+    if not os.path.exists(filename):
+        return []
+    with open(filename, "r") as file:
+        return [Telemetry.model_validate_json(line) for line in file if line.strip()]
+
+
+def record(directory: str, telemetry: Telemetry) -> None:
+    os.makedirs(directory, exist_ok=True)
+    with open(telemetry_filename(directory), "a") as file:
+        file.write(telemetry.model_dump_json() + "\n")
+
+
+def directory_size(directory: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, filename))
+        for root, _, filenames in os.walk(directory)
+        for filename in filenames
+    )
+
+
+class CostModel:
+    """Predicts the wall time and output size of a command, using the measured
+    average of identical commands when available, and otherwise the packet event
+    estimate scaled by the rate observed over the whole history"""
+
+    def __init__(self, history: Iterable[Telemetry]) -> None:
+        successful = [
+            telemetry
+            for telemetry in history
+            if telemetry.exit_status == 0 and telemetry.cached_from is None
+        ]
+        self._by_key: defaultdict[str, list[Telemetry]] = defaultdict(list)
+        for telemetry in successful:
+            self._by_key[telemetry.key].append(telemetry)
+
+        total_work = sum(telemetry.work for telemetry in successful)
+        if total_work > 0:
+            self.seconds_per_packet = (
+                sum(telemetry.wall_time for telemetry in successful) / total_work
+            )
+            self.bytes_per_packet = (
+                sum(telemetry.output_bytes for telemetry in successful) / total_work
+            )
+        else:
+            self.seconds_per_packet = DEFAULT_SECONDS_PER_PACKET
+            self.bytes_per_packet = DEFAULT_BYTES_PER_PACKET
+
+    def estimate(self, command: Command) -> Estimate:
+        if measured := self._by_key.get(command.key):
+            return Estimate(
+                wall_time=sum(telemetry.wall_time for telemetry in measured)
+                / len(measured),
+                output_bytes=sum(telemetry.output_bytes for telemetry in measured)
+                / len(measured),
+            )
+        work = packet_events(command)
+        return Estimate(
+            wall_time=work * self.seconds_per_packet,
+            output_bytes=work * self.bytes_per_packet,
+        )
+
+
+def format_bytes(amount: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if amount < 1024:
+            return f"{amount:.1f} {unit}"
+        amount /= 1024
+    return f"{amount:.1f} TiB"
+
+
+def makespan(wall_times: Iterable[float], workers: int) -> float:
+    # longest processing time first, the order the commands are scheduled in
+    loads = [0.0] * max(workers, 1)
+    for wall_time in sorted(wall_times, reverse=True):
+        loads[loads.index(min(loads))] += wall_time
+    return max(loads)
@@ -1,11 +1,31 @@
-from typing import Protocol
+from typing import Any, Protocol
 
 import scapy.packet
 
+from analysis import profiling
+from analysis.pcap import PcapFile
+
+
+def _captured_packets(_: object, analyzer: object, *args: object) -> int:
+    # only the captures the analyzer read, without loading those it did not
+    return sum(
+        len(capture.__dict__["packets"])
+        for capture in vars(analyzer).values()
+        if isinstance(capture, PcapFile) and "packets" in capture.__dict__
+    )
+
 
 class PacketAnalyzer(Protocol):
     name: str
 
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        # every analyzer is profiled as a stage of its own
+        if "filter_packets" in cls.__dict__:
+            cls.filter_packets = profiling.profiled(  # type: ignore[method-assign]
+                "filter_packets", packets=_captured_packets
+            )(cls.__dict__["filter_packets"])
+
     def filter_packets(
         self, source: str, destination: str
     ) -> list[scapy.packet.Packet]: ...
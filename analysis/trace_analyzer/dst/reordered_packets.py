@@ -1,15 +1,17 @@
 from dataclasses import dataclass, field
-from typing import override
+from typing import Self, override
 
 import pyshark
 import scapy
-from scapy.layers.inet import TCP
 import scapy.packet
+from scapy.layers.inet import TCP
 
-from analysis.trace_analyzer.analyzer import PacketAnalyzer
+from analysis import compression
 from analysis.pcap import SMSS, PcapFile
+from analysis.trace_analyzer.analyzer import PacketAnalyzer
 from analysis.trace_analyzer.source.packet_capture import PacketCapture
 from analysis.trace_analyzer.source.socket_state import SocketState
+from analysis.window import Window
 
 
 @dataclass(frozen=True)
@@ -21,10 +23,12 @@ class PacketOutOfOrderAnalyzer(PacketAnalyzer):
         self, source: str, destination: str
     ) -> list[scapy.packet.Packet]:
         file_capture = pyshark.FileCapture(
-            self.file.filename,
-            display_filter=f"ip.src=={source} and ip.dst=={destination} and tcp.analysis.out_of_order",
+            self.file.path,
+            display_filter=self.file.display_filter(
+                f"ip.src=={source} and ip.dst=={destination} and tcp.analysis.out_of_order"
+            ),
         )
-        packets = [self.file.packets[int(packet.number) - 1] for packet in file_capture]
+        packets = [self.file.packet_at(int(packet.number)) for packet in file_capture]
         file_capture.close()
         return packets
 
@@ -33,6 +37,93 @@ def hashable_packet(packet):
     return packet[TCP].seq, packet[TCP].ack, dict(packet[TCP].options)["Timestamp"]
 
 
+@dataclass(frozen=True)
+class Delivery:
+    """The packets a sender sent and those the receiver got from it, matched once so
+    that every analyzer comparing the two captures can share the match.
+
+    A window is matched over the whole captures, so that the packets in flight at
+    its edges are paired with their arrivals, and only the packets sent within it
+    are reported."""
+
+    window: Window
+    sent: list[scapy.packet.Packet]
+    received: list[scapy.packet.Packet]
+    sent_keys: list[tuple[int, int, tuple[int, int]]]
+    received_keys: list[tuple[int, int, tuple[int, int]]]
+    # the positions of the sent packets that reached the receiver
+    delivered: list[int]
+
+    @classmethod
+    def match(cls, sender: PcapFile, receiver: PcapFile, source: str) -> Self:
+        window = sender.window
+        sent = sender.windowed(Window()).packets_from(source)
+        received = receiver.windowed(Window()).packets_from(source)
+        sent_keys = [hashable_packet(packet) for packet in sent]
+        received_keys = [hashable_packet(packet) for packet in received]
+        arrived = set(received_keys)
+        return cls(
+            window,
+            sent,
+            received,
+            sent_keys,
+            received_keys,
+            [position for position, key in enumerate(sent_keys) if key in arrived],
+        )
+
+    def _within(self, packets: list[scapy.packet.Packet]) -> list[scapy.packet.Packet]:
+        if not self.window.bounded:
+            return packets
+        return [
+            packet for packet in packets if self.window.includes(float(packet.time))
+        ]
+
+    def out_of_order(self) -> list[scapy.packet.Packet]:
+        """The delivered packets that did not arrive where they were sent"""
+        return self._within(self._out_of_order())
+
+    def _out_of_order(self) -> list[scapy.packet.Packet]:
+        return [
+            self.sent[position]
+            for position, key in zip(self.delivered, self.received_keys)
+            if self.sent_keys[position] != key
+        ]
+
+    def spurious_out_of_order(self) -> list[scapy.packet.Packet]:
+        """The second delivery of every sequence that arrived out of order"""
+        out_of_order = {packet[TCP].seq for packet in self._out_of_order()}
+        deliveries: dict[int, int] = {}
+        spurious_retransmissions = []
+        for position in self.delivered:
+            seq = self.sent[position][TCP].seq
+            if seq in out_of_order:
+                deliveries[seq] = deliveries.get(seq, 0) + 1
+                if deliveries[seq] > 1:
+                    spurious_retransmissions.append(self.sent[position])
+        return self._within(spurious_retransmissions)
+
+    def retransmitted(self) -> list[scapy.packet.Packet]:
+        """The delivered packets whose sequence had already been delivered"""
+        spurious_retransmissions = []
+        already_transmitted = set()
+        for position in self.delivered:
+            seq = self.sent[position][TCP].seq
+            if seq in already_transmitted:
+                spurious_retransmissions.append(self.sent[position])
+            already_transmitted.add(seq)
+        return self._within(spurious_retransmissions)
+
+    def dropped(self) -> list[scapy.packet.Packet]:
+        """The last packet sent with every sequence and TSval the receiver never got"""
+        sent = {
+            (key[0], key[2]): packet for key, packet in zip(self.sent_keys, self.sent)
+        }
+        received = {(key[0], key[2]) for key in self.received_keys}
+        return self._within(
+            [packet for key, packet in sent.items() if key not in received]
+        )
+
+
 @dataclass(frozen=True)
 class OOOAnalyzer(PacketAnalyzer):
     sender: PcapFile
@@ -42,27 +133,7 @@ class OOOAnalyzer(PacketAnalyzer):
     def filter_packets(
         self, source: str, destination: str
     ) -> list[scapy.packet.Packet]:
-        received_packets = self.receiver.packets_from(source)
-        sent_packets = self.sender.packets_from(source)
-
-        hashed_received_packets = [
-            hashable_packet(packet) for packet in received_packets
-        ]
-
-        delivered_sent_packets = [
-            packet
-            for packet in sent_packets
-            if hashable_packet(packet) in hashed_received_packets
-        ]
-
-        out_of_order_packets = []
-        for sent_packet, received_packet in zip(
-            delivered_sent_packets, received_packets
-        ):
-            if hashable_packet(sent_packet) != hashable_packet(received_packet):
-                out_of_order_packets.append(sent_packet)
-
-        return out_of_order_packets
+        return Delivery.match(self.sender, self.receiver, source).out_of_order()
 
 
 @dataclass(frozen=True)
@@ -74,27 +145,7 @@ class PreciseOOOAnalyzer(PacketAnalyzer):
     def filter_packets(
         self, source: str, destination: str
     ) -> list[scapy.packet.Packet]:
-        received_packets = self.receiver.packets_from(source)
-        sent_packets = self.sender.packets_from(source)
-
-        hashed_received_packets = [
-            hashable_packet(packet) for packet in received_packets
-        ]
-
-        delivered_sent_packets = [
-            packet
-            for packet in sent_packets
-            if hashable_packet(packet) in hashed_received_packets
-        ]
-
-        out_of_order_packets = []
-        for sent_packet, received_packet in zip(
-            delivered_sent_packets, received_packets
-        ):
-            if hashable_packet(sent_packet) != hashable_packet(received_packet):
-                out_of_order_packets.append(sent_packet)
-
-        return out_of_order_packets
+        return Delivery.match(self.sender, self.receiver, source).out_of_order()
 
 
 @dataclass(frozen=True)
@@ -106,42 +157,9 @@ class SpuriousOOOAnalyzer(PacketAnalyzer):
     def filter_packets(
         self, source: str, destination: str
     ) -> list[scapy.packet.Packet]:
-        received_packets = self.receiver.packets_from(source)
-        sent_packets = self.sender.packets_from(source)
-
-        hashed_received_packets = [
-            hashable_packet(packet) for packet in received_packets
-        ]
-
-        delivered_sent_packets = [
-            packet
-            for packet in sent_packets
-            if hashable_packet(packet) in hashed_received_packets
-        ]
-
-        out_of_order_packets = []
-        for sent_packet, received_packet in zip(
-            delivered_sent_packets, received_packets
-        ):
-            if hashable_packet(sent_packet) != hashable_packet(received_packet):
-                out_of_order_packets.append(sent_packet)
-
-        ooo_seq = {packet[TCP].seq for packet in out_of_order_packets}
-        spurious_retransmissions = []
-
-        transmission_count = {packet[TCP].seq: 2 for packet in delivered_sent_packets}
-
-        for sent_packet in delivered_sent_packets:
-            if (
-                sent_packet[TCP].seq in transmission_count
-                and sent_packet[TCP].seq in ooo_seq
-            ):
-                if transmission_count[sent_packet[TCP].seq] > 1:
-                    transmission_count[sent_packet[TCP].seq] -= 1
-                else:
-                    spurious_retransmissions.append(sent_packet)
-
-        return spurious_retransmissions
+        return Delivery.match(
+            self.sender, self.receiver, source
+        ).spurious_out_of_order()
 
 
 @dataclass(frozen=True)
@@ -153,28 +171,7 @@ class SpuriousRetransmissionAnalyzer(PacketAnalyzer):
     def filter_packets(
         self, source: str, destination: str
     ) -> list[scapy.packet.Packet]:
-        received_packets = self.receiver.packets_from(source)
-        sent_packets = self.sender.packets_from(source)
-
-        hashed_received_packets = [
-            hashable_packet(packet) for packet in received_packets
-        ]
-
-        delivered_sent_packets = [
-            packet
-            for packet in sent_packets
-            if hashable_packet(packet) in hashed_received_packets
-        ]
-
-        spurious_retransmissions = []
-        already_transmitted = set()
-
-        for sent_packet in delivered_sent_packets:
-            if sent_packet[TCP].seq in already_transmitted:
-                spurious_retransmissions.append(sent_packet)
-            already_transmitted.add(sent_packet[TCP].seq)
-
-        return spurious_retransmissions
+        return Delivery.match(self.sender, self.receiver, source).retransmitted()
 
 
 @dataclass
@@ -272,7 +269,7 @@ class TrueBytesInFlightAnalyzer(PacketCapture):
 def tcp_bytes_in_flight(debug_filename: str, sender: int) -> list[tuple[float, int]]:
     bytes_in_flight: list[tuple[float, int]] = []
     string = f"[node {sender + 6}] Returning calculated bytesInFlight: "
-    with open(debug_filename, "r") as debug_file:
+    with compression.open_text(debug_filename) as debug_file:
         for line in debug_file:
             if string in line:
                 bytes_in_flight.append(
@@ -286,9 +283,20 @@ def tcp_bytes_in_flight(debug_filename: str, sender: int) -> list[tuple[float, i
 
 def congestion_windows(filename: str) -> list[tuple[float, int]]:
     congestion_windows: list[tuple[float, int]] = []
-    with open(filename, "r") as debug_file:
+    with compression.open_text(filename) as debug_file:
         for line in debug_file:
             time, cwnd, *_ = line.split(" ")
             if cwnd.strip().isnumeric():
                 congestion_windows.append((float(time), int(cwnd)))
     return congestion_windows
+
+
+def queue_occupancy(filename: str) -> list[tuple[float, int]]:
+    occupancy: list[tuple[float, int]] = []
+    with compression.open_text(filename) as queue_file:
+        for line in queue_file:
+            # enqueued packets are printed alongside the changes in occupancy
+            time, count, *rest = line.split(" ")
+            if not rest and count.strip().isnumeric():
+                occupancy.append((float(time), int(count)))
+    return occupancy
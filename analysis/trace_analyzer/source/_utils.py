@@ -3,7 +3,6 @@ from scapy.layers.inet import TCP
 
 from analysis.trace_analyzer.source.socket_state import SackedByteRange
 
-
 SMSS = 1446
 
 
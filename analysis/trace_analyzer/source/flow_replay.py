@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+from typing import Self
+
+from analysis.pcap import PcapFile
+from analysis.trace_analyzer.dst.reordered_packets import (
+    DroppedRetransmittedPacketCapture,
+)
+from analysis.trace_analyzer.source.packet_capture import CaptureGroup
+from analysis.trace_analyzer.source.replayer import TcpSourceReplayer
+from analysis.trace_analyzer.source.retransmission_timeout import (
+    RTOWaitingForUnsent,
+    WaitTimeAfterRTO,
+)
+from analysis.trace_analyzer.source.spurious_sack_fast_transmit import (
+    TotalTimeInRecovery,
+)
+
+
+@dataclass(frozen=True)
+class FlowReplay:
+    """The captures behind the replay-based metrics of a flow, filled by replaying
+    its sender once"""
+
+    recovery: TotalTimeInRecovery
+    rto_wait_time_for_unsent: RTOWaitingForUnsent
+    rto_wait_time: WaitTimeAfterRTO
+    dropped_retransmitted: DroppedRetransmittedPacketCapture
+
+    @classmethod
+    def replay(cls, file: PcapFile, source: str, destination: str) -> Self:
+        flow = cls(
+            TotalTimeInRecovery(),
+            RTOWaitingForUnsent(),
+            WaitTimeAfterRTO(),
+            DroppedRetransmittedPacketCapture(),
+        )
+        TcpSourceReplayer(
+            file,
+            source,
+            destination,
+            CaptureGroup(
+                captures=[
+                    flow.recovery,
+                    flow.rto_wait_time_for_unsent,
+                    flow.rto_wait_time,
+                    flow.dropped_retransmitted,
+                ]
+            ),
+        ).run()
+        return flow
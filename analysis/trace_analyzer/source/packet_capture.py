@@ -1,10 +1,11 @@
-from dataclasses import dataclass, field
 import logging
+from dataclasses import dataclass, field
+from typing import override
 
 import scapy
 import scapy.packet
 
-from analysis.trace_analyzer.source.socket_state import SocketState, SackedByteRange
+from analysis.trace_analyzer.source.socket_state import SackedByteRange, SocketState
 
 
 # TODO: ideally socket state should be traced using descriptors, which would have callbacks injected
@@ -47,3 +48,66 @@ class PacketCapture:
 
     def on_scoreboard_add(self, segment: int, state: SocketState) -> None:
         logging.debug(f"Adding segment to scoreboard: {segment} in state={state}")
+
+
+@dataclass
+class CaptureGroup(PacketCapture):
+    """Hands every event to each of its captures, so that one replay fills them all"""
+
+    captures: list[PacketCapture] = field(default_factory=list)
+
+    @override
+    def on_retransmission(
+        self, packet: scapy.packet.Packet, state: SocketState
+    ) -> None:
+        for capture in self.captures:
+            capture.on_retransmission(packet, state)
+
+    @override
+    def on_dup_ack(self, packet: scapy.packet.Packet, state: SocketState) -> None:
+        for capture in self.captures:
+            capture.on_dup_ack(packet, state)
+
+    @override
+    def on_ack(self, packet: scapy.packet.Packet, state: SocketState) -> None:
+        for capture in self.captures:
+            capture.on_ack(packet, state)
+
+    @override
+    def on_new_sack(
+        self, sack_byte_ranges: list[SackedByteRange], state: SocketState
+    ) -> None:
+        for capture in self.captures:
+            capture.on_new_sack(sack_byte_ranges, state)
+
+    @override
+    def on_clear_dup_acks(self, state: SocketState) -> None:
+        for capture in self.captures:
+            capture.on_clear_dup_acks(state)
+
+    @override
+    def on_new_send(self, packet: scapy.packet.Packet, state: SocketState) -> None:
+        for capture in self.captures:
+            capture.on_new_send(packet, state)
+
+    @override
+    def on_retransmission_timeout(
+        self, packet: scapy.packet.Packet, state: SocketState
+    ) -> None:
+        for capture in self.captures:
+            capture.on_retransmission_timeout(packet, state)
+
+    @override
+    def on_exit_recovery(self, state: SocketState) -> None:
+        for capture in self.captures:
+            capture.on_exit_recovery(state)
+
+    @override
+    def on_enter_recovery(self, state: SocketState) -> None:
+        for capture in self.captures:
+            capture.on_enter_recovery(state)
+
+    @override
+    def on_scoreboard_add(self, segment: int, state: SocketState) -> None:
+        for capture in self.captures:
+            capture.on_scoreboard_add(segment, state)
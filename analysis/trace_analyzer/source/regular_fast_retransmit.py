@@ -4,8 +4,8 @@ import pyshark
 import scapy
 import scapy.packet
 
-from analysis.trace_analyzer.analyzer import PacketAnalyzer
 from analysis.pcap import PcapFile
+from analysis.trace_analyzer.analyzer import PacketAnalyzer
 
 
 @dataclass(frozen=True)
@@ -17,9 +17,11 @@ class FastRetransmissionAnalyzer(PacketAnalyzer):
         self, source: str, destination: str
     ) -> list[scapy.packet.Packet]:
         file_capture = pyshark.FileCapture(
-            self.file.filename,
-            display_filter=f"ip.src=={source} and ip.dst=={destination} and tcp.analysis.retransmission",
+            self.file.path,
+            display_filter=self.file.display_filter(
+                f"ip.src=={source} and ip.dst=={destination} and tcp.analysis.retransmission"
+            ),
         )
-        packets = [self.file.packets[int(packet.number) - 1] for packet in file_capture]
+        packets = [self.file.packet_at(int(packet.number)) for packet in file_capture]
         file_capture.close()
         return packets
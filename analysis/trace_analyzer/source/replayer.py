@@ -1,19 +1,21 @@
-from dataclasses import dataclass, field
 import math
+from dataclasses import dataclass, field
 
 import scapy
-from scapy.all import Raw
 import scapy.packet
+from scapy.all import Raw
 from scapy.layers.inet import IP, TCP
+from scapy.plist import PacketList
 
+from analysis import profiling
 from analysis.pcap import SMSS, TCP_ACK, PcapFile
-from analysis.trace_analyzer.source.socket_state import SocketState
-from analysis.trace_analyzer.source.packet_capture import PacketCapture
 from analysis.trace_analyzer.source._utils import (
     calculate_dropped_packets,
     get_sacked_byte_ranges,
     get_sacked_segments,
 )
+from analysis.trace_analyzer.source.packet_capture import CaptureGroup, PacketCapture
+from analysis.trace_analyzer.source.socket_state import SocketState
 
 DUPLICATE_ACK_THRESHOLD = 3
 
@@ -135,8 +137,25 @@ class TcpSourceReplayer:
         self.state.last_sent_timestamps[packet[TCP].seq] = float(packet.time)
         self.state.last_send_timestamp = float(packet.time)
 
+    @profiling.profiled(
+        "replay", packets=lambda _, replayer: len(replayer.file.packets)
+    )
     def run(self) -> None:
-        for packet in self.file.packets:
+        if self.file.window.start is not None:
+            # which packets are retransmissions and whether the connection is in
+            # recovery depend on every packet before the window, so those are
+            # replayed first without handing their events to the handlers
+            TcpSourceReplayer(
+                self.file, self.source, self.destination, CaptureGroup(), self.state
+            )._replay(self.file.preceding_packets)
+            self.state.time = self.file.window.start
+            if self.state.in_recovery:
+                # a recovery underway when the window opens is entered there
+                self.event_handlers.on_enter_recovery(self.state)
+        self._replay(self.file.packets)
+
+    def _replay(self, packets: PacketList) -> None:
+        for packet in packets:
             self.state.time = float(packet.time)
             if packet[IP].dst == self.source:
                 self._handle_ack(packet)
@@ -0,0 +1,30 @@
+from dataclasses import dataclass, field
+from typing import override
+
+import scapy.packet
+
+from analysis.trace_analyzer.source.packet_capture import PacketCapture
+from analysis.trace_analyzer.source.socket_state import SocketState
+
+
+@dataclass
+class RTOWaitingForUnsent(PacketCapture):
+    wait_time: float = field(default_factory=float)
+
+    @override
+    def on_retransmission_timeout(
+        self, packet: scapy.packet.Packet, state: SocketState
+    ) -> None:
+        if state.high_tx_mark < 997_000:
+            self.wait_time += float(packet.time) - state.last_send_timestamp
+
+
+@dataclass
+class WaitTimeAfterRTO(PacketCapture):
+    wait_time: float = field(default_factory=float)
+
+    @override
+    def on_retransmission_timeout(
+        self, packet: scapy.packet.Packet, state: SocketState
+    ) -> None:
+        self.wait_time += float(packet.time) - state.last_send_timestamp
@@ -8,10 +8,9 @@ from scapy.layers.inet import TCP
 from analysis.pcap import PcapFile
 from analysis.trace_analyzer.analyzer import PacketAnalyzer
 from analysis.trace_analyzer.source import replayer
-from analysis.trace_analyzer.source.socket_state import SocketState
 from analysis.trace_analyzer.source.packet_capture import PacketCapture
-
 from analysis.trace_analyzer.source.replayer import DUPLICATE_ACK_THRESHOLD
+from analysis.trace_analyzer.source.socket_state import SocketState
 
 
 @dataclass
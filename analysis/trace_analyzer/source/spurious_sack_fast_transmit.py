@@ -2,17 +2,16 @@ from dataclasses import dataclass, field
 from typing import override
 
 import scapy
-from scapy.layers.inet import TCP
 import scapy.packet
+from scapy.layers.inet import TCP
 
+from analysis.pcap import PcapFile
 from analysis.trace_analyzer.analyzer import PacketAnalyzer
+from analysis.trace_analyzer.dst.reordered_packets import Delivery, hashable_packet
 from analysis.trace_analyzer.source import replayer
-from analysis.trace_analyzer.source.socket_state import SocketState
+from analysis.trace_analyzer.source._utils import calculate_sack_packets
 from analysis.trace_analyzer.source.packet_capture import PacketCapture
-from analysis.pcap import PcapFile
-from analysis.trace_analyzer.source._utils import (
-    calculate_sack_packets,
-)
+from analysis.trace_analyzer.source.socket_state import SocketState
 
 
 @dataclass
@@ -53,8 +52,19 @@ class TotalTimeInRecovery(PacketCapture):
         self.total_time_in_recovery += state.time - self.enter_recovery_time
 
 
-def hashable_packet(packet):
-    return packet[TCP].seq, packet[TCP].ack, dict(packet[TCP].options)["Timestamp"]
+def spurious_single_dup_acks(
+    capture: SingleDupAckRetransmitPacketCapture, delivery: Delivery
+) -> list[scapy.packet.Packet]:
+    """The retransmissions the capture saw whose sequence had already been
+    delivered"""
+    spurious_retransmissions = {
+        hashable_packet(packet) for packet in delivery.retransmitted()
+    }
+    return [
+        packet
+        for packet in capture.packets
+        if hashable_packet(packet) in spurious_retransmissions
+    ]
 
 
 @dataclass(frozen=True)
@@ -66,27 +76,6 @@ class SingleDupAckRetransmitSackAnalyzer(PacketAnalyzer):
     def filter_packets(
         self, source: str, destination: str
     ) -> list[scapy.packet.Packet]:
-        received_packets = self.receiver.packets_from(source)
-        sent_packets = self.sender.packets_from(source)
-
-        hashed_received_packets = [
-            hashable_packet(packet) for packet in received_packets
-        ]
-
-        delivered_sent_packets = [
-            packet
-            for packet in sent_packets
-            if hashable_packet(packet) in hashed_received_packets
-        ]
-
-        spurious_retransmissions = set()
-        already_transmitted = set()
-
-        for sent_packet in delivered_sent_packets:
-            if sent_packet[TCP].seq in already_transmitted:
-                spurious_retransmissions.add(hashable_packet(sent_packet))
-            already_transmitted.add(sent_packet[TCP].seq)
-
         capture = SingleDupAckRetransmitPacketCapture()
         replayer.TcpSourceReplayer(
             file=self.sender,
@@ -95,8 +84,6 @@ class SingleDupAckRetransmitSackAnalyzer(PacketAnalyzer):
             event_handlers=capture,
         ).run()
 
-        return [
-            packet
-            for packet in capture.packets
-            if hashable_packet(packet) in spurious_retransmissions
-        ]
+        return spurious_single_dup_acks(
+            capture, Delivery.match(self.sender, self.receiver, source)
+        )
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+class Window(NamedTuple):
+    """Seconds of simulation time to analyse, where None leaves that side open"""
+
+    start: Optional[float] = None
+    end: Optional[float] = None
+
+    @property
+    def bounded(self) -> bool:
+        return self.start is not None or self.end is not None
+
+    @property
+    def suffix(self) -> str:
+        """Tells apart what is cached for different windows of the same run"""
+        if not self.bounded:
+            return ""
+        return f"_from{self.start}_to{self.end}"
+
+    def includes(self, time: float) -> bool:
+        return (self.start is None or time >= self.start) and (
+            self.end is None or time <= self.end
+        )
+
+    def slice(self, times: NDArray[np.float64]) -> slice:
+        """The times within the window, which must be sorted"""
+        first = 0 if self.start is None else np.searchsorted(times, self.start, "left")
+        last = (
+            len(times)
+            if self.end is None
+            else np.searchsorted(times, self.end, "right")
+        )
+        return slice(int(first), int(last))
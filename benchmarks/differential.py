@@ -0,0 +1,525 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+from collections import Counter
+from dataclasses import dataclass, field, fields, is_dataclass
+from functools import cached_property
+from typing import Any, Callable, Literal, NamedTuple, Optional
+
+import click
+import rich.console
+import rich.table
+import scapy.packet
+from pydantic import BaseModel
+from scapy.layers.inet import IP, TCP
+
+from analysis import compression, discovery, metrics
+from analysis.pcap import Communication, PcapFile
+from analysis.scenario import VariableRun
+from analysis.trace_analyzer.dst.reordered_packets import (
+    DroppedRetransmittedPacketCapture,
+    TrueBytesInFlightAnalyzer,
+)
+from analysis.trace_analyzer.source.packet_capture import PacketCapture
+from analysis.trace_analyzer.source.replayer import TcpSourceReplayer
+from analysis.trace_analyzer.source.retransmission_timeout import (
+    RTOWaitingForUnsent,
+    WaitTimeAfterRTO,
+)
+from analysis.trace_analyzer.source.sack_fast_retransmit import (
+    FastRetransmitSackPacketCapture,
+)
+from analysis.trace_analyzer.source.spurious_sack_fast_transmit import (
+    SingleDupAckRetransmitPacketCapture,
+    TotalTimeInRecovery,
+)
+from benchmarks.micro import ANALYZERS, OPTION, current_commit
+from benchmarks.synthetic import TraceSettings, trace_options, write_run
+
+REFERENCE = "reference"
+# mismatches listed per subject, the rest are only counted
+MISMATCHES_SHOWN = 5
+
+console = rich.console.Console()
+
+
+class PacketKey(NamedTuple):
+    """What identifies a packet across backends, which need not hand out scapy
+    packets as long as they produce the same keys"""
+
+    time: float
+    source: str
+    destination: str
+    sequence: int
+    acknowledgement: int
+    length: int
+
+
+@dataclass(frozen=True)
+class Run:
+    directory: str
+    option: discovery.Options
+    seed: discovery.Seed
+    variable: discovery.Variable
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, self.option, self.seed, self.variable)
+
+    @cached_property
+    def variable_run(self) -> VariableRun:
+        return VariableRun(self.directory, self.option, self.seed, (self.variable,))
+
+    @property
+    def sender(self) -> PcapFile:
+        return self.variable_run.pcap(self.variable, "TrafficSender0", 1)
+
+    @property
+    def receiver(self) -> PcapFile:
+        return self.variable_run.pcap(self.variable, "Receiver", 1)
+
+    @property
+    def addresses(self) -> Communication:
+        return self.variable_run.ip_addresses(self.variable)
+
+
+# what an analyzer, capture or metric computed from a run
+Subject = Callable[[Run], object]
+
+
+@dataclass(frozen=True)
+class Backend:
+    """Subjects replacing their reference counterparts, and how the run is prepared
+    for them, e.g. converted into another format, where every reference subject is
+    compared on the prepared run"""
+
+    subjects: dict[str, Subject] = field(default_factory=dict)
+    prepare: Optional[Callable[[Run, str], Run]] = None
+
+
+def replay(capture: Callable[[], PacketCapture]) -> Subject:
+    def subject(run: Run) -> PacketCapture:
+        handlers = capture()
+        TcpSourceReplayer(run.sender, *run.addresses, handlers).run()
+        return handlers
+
+    return subject
+
+
+def _analyzer(name: str) -> Subject:
+    build = ANALYZERS[name]
+    return lambda run: build(run.sender, run.receiver).filter_packets(*run.addresses)
+
+
+def _metric(metric: type[metrics.Metric]) -> Subject:
+    return lambda run: metric.calculate(run.variable_run, run.variable)
+
+
+CAPTURES: dict[str, Callable[[], PacketCapture]] = {
+    "TotalTimeInRecovery": TotalTimeInRecovery,
+    "RTOWaitingForUnsent": RTOWaitingForUnsent,
+    "WaitTimeAfterRTO": WaitTimeAfterRTO,
+    "FastRetransmitSackPacketCapture": FastRetransmitSackPacketCapture,
+    "SingleDupAckRetransmitPacketCapture": SingleDupAckRetransmitPacketCapture,
+    "DroppedRetransmittedPacketCapture": DroppedRetransmittedPacketCapture,
+    "TrueBytesInFlightAnalyzer": TrueBytesInFlightAnalyzer,
+}
+
+SUBJECTS: dict[str, Subject] = {
+    **{name: _analyzer(name) for name in ANALYZERS},
+    **{name: replay(capture) for name, capture in CAPTURES.items()},
+    **{metric.__name__: _metric(metric) for metric in metrics.Metric.__subclasses__()},
+}
+
+
+def compressed_copy(run: Run, scratch: str) -> Run:
+    copy = Run(scratch, run.option, run.seed, run.variable)
+    shutil.copytree(run.path, copy.path)
+    compression.compress_directory(copy.path)
+    return copy
+
+
+BACKENDS: dict[str, Backend] = {
+    # scapy reads the captures through gzip, and the logs through open_text
+    "compressed": Backend(prepare=compressed_copy),
+}
+
+
+def register(backend: str, name: str) -> Callable[[Subject], Subject]:
+    """Registers an accelerated implementation of the reference subject name"""
+
+    def decorator(subject: Subject) -> Subject:
+        BACKENDS.setdefault(backend, Backend()).subjects[name] = subject
+        return subject
+
+    return decorator
+
+
+def packet_key(packet: scapy.packet.Packet) -> PacketKey:
+    ip = packet[IP] if IP in packet else None
+    tcp = packet[TCP] if TCP in packet else None
+    return PacketKey(
+        time=float(packet.time),
+        source=ip.src if ip is not None else "",
+        destination=ip.dst if ip is not None else "",
+        sequence=tcp.seq if tcp is not None else 0,
+        acknowledgement=tcp.ack if tcp is not None else 0,
+        length=len(packet),
+    )
+
+
+def normalise(value: object) -> object:
+    """Turns the output of a subject into plain values, with packets as their keys and
+    captures as their fields"""
+    if isinstance(value, scapy.packet.Packet):
+        return packet_key(value)
+    if isinstance(value, PacketKey):
+        return value
+    if is_dataclass(value) and not isinstance(value, type):
+        return {
+            attribute.name: normalise(getattr(value, attribute.name))
+            for attribute in fields(value)
+        }
+    if isinstance(value, dict):
+        return {key: normalise(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return tuple(normalise(item) for item in value)
+    if isinstance(value, list):
+        return [normalise(item) for item in value]
+    return value
+
+
+class Mismatch(BaseModel):
+    path: str
+    detail: str
+
+
+class Comparison(BaseModel):
+    subject: str
+    status: Literal["match", "mismatch", "error", "skipped"]
+    mismatches: list[Mismatch] = []
+    error: Optional[str] = None
+
+
+class RunReport(BaseModel):
+    run: str
+    comparisons: list[Comparison]
+
+
+class DifferentialReport(BaseModel):
+    commit: Optional[str]
+    backend: str
+    tolerance: float
+    runs: list[RunReport]
+
+
+def _equal(reference: object, candidate: object, tolerance: float) -> bool:
+    if isinstance(reference, float) or isinstance(candidate, float):
+        if not isinstance(reference, (int, float)) or not isinstance(
+            candidate, (int, float)
+        ):
+            return False
+        return math.isclose(reference, candidate, rel_tol=tolerance, abs_tol=tolerance)
+    if isinstance(reference, (list, tuple)) and isinstance(candidate, (list, tuple)):
+        return len(reference) == len(candidate) and all(
+            _equal(first, second, tolerance)
+            for first, second in zip(reference, candidate)
+        )
+    return reference == candidate
+
+
+def _describe(values: list[object]) -> str:
+    shown = ", ".join(map(str, values[:MISMATCHES_SHOWN]))
+    return shown + (
+        f" and {len(values) - MISMATCHES_SHOWN} more"
+        if len(values) > MISMATCHES_SHOWN
+        else ""
+    )
+
+
+def diff(
+    reference: object, candidate: object, tolerance: float, path: str = ""
+) -> list[Mismatch]:
+    """Lists where the normalised outputs differ, packet by packet for lists"""
+    if isinstance(reference, dict) and isinstance(candidate, dict):
+        return [
+            mismatch
+            for key in reference.keys() | candidate.keys()
+            for mismatch in (
+                diff(reference[key], candidate[key], tolerance, f"{path}.{key}")
+                if key in reference and key in candidate
+                else [Mismatch(path=f"{path}.{key}", detail="missing on one side")]
+            )
+        ]
+    if isinstance(reference, list) and isinstance(candidate, list):
+        if _equal(reference, candidate, tolerance):
+            return []
+        mismatches = []
+        try:
+            missing = list((Counter(reference) - Counter(candidate)).elements())
+            extra = list((Counter(candidate) - Counter(reference)).elements())
+        except TypeError:
+            # nested lists cannot be counted, so only where they diverge is shown
+            missing, extra = [], []
+        if missing:
+            mismatches.append(
+                Mismatch(
+                    path=path,
+                    detail=f"{len(missing)} only in the reference: {_describe(missing)}",
+                )
+            )
+        if extra:
+            mismatches.append(
+                Mismatch(
+                    path=path,
+                    detail=f"{len(extra)} only in the candidate: {_describe(extra)}",
+                )
+            )
+        if not missing and not extra:
+            index = next(
+                (
+                    index
+                    for index, (first, second) in enumerate(zip(reference, candidate))
+                    if not _equal(first, second, tolerance)
+                ),
+                min(len(reference), len(candidate)),
+            )
+            mismatches.append(
+                Mismatch(
+                    path=path,
+                    detail=f"{len(reference)} and {len(candidate)} values differ "
+                    f"from index {index}",
+                )
+            )
+        return mismatches
+    if _equal(reference, candidate, tolerance):
+        return []
+    return [Mismatch(path=path, detail=f"{reference} != {candidate}")]
+
+
+def _error(exception: Exception) -> str:
+    message = str(exception).splitlines()[0] if str(exception) else ""
+    return f"{type(exception).__name__}: {message}"
+
+
+def _evaluate(subject: Subject, run: Run) -> object:
+    # the captures print their progress, which would drown the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        return normalise(subject(run))
+
+
+def compare(
+    run: Run,
+    backend: Backend,
+    scratch: str,
+    tolerance: float,
+    names: Optional[set[str]] = None,
+) -> list[Comparison]:
+    """Compares every reference subject the backend replaces, or all of them when it
+    prepares the run itself"""
+    candidate_run = backend.prepare(run, scratch) if backend.prepare else run
+    comparisons = []
+    for name, reference_subject in SUBJECTS.items():
+        if names is not None and name not in names:
+            continue
+        if backend.prepare is None and name not in backend.subjects:
+            continue
+        outputs: list[object] = []
+        errors: list[Optional[Exception]] = []
+        for subject, subject_run in (
+            (reference_subject, run),
+            (backend.subjects.get(name, reference_subject), candidate_run),
+        ):
+            try:
+                outputs.append(_evaluate(subject, subject_run))
+                errors.append(None)
+            except Exception as e:
+                outputs.append(None)
+                errors.append(e)
+
+        reference_error, candidate_error = errors
+        if reference_error is not None and candidate_error is not None:
+            # e.g. tshark is not installed, so neither side can be checked
+            comparisons.append(
+                Comparison(
+                    subject=name,
+                    status=(
+                        "skipped"
+                        if type(reference_error) is type(candidate_error)
+                        else "error"
+                    ),
+                    error=_error(reference_error),
+                )
+            )
+        elif reference_error is not None or candidate_error is not None:
+            side = "reference" if reference_error is not None else "candidate"
+            comparisons.append(
+                Comparison(
+                    subject=name,
+                    status="error",
+                    error=f"only the {side} failed, "
+                    + _error(reference_error or candidate_error),  # type: ignore[arg-type]
+                )
+            )
+        else:
+            reference_output, candidate_output = outputs
+            mismatches = diff(reference_output, candidate_output, tolerance, name)
+            comparisons.append(
+                Comparison(
+                    subject=name,
+                    status="mismatch" if mismatches else "match",
+                    mismatches=mismatches,
+                )
+            )
+    unknown = backend.subjects.keys() - SUBJECTS.keys()
+    comparisons.extend(
+        Comparison(subject=name, status="error", error="no reference subject")
+        for name in sorted(unknown)
+    )
+    return comparisons
+
+
+def recorded_runs(directory: str) -> list[Run]:
+    return [
+        Run(directory, option, seed, variable)
+        for option in discovery.discover_options(directory)
+        for seed in discovery.discover_seeds(directory, option)
+        for variable in discovery.discover_variables(directory, option, seed)
+    ]
+
+
+def synthetic_runs(directory: str, settings: TraceSettings, runs: int) -> list[Run]:
+    """Writes runs seeded one after another, so that each draws other losses"""
+    synthetic = []
+    for index in range(runs):
+        run = Run(
+            directory,
+            OPTION,
+            discovery.Seed(str(index + 1)),
+            discovery.Variable("1.0Mbps"),
+        )
+        write_run(run.path, settings.model_copy(update={"seed": settings.seed + index}))
+        synthetic.append(run)
+    return synthetic
+
+
+def print_report(report: DifferentialReport) -> None:
+    styles = {
+        "match": "green",
+        "mismatch": "red",
+        "error": "red",
+        "skipped": "yellow",
+    }
+    for run in report.runs:
+        table = rich.table.Table(
+            title=f"{report.backend} against {REFERENCE}: {run.run}",
+            show_header=True,
+            header_style="bold",
+        )
+        table.add_column("Subject")
+        table.add_column("Status")
+        table.add_column("Details")
+        for comparison in run.comparisons:
+            details = comparison.error or "\n".join(
+                f"{mismatch.path}: {mismatch.detail}"
+                for mismatch in comparison.mismatches
+            )
+            table.add_row(
+                comparison.subject,
+                f"[{styles[comparison.status]}]{comparison.status}[/]",
+                details,
+            )
+        console.print(table)
+
+
+@click.command("differential")
+@click.option(
+    "--backend",
+    "backend_name",
+    help="Backend compared against the reference",
+    type=click.Choice(sorted(BACKENDS)),
+    default="compressed",
+)
+@click.option(
+    "--directory",
+    "-d",
+    "directories",
+    multiple=True,
+    help="Recorded experiments to compare on, besides the synthetic runs",
+    default=[],
+)
+@click.option("--runs", "-n", help="Synthetic runs to compare on", default=2, type=int)
+@click.option(
+    "--subject",
+    "subjects",
+    multiple=True,
+    help="Analyzers, captures and metrics to compare, if not set will compare all",
+    default=[],
+)
+@click.option(
+    "--tolerance",
+    help="Relative and absolute tolerance of floating point outputs",
+    default=1e-9,
+)
+@click.option("--output", "-o", help="Write the report as JSON", default=None)
+@trace_options
+def _differential(
+    backend_name: str,
+    directories: tuple[str, ...],
+    runs: int,
+    subjects: tuple[str, ...],
+    tolerance: float,
+    output: Optional[str],
+    **settings: Any,
+) -> None:
+    unknown = set(subjects) - SUBJECTS.keys()
+    if unknown:
+        raise click.BadParameter(
+            f"unknown subjects {', '.join(sorted(unknown))}", param_hint="--subject"
+        )
+    backend = BACKENDS[backend_name]
+    names = set(subjects) or None
+
+    reports = []
+    with tempfile.TemporaryDirectory() as temporary:
+        synthetic = os.path.join(temporary, "synthetic")
+        all_runs = synthetic_runs(synthetic, TraceSettings(**settings), runs) + [
+            run for directory in directories for run in recorded_runs(directory)
+        ]
+        for index, run in enumerate(all_runs):
+            console.print(f"Comparing [bold]{run.path}[/bold]")
+            comparisons = compare(
+                run, backend, os.path.join(temporary, str(index)), tolerance, names
+            )
+            reports.append(RunReport(run=run.path, comparisons=comparisons))
+
+    report = DifferentialReport(
+        commit=current_commit(),
+        backend=backend_name,
+        tolerance=tolerance,
+        runs=reports,
+    )
+    print_report(report)
+    if output:
+        with open(output, "w") as file:
+            json.dump(report.model_dump(), file, indent=2)
+
+    failed = sum(
+        comparison.status in ("mismatch", "error")
+        for run in reports
+        for comparison in run.comparisons
+    )
+    if failed:
+        console.print(f"[red]{failed} comparisons failed[/red]")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    _differential()
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Optional
+
+import click
+import rich.console
+import rich.progress
+import rich.table
+from pydantic import BaseModel
+
+import analysis
+from analysis import manifest, telemetry
+from analysis.generator import Command, Configuration
+from benchmarks.micro import current_commit
+from benchmarks.synthetic import TraceSettings, trace_options, write_run
+
+CACHE_DIRECTORY = ".analysis_cache"
+
+console = rich.console.Console()
+
+
+class SummaryResult(BaseModel):
+    statistic: str
+    cold: float
+    warm: float
+    returncode: int
+
+
+class MacroBenchmark(BaseModel):
+    commit: Optional[str]
+    config: str
+    runs: int
+    tree_bytes: int
+    settings: TraceSettings
+    repeat: int
+    results: list[SummaryResult]
+
+
+def run_settings(command: Command, settings: TraceSettings) -> TraceSettings:
+    """The traces of a command follow its conditions, seeded by where it is stored so
+    that every run differs"""
+    return settings.model_copy(
+        update={
+            "seed": zlib.crc32("/".join(command.location).encode()),
+            "reordering_rate": (
+                settings.reordering_rate if command.conditions.fast_rerouting else 0.0
+            ),
+            "udp_packets": settings.udp_packets if command.conditions.congestion else 0,
+        }
+    )
+
+
+def generate_tree(
+    configuration: Configuration,
+    settings: TraceSettings,
+    record: bool,
+    workers: Optional[int] = None,
+) -> str:
+    """Writes a synthetic run for every command of the configuration where simulate
+    would have written it, returning the experiment directory"""
+    commands = list(configuration.commands())
+    if configuration.variables:
+        configuration.sampled_design().store(configuration.experiment_directory)
+    with (
+        ProcessPoolExecutor(max_workers=workers) as pool,
+        rich.progress.Progress(console=console) as progress,
+    ):
+        task = progress.add_task("Generating", total=len(commands))
+        futures = {
+            pool.submit(
+                write_run, command.directory, run_settings(command, settings)
+            ): command
+            for command in commands
+        }
+        for future in as_completed(futures):
+            future.result()
+            if record:
+                command = futures[future]
+                manifest.record_run(command.experiment_directory, command.location)
+            progress.advance(task)
+    return configuration.experiment_directory
+
+
+def summarise(root: str, directory: str, statistic: str) -> tuple[float, int]:
+    environment = dict(os.environ)
+    package = os.path.dirname(os.path.dirname(os.path.abspath(analysis.__file__)))
+    environment["PYTHONPATH"] = os.pathsep.join(
+        filter(None, (package, environment.get("PYTHONPATH")))
+    )
+    start = time.perf_counter()
+    process = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "analysis",
+            "graph",
+            "-d",
+            directory,
+            statistic,
+            "summary",
+        ],
+        cwd=root,
+        env=environment,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start, process.returncode
+
+
+def measure(root: str, directory: str, statistic: str, repeat: int) -> SummaryResult:
+    """Times the summary once without any cached statistics and then again once they
+    have been cached by that first run"""
+    shutil.rmtree(os.path.join(root, CACHE_DIRECTORY), ignore_errors=True)
+    cold, returncode = summarise(root, directory, statistic)
+    warm = [summarise(root, directory, statistic)[0] for _ in range(repeat)]
+    return SummaryResult(
+        statistic=statistic,
+        cold=cold,
+        warm=statistics.median(warm),
+        returncode=returncode,
+    )
+
+
+@click.command("macro")
+@click.option(
+    "--config",
+    "-c",
+    "config_filename",
+    help="Experiment whose layout to generate",
+    default="experiments/bandwidth_primary.json",
+)
+@click.option(
+    "--runs", "-n", help="Runs of every option and variable", default=3, type=int
+)
+@click.option(
+    "--statistic",
+    "statistic_names",
+    multiple=True,
+    help="Statistics to summarise, if not set will time every statistic",
+    default=[],
+)
+@click.option(
+    "--manifest/--no-manifest",
+    "record",
+    help="Index the runs as simulate does, or leave discovery to list the tree",
+    default=True,
+)
+@click.option("--repeat", "-r", help="Warm runs per statistic", default=3, type=int)
+@click.option("--jobs", "-j", help="Processes generating the traces", type=int)
+@click.option(
+    "--directory",
+    "-d",
+    help="Keep the synthetic tree in this directory instead of a temporary one",
+    default=None,
+)
+@click.option("--output", "-o", help="Write the results as JSON", default=None)
+@trace_options
+def _macro(
+    config_filename: str,
+    runs: int,
+    statistic_names: tuple[str, ...],
+    record: bool,
+    repeat: int,
+    jobs: Optional[int],
+    directory: Optional[str],
+    output: Optional[str],
+    **settings: Any,
+) -> None:
+    from analysis.__main__ import statistics as groups
+
+    trace_settings = TraceSettings(**settings)
+    with open(config_filename, "r") as file:
+        configuration = Configuration.model_validate_json(file.read())
+
+    with tempfile.TemporaryDirectory() as temporary:
+        root = os.path.abspath(directory or temporary)
+        configuration = configuration.model_copy(
+            update={"directory": root, "number_of_runs": runs}
+        )
+        experiment = generate_tree(configuration, trace_settings, record, jobs)
+        relative = os.path.relpath(experiment, root)
+        tree_bytes = telemetry.directory_size(experiment)
+
+        results = []
+        for statistic in statistic_names or [
+            group.name for group in groups if group.name
+        ]:
+            console.print(f"Summarising [bold]{statistic}[/bold]")
+            results.append(measure(root, relative, statistic, repeat))
+
+    table = rich.table.Table(
+        title=f"{len(configuration)} runs, {telemetry.format_bytes(tree_bytes)}",
+        show_header=True,
+        header_style="bold",
+    )
+    table.add_column("Statistic")
+    table.add_column("Cold (s)")
+    table.add_column("Warm (s)")
+    table.add_column("Exit code")
+    for result in results:
+        table.add_row(
+            result.statistic,
+            f"{result.cold:.3f}",
+            f"{result.warm:.3f}",
+            (
+                str(result.returncode)
+                if result.returncode == 0
+                else f"[red]{result.returncode}[/red]"
+            ),
+        )
+    console.print(table)
+
+    if output:
+        with open(output, "w") as file:
+            json.dump(
+                MacroBenchmark(
+                    commit=current_commit(),
+                    config=config_filename,
+                    runs=len(configuration),
+                    tree_bytes=tree_bytes,
+                    settings=trace_settings,
+                    repeat=repeat,
+                    results=results,
+                ).model_dump(),
+                file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    _macro()
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import functools
+import json
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+
+import click
+import rich.console
+import rich.table
+from pydantic import BaseModel
+
+from analysis import discovery, metrics
+from analysis.pcap import PcapFile
+from analysis.scenario import VariableRun
+from analysis.trace_analyzer.analyzer import PacketAnalyzer
+from analysis.trace_analyzer.dst import (
+    reordered_packets,
+    spurious_retransmission_packets,
+)
+from analysis.trace_analyzer.source.dropped_packets import DroppedPacketsAnalyzer
+from analysis.trace_analyzer.source.packet_capture import PacketCapture
+from analysis.trace_analyzer.source.regular_fast_retransmit import (
+    FastRetransmissionAnalyzer,
+)
+from analysis.trace_analyzer.source.replayer import TcpSourceReplayer
+from analysis.trace_analyzer.source.sack_fast_retransmit import (
+    FastRetransmitSackAnalyzer,
+)
+from analysis.trace_analyzer.source.spurious_sack_fast_transmit import (
+    SingleDupAckRetransmitSackAnalyzer,
+)
+from benchmarks.synthetic import TraceSettings, trace_options, write_run
+
+OPTION: discovery.Options = "frr"
+SEED = discovery.Seed("1")
+VARIABLE = discovery.Variable("1.0Mbps")
+
+# how every analyzer is built from the sender's and the receiver's captures
+ANALYZERS: dict[str, Callable[[PcapFile, PcapFile], PacketAnalyzer]] = {
+    "DroppedPacketsAnalyzer": DroppedPacketsAnalyzer,
+    "FastRetransmissionAnalyzer": lambda sender, _: FastRetransmissionAnalyzer(sender),
+    "FastRetransmitSackAnalyzer": lambda sender, _: FastRetransmitSackAnalyzer(sender),
+    "SingleDupAckRetransmitSackAnalyzer": SingleDupAckRetransmitSackAnalyzer,
+    "PacketOutOfOrderAnalyzer": lambda _, receiver: (
+        reordered_packets.PacketOutOfOrderAnalyzer(receiver)
+    ),
+    "OOOAnalyzer": reordered_packets.OOOAnalyzer,
+    "PreciseOOOAnalyzer": reordered_packets.PreciseOOOAnalyzer,
+    "SpuriousOOOAnalyzer": reordered_packets.SpuriousOOOAnalyzer,
+    "SpuriousRetransmissionAnalyzer": reordered_packets.SpuriousRetransmissionAnalyzer,
+    "SpuriousRetransmissionAnalyzer (tshark)": lambda _, receiver: (
+        spurious_retransmission_packets.SpuriousRetransmissionAnalyzer(receiver)
+    ),
+}
+
+
+class MicroResult(BaseModel):
+    name: str
+    packets: int
+    seconds: Optional[float] = None
+    packets_per_second: Optional[float] = None
+    peak_memory: Optional[int] = None
+    error: Optional[str] = None
+
+
+class MicroBenchmark(BaseModel):
+    commit: Optional[str]
+    settings: TraceSettings
+    repeat: int
+    results: list[MicroResult]
+
+
+def current_commit() -> Optional[str]:
+    process = subprocess.run(
+        ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=False
+    )
+    return process.stdout.strip() or None
+
+
+def measure(
+    name: str,
+    packets: int,
+    setup: Callable[[], Any],
+    run: Callable[[Any], object],
+    repeat: int,
+) -> MicroResult:
+    """Times run on what setup returns, which is left out of the measurement, and
+    then traces its peak memory in a separate run, as tracing slows it down"""
+    try:
+        times = []
+        for _ in range(repeat):
+            state = setup()
+            start = time.perf_counter()
+            run(state)
+            times.append(time.perf_counter() - start)
+
+        state = setup()
+        tracemalloc.start()
+        try:
+            run(state)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    except Exception as e:
+        message = str(e).splitlines()[0] if str(e) else ""
+        return MicroResult(
+            name=name, packets=packets, error=f"{type(e).__name__}: {message}"
+        )
+
+    seconds = statistics.median(times)
+    return MicroResult(
+        name=name,
+        packets=packets,
+        seconds=seconds,
+        packets_per_second=packets / seconds if seconds else None,
+        peak_memory=peak,
+    )
+
+
+def _loaded(filename: str) -> PcapFile:
+    file = PcapFile(filename)
+    file.packets
+    return file
+
+
+def _analyzer(
+    build: Callable[[PcapFile, PcapFile], PacketAnalyzer],
+    sender_filename: str,
+    receiver_filename: str,
+) -> PacketAnalyzer:
+    return build(_loaded(sender_filename), _loaded(receiver_filename))
+
+
+def run_benchmarks(directory: str, repeat: int) -> list[MicroResult]:
+    run_directory = os.path.join(directory, OPTION, SEED, VARIABLE)
+    sender_filename = os.path.join(run_directory, "-TrafficSender0-1.pcap")
+    receiver_filename = os.path.join(run_directory, "-Receiver-1.pcap")
+    sender, receiver = _loaded(sender_filename), _loaded(receiver_filename)
+    source, destination = sender.first_addresses
+    both = len(sender.packets) + len(receiver.packets)
+
+    results = [
+        measure(
+            f"PcapFile ({device})",
+            len(file.packets),
+            functools.partial(PcapFile, file.filename),
+            lambda fresh: fresh.packets,
+            repeat,
+        )
+        for device, file in (("sender", sender), ("receiver", receiver))
+    ]
+    results.extend(
+        measure(
+            name,
+            both,
+            functools.partial(_analyzer, build, sender_filename, receiver_filename),
+            lambda analyzer: analyzer.filter_packets(source, destination),
+            repeat,
+        )
+        for name, build in ANALYZERS.items()
+    )
+    results.append(
+        measure(
+            "TcpSourceReplayer.run",
+            len(sender.packets),
+            lambda: TcpSourceReplayer(
+                _loaded(sender_filename), source, destination, PacketCapture()
+            ),
+            lambda replayer: replayer.run(),
+            repeat,
+        )
+    )
+    # metrics load their own captures, so they are measured end to end
+    results.extend(
+        measure(
+            metric.__name__,
+            both,
+            functools.partial(VariableRun, directory, OPTION, SEED, (VARIABLE,)),
+            functools.partial(metric.calculate, variable=VARIABLE),
+            repeat,
+        )
+        for metric in metrics.Metric.__subclasses__()
+    )
+    return results
+
+
+def print_results(results: list[MicroResult]) -> None:
+    table = rich.table.Table(title="Micro-benchmarks", show_header=True)
+    table.add_column("Benchmark")
+    table.add_column("Packets")
+    table.add_column("Time (s)")
+    table.add_column("Packets/s")
+    table.add_column("Peak memory (MiB)")
+    for result in results:
+        if result.error is not None:
+            table.add_row(
+                result.name, str(result.packets), f"[red]{result.error}[/red]", "", ""
+            )
+            continue
+        assert result.seconds is not None and result.peak_memory is not None
+        table.add_row(
+            result.name,
+            str(result.packets),
+            f"{result.seconds:.4f}",
+            f"{result.packets_per_second:,.0f}" if result.packets_per_second else "-",
+            f"{result.peak_memory / 2**20:.2f}",
+        )
+    rich.console.Console().print(table)
+
+
+@click.command("micro")
+@click.option("--repeat", "-r", help="Runs per benchmark", default=3, type=int)
+@click.option(
+    "--directory",
+    "-d",
+    help="Keep the synthetic experiment in this directory instead of a temporary one",
+    default=None,
+)
+@click.option("--output", "-o", help="Write the results as JSON", default=None)
+@trace_options
+def _micro(
+    repeat: int, directory: Optional[str], output: Optional[str], **settings: Any
+) -> None:
+    trace_settings = TraceSettings(**settings)
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = directory or temporary
+        write_run(os.path.join(directory, OPTION, SEED, VARIABLE), trace_settings)
+        results = run_benchmarks(directory, repeat)
+
+    print_results(results)
+    if output:
+        with open(output, "w") as file:
+            json.dump(
+                MicroBenchmark(
+                    commit=current_commit(),
+                    settings=trace_settings,
+                    repeat=repeat,
+                    results=results,
+                ).model_dump(),
+                file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    _micro()
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import random
+import sys
+import time
+import zlib
+from typing import Optional
+
+import click
+from pydantic import BaseModel
+
+from analysis.generator import Settings
+from analysis.pcap import SMSS
+from analysis.telemetry import parse_rate
+from benchmarks.synthetic import TraceSettings, generate, write_captures, write_run
+
+# the arguments src/simulation.cc registers, besides the settings
+OPTIONS = {*Settings.model_fields, "dir", "seed", "run"}
+FLAGS = {
+    "enable-udp",
+    "enable-rerouting",
+    "enable-router-pcap",
+    "enable-udp-pcap",
+    "enable-logging",
+}
+
+REORDERING_RATE = 0.01
+
+
+class Behaviour(BaseModel):
+    """How the stand-in misbehaves, decided per command from its seed, run and
+    directory so that reruns of the same command behave the same"""
+
+    delay: float = 0.0
+    jitter: float = 0.0
+    failure_rate: float = 0.0
+    hang_rate: float = 0.0
+    hang_time: float = 3600.0
+    large_rate: float = 0.0
+    large_factor: float = 10.0
+    scale: float = 1.0
+
+
+def parse(arguments: tuple[str, ...]) -> tuple[dict[str, str], set[str]]:
+    """Splits the --key=value arguments from the flags, rejecting what ns-3's
+    CommandLine would not accept"""
+    values: dict[str, str] = {}
+    flags: set[str] = set()
+    for argument in arguments:
+        if not argument.startswith("--"):
+            raise click.UsageError(f"Invalid command-line argument: {argument}")
+        key, assigned, value = argument.removeprefix("--").partition("=")
+        if key in FLAGS:
+            if not assigned or value.lower() in ("1", "true"):
+                flags.add(key)
+        elif key in OPTIONS and assigned:
+            values[key] = value
+        else:
+            raise click.UsageError(f"Invalid command-line argument: {argument}")
+    if "dir" not in values:
+        raise click.UsageError("--dir is required")
+    return values, flags
+
+
+def trace_settings(
+    values: dict[str, str], flags: set[str], seed: int, scale: float
+) -> TraceSettings:
+    """Traces shaped by the options ns-3 would have simulated"""
+    udp_packets = 0
+    if "enable-udp" in flags and "bandwidth_udp" in values:
+        duration = float(values.get("udp_end_time", 0)) - float(
+            values.get("udp_start_time", 0)
+        )
+        segment = int(values.get("udp_segment_size", SMSS))
+        udp_packets = int(
+            parse_rate(values["bandwidth_udp"]) * max(duration, 0) / (8 * segment)
+        )
+    return TraceSettings(
+        flows=int(values.get("tcp_senders", 1)),
+        bytes=max(int(int(values.get("tcp_bytes", 1_000_000)) * scale), SMSS),
+        reordering_rate=REORDERING_RATE if "enable-rerouting" in flags else 0.0,
+        udp_packets=int(udp_packets * scale),
+        seed=seed,
+    )
+
+
+def simulate(
+    values: dict[str, str], flags: set[str], behaviour: Behaviour
+) -> Optional[int]:
+    """Runs the stand-in, returning the exit status of an injected failure"""
+    seed = zlib.crc32(
+        f"{values.get('seed', 1)}-{values.get('run', 0)}-{values['dir']}".encode()
+    )
+    rng = random.Random(seed)
+    failing = rng.random() < behaviour.failure_rate
+    hanging = rng.random() < behaviour.hang_rate
+    large = rng.random() < behaviour.large_rate
+
+    threshold = values.get("policy_threshold", "50")
+    print(f"Setting congestion threshold to {threshold}", file=sys.stderr)
+    time.sleep(behaviour.delay + rng.uniform(0, behaviour.jitter))
+    if hanging:
+        time.sleep(behaviour.hang_time)
+
+    scale = behaviour.scale * (behaviour.large_factor if large else 1.0)
+    settings = trace_settings(values, flags, seed, scale)
+    if failing:
+        # ns-3 aborts part way through, leaving only the captures flushed so far
+        captures = generate(settings)
+        write_captures(values["dir"], dict(list(captures.items())[:1]))
+        print(
+            'assert failed. cond="m_ptr", msg="Attempted to dereference zero pointer"',
+            file=sys.stderr,
+        )
+        return 1
+    write_run(values["dir"], settings, sys.stderr)
+    return None
+
+
+@click.command(
+    "standin",
+    context_settings={"ignore_unknown_options": True, "allow_extra_args": True},
+)
+@click.option("--delay", help="Seconds every command takes", default=0.0)
+@click.option("--jitter", help="Further seconds taken at random", default=0.0)
+@click.option("--failure-rate", help="Chance a command aborts", default=0.0)
+@click.option("--hang-rate", help="Chance a command hangs", default=0.0)
+@click.option("--hang-time", help="Seconds a hanging command waits", default=3600.0)
+@click.option("--large-rate", help="Chance a command writes large traces", default=0.0)
+@click.option("--large-factor", help="How much larger those traces are", default=10.0)
+@click.option("--scale", help="Scales the bytes every flow sends", default=1.0)
+@click.argument("arguments", nargs=-1, type=click.UNPROCESSED)
+def _standin(arguments: tuple[str, ...], **behaviour: float) -> None:
+    values, flags = parse(arguments)
+    status = simulate(values, flags, Behaviour(**behaviour))
+    if status is not None:
+        sys.exit(status)
+
+
+if __name__ == "__main__":
+    _standin()
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Optional
+
+import click
+import rich.console
+import rich.table
+from pydantic import BaseModel
+
+# --help is eager, so these measure the cost of reaching each command
+SUBCOMMANDS: dict[str, tuple[str, ...]] = {
+    "analysis": ("--help",),
+    "simulate": ("simulate", "--help"),
+    "index": ("index", "--help"),
+    "graph": ("graph", "--help"),
+    "sequence": ("sequence", "--help"),
+    "bytesInFlight": ("bytesInFlight", "--help"),
+}
+
+_IMPORT_TIME = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+class ImportTime(BaseModel):
+    module: str
+    cumulative: float
+
+
+class StartupResult(BaseModel):
+    name: str
+    arguments: list[str]
+    wall_time: float
+    import_time: float
+    heaviest: list[ImportTime]
+
+
+def parse_import_times(stderr: str) -> list[ImportTime]:
+    """Returns the cumulative import time in seconds of every top level import"""
+    times = []
+    for line in stderr.splitlines():
+        match = _IMPORT_TIME.match(line)
+        # nested imports are indented beneath the module that triggered them
+        if match is None or len(match.group(3)) != 1:
+            continue
+        times.append(
+            ImportTime(module=match.group(4), cumulative=int(match.group(2)) / 1e6)
+        )
+    return times
+
+
+def measure(name: str, arguments: tuple[str, ...], repeat: int) -> StartupResult:
+    wall_times, import_times = [], []
+    heaviest: list[ImportTime] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "analysis", *arguments],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        wall_times.append(time.perf_counter() - start)
+        if process.returncode != 0:
+            raise click.ClickException(
+                f"{' '.join(arguments)} exited with {process.returncode}"
+            )
+        imports = parse_import_times(process.stderr)
+        import_times.append(sum(entry.cumulative for entry in imports))
+        heaviest = sorted(imports, key=lambda entry: entry.cumulative, reverse=True)
+    return StartupResult(
+        name=name,
+        arguments=list(arguments),
+        wall_time=statistics.median(wall_times),
+        import_time=statistics.median(import_times),
+        heaviest=heaviest[:5],
+    )
+
+
+@click.command("startup")
+@click.option("--repeat", "-r", help="Runs per command", default=5, type=int)
+@click.option(
+    "--directory",
+    "-d",
+    help="Experiment directory to also time a graph summary against",
+    default=None,
+)
+@click.option(
+    "--statistic", "-s", help="Statistic to summarise", default="time", type=str
+)
+@click.option("--output", "-o", help="Write the results as JSON", default=None)
+def _startup(
+    repeat: int, directory: Optional[str], statistic: str, output: Optional[str]
+) -> None:
+    commands = dict(SUBCOMMANDS)
+    if directory is not None:
+        commands[f"{statistic} summary"] = (
+            "graph",
+            "-d",
+            directory,
+            statistic,
+            "summary",
+        )
+
+    results = [measure(name, arguments, repeat) for name, arguments in commands.items()]
+
+    table = rich.table.Table(title="Startup", show_header=True, header_style="bold")
+    table.add_column("Command")
+    table.add_column("Wall time (s)")
+    table.add_column("Import time (s)")
+    table.add_column("Heaviest imports")
+    for result in results:
+        table.add_row(
+            result.name,
+            f"{result.wall_time:.3f}",
+            f"{result.import_time:.3f}",
+            ", ".join(
+                f"{entry.module} ({entry.cumulative:.3f})" for entry in result.heaviest
+            ),
+        )
+    rich.console.Console().print(table)
+
+    if output:
+        with open(output, "w") as file:
+            json.dump([result.model_dump() for result in results], file, indent=2)
+
+
+if __name__ == "__main__":
+    _startup()
@@ -0,0 +1,599 @@
+from __future__ import annotations
+
+import heapq
+import ipaddress
+import math
+import os
+import random
+import struct
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, NamedTuple, Optional, TextIO, TypeVar
+
+import click
+from pydantic import BaseModel
+
+from analysis.pcap import DESTINATION, SMSS, SOURCE
+
+T = TypeVar("T")
+
+# ns-3's point to point devices capture with a PPP header
+PPP_LINKTYPE = 9
+PPP_IP = 0x0021
+TCP_PROTOCOL = 6
+UDP_PROTOCOL = 17
+TTL = 64
+WINDOW = 65535
+TCP_FLAGS = {"F": 0x01, "S": 0x02, "R": 0x04, "P": 0x08, "A": 0x10}
+
+SOURCE_PORT = 49153
+DESTINATION_PORT = 50000
+CONGESTION_SOURCE = "10.1.1.1"
+
+DUPLICATE_ACK_THRESHOLD = 3
+MAX_SACK_BLOCKS = 3
+RTO = 1.0
+# segments lost in a row to stall the sender until its retransmission timer fires
+RTO_BURST = 8
+# random losses keep clear of these many segments around a stall and at the tail,
+# where too few duplicate acks would follow to trigger a fast retransmit
+LOSS_GUARD = DUPLICATE_ACK_THRESHOLD + 2
+INITIAL_WINDOW = 10 * SMSS
+# ns-3 numbers the nodes of the senders after those of the routers
+FIRST_SENDER_NODE = 6
+
+
+class TraceSettings(BaseModel):
+    flows: int = 1
+    bytes: int = 1_000_000
+    loss_rate: float = 0.01
+    reordering_rate: float = 0.0
+    sack: bool = True
+    rto_episodes: int = 0
+    udp_packets: int = 0
+    delay: float = 0.01
+    interval: float = 0.001
+    seed: int = 0
+
+
+class Packet(NamedTuple):
+    """A captured TCP segment or UDP datagram, encoded only when it is written"""
+
+    time: float
+    source: str
+    destination: str
+    source_port: int
+    destination_port: int
+    protocol: int = TCP_PROTOCOL
+    flags: str = "A"
+    seq: int = 0
+    ack: int = 0
+    tsval: int = 0
+    tsecr: int = 0
+    sacks: tuple[int, ...] = ()
+    payload: int = 0
+
+
+def _copy_at(packet: Packet, time: float) -> Packet:
+    return packet._replace(time=time)
+
+
+def _checksum(header: bytes) -> int:
+    total = sum(struct.unpack(f"!{len(header) // 2}H", header))
+    while total > 0xFFFF:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+def encode(packet: Packet) -> bytes:
+    """The packet as ns-3 captures it, which leaves the TCP and UDP checksums unset"""
+    if packet.protocol == TCP_PROTOCOL:
+        options = struct.pack("!BBBBII", 1, 1, 8, 10, packet.tsval, packet.tsecr)
+        if packet.sacks:
+            options += struct.pack(
+                f"!BBBB{len(packet.sacks)}I",
+                1,
+                1,
+                5,
+                2 + 4 * len(packet.sacks),
+                *packet.sacks,
+            )
+        flags = sum(TCP_FLAGS[flag] for flag in packet.flags)
+        transport = struct.pack(
+            "!HHIIBBHHH",
+            packet.source_port,
+            packet.destination_port,
+            packet.seq,
+            packet.ack,
+            (5 + len(options) // 4) << 4,
+            flags,
+            WINDOW,
+            0,
+            0,
+        )
+        transport += options
+    else:
+        transport = struct.pack(
+            "!HHHH",
+            packet.source_port,
+            packet.destination_port,
+            8 + packet.payload,
+            0,
+        )
+    length = 20 + len(transport) + packet.payload
+    header = struct.pack(
+        "!BBHHHBBH4s4s",
+        0x45,
+        0,
+        length,
+        0,
+        0,
+        TTL,
+        packet.protocol,
+        0,
+        ipaddress.IPv4Address(packet.source).packed,
+        ipaddress.IPv4Address(packet.destination).packed,
+    )
+    header = header[:10] + struct.pack("!H", _checksum(header)) + header[12:]
+    return struct.pack("!H", PPP_IP) + header + transport + bytes(packet.payload)
+
+
+def write_pcap(filename: str, packets: list[Packet]) -> None:
+    with open(filename, "wb") as file:
+        file.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, PPP_LINKTYPE))
+        for packet in packets:
+            data = encode(packet)
+            seconds, fraction = divmod(round(packet.time * 1_000_000), 1_000_000)
+            file.write(struct.pack("<IIII", seconds, fraction, len(data), len(data)))
+            file.write(data)
+
+
+def flow_source(flow: int) -> str:
+    return SOURCE if flow == 0 else f"10.2.{flow}.1"
+
+
+@dataclass
+class _Flow:
+    """Plays out a single paced TCP flow between a sender and the receiver, recording
+    what each device would have captured"""
+
+    index: int
+    settings: TraceSettings
+    rng: random.Random
+    captures: defaultdict[str, list[Packet]]
+    events: list[tuple[float, int, str, tuple]] = field(default_factory=list)
+    out_of_order: set[int] = field(default_factory=set)
+    expected: int = 0
+    last_ack: int = -1
+    duplicates: int = 0
+    fast_retransmitted: set[int] = field(default_factory=set)
+    stalls: set[int] = field(default_factory=set)
+    guarded: set[int] = field(default_factory=set)
+    highest_sent: int = -1
+    recover: Optional[int] = None
+    sender_echo: int = 0
+    finished: bool = False
+    _order: int = 0
+
+    @property
+    def segments(self) -> int:
+        return math.ceil(self.settings.bytes / SMSS)
+
+    @property
+    def source(self) -> str:
+        return flow_source(self.index)
+
+    def _seq(self, segment: int) -> int:
+        return 1 + segment * SMSS
+
+    def _length(self, segment: int) -> int:
+        return min(SMSS, self.settings.bytes - segment * SMSS)
+
+    def _push(self, time: float, kind: str, *payload: object) -> None:
+        self._order += 1
+        heapq.heappush(self.events, (time, self._order, kind, payload))
+
+    def _packet(
+        self,
+        time: float,
+        outgoing: bool,
+        flags: str,
+        seq: int,
+        ack: int,
+        echo: int,
+        sacks: tuple[int, ...] = (),
+        payload: int = 0,
+    ) -> Packet:
+        source, destination = self.source, DESTINATION
+        ports = (SOURCE_PORT, DESTINATION_PORT)
+        if not outgoing:
+            source, destination, ports = destination, source, ports[::-1]
+        return Packet(
+            time,
+            source,
+            destination,
+            *ports,
+            flags=flags,
+            seq=seq,
+            ack=ack,
+            tsval=int(time * 1000),
+            tsecr=echo,
+            sacks=sacks if self.settings.sack else (),
+            payload=payload,
+        )
+
+    def _schedule(self) -> None:
+        """Queues the original transmissions, stalling the sender after every burst
+        lost to a retransmission timeout"""
+        eligible = range(LOSS_GUARD, max(self.segments - RTO_BURST - LOSS_GUARD, 0))
+        episodes = sorted(
+            self.rng.sample(
+                list(eligible), min(self.settings.rto_episodes, len(eligible))
+            )
+        )
+        self.stalls = {
+            segment
+            for episode in episodes
+            for segment in range(episode, episode + RTO_BURST)
+        }
+        self.guarded = {
+            segment
+            for episode in episodes
+            for segment in range(episode - LOSS_GUARD, episode + RTO_BURST + LOSS_GUARD)
+        } | set(range(self.segments - LOSS_GUARD, self.segments))
+
+        time, segment = 2 * self.settings.delay, 0
+        for episode in [*episodes, self.segments]:
+            while segment < min(episode + RTO_BURST, self.segments):
+                self._push(time, "send", segment, False)
+                time += self.settings.interval
+                segment += 1
+            if episode == self.segments:
+                break
+            # the timer fires a timeout after the first lost segment was sent, and the
+            # sender goes back to resend the whole burst
+            time = time - RTO_BURST * self.settings.interval + RTO
+            for lost in range(episode, episode + RTO_BURST):
+                self._push(time, "send", lost, True)
+                time += self.settings.interval
+
+    def _send(self, time: float, segment: int, retransmission: bool) -> None:
+        self.highest_sent = max(self.highest_sent, segment)
+        packet = self._packet(
+            time,
+            True,
+            "A",
+            self._seq(segment),
+            1,
+            self.sender_echo,
+            payload=self._length(segment),
+        )
+        self.captures[f"TrafficSender{self.index}-1"].append(packet)
+        if not retransmission and (
+            segment in self.stalls
+            or (
+                segment not in self.guarded
+                and self.rng.random() < self.settings.loss_rate
+            )
+        ):
+            return
+        arrival = time + self.settings.delay
+        if self.rng.random() < self.settings.reordering_rate:
+            # rerouted onto the alternate path, which overtakes it with later segments
+            arrival += 3.5 * self.settings.interval
+            for link in (1, 2):
+                self.captures[f"Router03-{link}"].append(
+                    _copy_at(packet, time + self.settings.delay / 2)
+                )
+        self._push(arrival, "arrive", segment, packet)
+
+    def _sack_blocks(self) -> tuple[int, ...]:
+        blocks: list[tuple[int, int]] = []
+        for segment in sorted(self.out_of_order):
+            if blocks and blocks[-1][1] == segment - 1:
+                blocks[-1] = (blocks[-1][0], segment)
+            else:
+                blocks.append((segment, segment))
+        return tuple(
+            edge
+            for start, end in blocks[:MAX_SACK_BLOCKS]
+            for edge in (self._seq(start), self._seq(end) + self._length(end))
+        )
+
+    def _arrive(self, time: float, segment: int, packet: Packet) -> None:
+        self.captures["Receiver-1"].append(_copy_at(packet, time))
+        if segment >= self.expected:
+            self.out_of_order.add(segment)
+        while self.expected in self.out_of_order:
+            self.out_of_order.remove(self.expected)
+            self.expected += 1
+        ack = (
+            self._seq(self.expected)
+            if self.expected < self.segments
+            else self.settings.bytes + 1
+        )
+        reply = self._packet(
+            time, False, "A", 1, ack, packet.tsval, self._sack_blocks()
+        )
+        self.captures["Receiver-1"].append(reply)
+        self._push(time + self.settings.delay, "ack", ack, reply)
+
+    def _ack(self, time: float, ack: int, packet: Packet) -> None:
+        self.captures[f"TrafficSender{self.index}-1"].append(_copy_at(packet, time))
+        self.sender_echo = packet.tsval
+        if ack == self.settings.bytes + 1:
+            if not self.finished:
+                self.finished = True
+                self._close(time)
+            return
+        hole = (ack - 1) // SMSS
+        if ack != self.last_ack:
+            self.last_ack, self.duplicates = ack, 0
+            if self.recover is not None and hole <= self.recover:
+                # a partial ack, so the next hole is resent without waiting (NewReno)
+                self._retransmit(time, hole)
+            elif self.recover is not None:
+                self.recover = None
+            return
+        self.duplicates += 1
+        if self.duplicates >= DUPLICATE_ACK_THRESHOLD and self.recover is None:
+            self.recover = self.highest_sent
+            self._retransmit(time, hole)
+
+    def _retransmit(self, time: float, hole: int) -> None:
+        if hole not in self.fast_retransmitted and hole not in self.stalls:
+            self.fast_retransmitted.add(hole)
+            self._push(time, "send", hole, True)
+
+    def _exchange(self, time: float, outgoing: bool, packet: Packet) -> None:
+        """Captures a packet at the end that sends it and, a delay later, at the end
+        that receives it"""
+        sender, receiver = f"TrafficSender{self.index}-1", "Receiver-1"
+        if not outgoing:
+            sender, receiver = receiver, sender
+        self.captures[sender].append(packet)
+        self.captures[receiver].append(_copy_at(packet, time + self.settings.delay))
+
+    def _open(self) -> None:
+        delay = self.settings.delay
+        self._exchange(0.0, True, self._packet(0.0, True, "S", 0, 0, 0))
+        self._exchange(delay, False, self._packet(delay, False, "SA", 0, 1, 0))
+        self._exchange(
+            2 * delay, True, self._packet(2 * delay, True, "A", 1, 1, int(delay * 1000))
+        )
+
+    def _close(self, time: float) -> None:
+        delay, seq = self.settings.delay, self.settings.bytes + 1
+        self._exchange(
+            time, True, self._packet(time, True, "FA", seq, 1, self.sender_echo)
+        )
+        self._exchange(
+            time + delay,
+            False,
+            self._packet(time + delay, False, "FA", 1, seq + 1, int(time * 1000)),
+        )
+        self._exchange(
+            time + 2 * delay,
+            True,
+            self._packet(time + 2 * delay, True, "A", seq + 1, 2, 0),
+        )
+
+    def play(self) -> None:
+        self._open()
+        self._schedule()
+        handlers: dict[str, Callable[..., None]] = {
+            "send": self._send,
+            "arrive": self._arrive,
+            "ack": self._ack,
+        }
+        while self.events:
+            time, _, kind, payload = heapq.heappop(self.events)
+            handlers[kind](time, *payload)
+
+
+def _congestion(
+    settings: TraceSettings, rng: random.Random, captures: defaultdict[str, list]
+) -> None:
+    for index in range(settings.udp_packets):
+        time = 2 * settings.delay + index * settings.interval
+        packet = Packet(
+            time,
+            CONGESTION_SOURCE,
+            DESTINATION,
+            SOURCE_PORT,
+            DESTINATION_PORT,
+            protocol=UDP_PROTOCOL,
+            payload=SMSS,
+        )
+        captures["CongestionSender-1"].append(packet)
+        if rng.random() < settings.loss_rate:
+            continue
+        captures["Receiver-1"].append(_copy_at(packet, time + settings.delay))
+
+
+def generate(settings: TraceSettings) -> dict[str, list[Packet]]:
+    """The packets every device of a run captures, keyed by device and link"""
+    rng = random.Random(settings.seed)
+    captures: defaultdict[str, list[Packet]] = defaultdict(list)
+    for flow in range(settings.flows):
+        _Flow(flow, settings, rng, captures).play()
+    _congestion(settings, rng, captures)
+    # devices that ns-3 always captures on, even when nothing crossed them
+    for device in ("Router03-1", "Router03-2", "CongestionSender-1"):
+        captures.setdefault(device, [])
+    return {
+        device: sorted(packets, key=lambda packet: packet.time)
+        for device, packets in captures.items()
+    }
+
+
+def sender_log(
+    packets: list[Packet], flow: int
+) -> tuple[list[tuple[float, int]], list[tuple[float, int]]]:
+    """The congestion window and the bytes in flight a NewReno sender would log,
+    replayed from what it captured"""
+    source = flow_source(flow)
+    cwnd, ssthresh = INITIAL_WINDOW, WINDOW
+    highest = acked = 1
+    recover: Optional[int] = None
+    cwnds = [(0.0, cwnd)]
+    bytes_in_flight = []
+    for packet in packets:
+        if packet.protocol != TCP_PROTOCOL:
+            continue
+        if packet.source == source:
+            end = packet.seq + packet.payload
+            if packet.payload and end <= highest and recover is None:
+                recover = highest
+                ssthresh = cwnd = max((highest - acked) // 2, 2 * SMSS)
+                cwnds.append((packet.time, cwnd))
+            highest = max(highest, end)
+            continue
+        if packet.ack > acked:
+            acked = packet.ack
+            if recover is not None and acked >= recover:
+                recover = None
+            elif recover is None:
+                cwnd += SMSS if cwnd < ssthresh else max(SMSS * SMSS // cwnd, 1)
+            cwnds.append((packet.time, cwnd))
+        bytes_in_flight.append((packet.time, max(highest - acked, 0)))
+    return cwnds, bytes_in_flight
+
+
+def queue_log(
+    captures: dict[str, list[Packet]], settings: TraceSettings
+) -> dict[str, list[tuple[float, int]]]:
+    """The occupancy of the congested and the alternate queue, where every segment
+    waits from when it is sent until it arrives or, when dropped, a delay later"""
+
+    def key(packet: Packet) -> tuple[str, int, int]:
+        return packet.source, packet.seq, packet.tsval
+
+    arrivals = {
+        key(packet): packet.time
+        for packet in captures.get("Receiver-1", [])
+        if packet.payload
+    }
+    rerouted = {key(packet) for packet in captures.get("Router03-2", [])}
+    changes: dict[str, list[tuple[float, int]]] = {
+        "CongestedQueue": [],
+        "AlternateQueue": [],
+    }
+    for device, packets in captures.items():
+        if not device.startswith("TrafficSender"):
+            continue
+        for packet in packets:
+            if not packet.payload or packet.source == DESTINATION:
+                continue
+            queue = "AlternateQueue" if key(packet) in rerouted else "CongestedQueue"
+            leaves = arrivals.get(key(packet), packet.time + settings.delay)
+            changes[queue] += [(packet.time, 1), (leaves, -1)]
+
+    occupancy = {}
+    for queue, events in changes.items():
+        count, occupancy[queue] = 0, [(0.0, 0)]
+        for time, change in sorted(events):
+            count += change
+            occupancy[queue].append((time, count))
+    return occupancy
+
+
+def write_logs(
+    directory: str,
+    captures: dict[str, list[Packet]],
+    settings: TraceSettings,
+    debug: Optional[TextIO] = None,
+) -> list[str]:
+    """Writes the congestion windows, debug log and queue occupancy that ns-3 writes
+    alongside the captures, where the debug log goes to debug when it is given"""
+    filenames = []
+    debug_lines = []
+    for flow in range(settings.flows):
+        cwnds, bytes_in_flight = sender_log(captures[f"TrafficSender{flow}-1"], flow)
+        filename = os.path.join(directory, f"n{flow}.dat")
+        with open(filename, "w") as file:
+            file.writelines(f"{time} {cwnd}\n" for time, cwnd in cwnds)
+        filenames.append(filename)
+        debug_lines += [
+            (
+                time,
+                f"+{time:.9f}s [node {flow + FIRST_SENDER_NODE}] "
+                f"Returning calculated bytesInFlight: {amount}\n",
+            )
+            for time, amount in bytes_in_flight
+        ]
+
+    if debug is None:
+        filename = os.path.join(directory, "debug.log")
+        with open(filename, "w") as file:
+            file.writelines(line for _, line in sorted(debug_lines))
+        filenames.append(filename)
+    else:
+        debug.writelines(line for _, line in sorted(debug_lines))
+
+    for queue, occupancy in queue_log(captures, settings).items():
+        filename = os.path.join(directory, f"{queue}.dat")
+        with open(filename, "w") as file:
+            file.writelines(f"{time} {count}\n" for time, count in occupancy)
+        filenames.append(filename)
+    return filenames
+
+
+def write_captures(directory: str, captures: dict[str, list[Packet]]) -> list[str]:
+    os.makedirs(directory, exist_ok=True)
+    filenames = []
+    for device, packets in captures.items():
+        filename = os.path.join(directory, f"-{device}.pcap")
+        write_pcap(filename, packets)
+        filenames.append(filename)
+    return filenames
+
+
+def write_run(
+    directory: str, settings: TraceSettings, debug: Optional[TextIO] = None
+) -> list[str]:
+    """Writes the captures and logs of a run into directory, named the way ns-3 names
+    them"""
+    captures = generate(settings)
+    return write_captures(directory, captures) + write_logs(
+        directory, captures, settings, debug
+    )
+
+
+def trace_options(command: Callable[..., T]) -> Callable[..., T]:
+    """Adds an option for every trace setting, passed to the command by field name"""
+    options = [
+        click.option("--flows", "-f", help="Concurrent TCP flows", default=1),
+        click.option(
+            "--bytes", "-b", help="Bytes sent by every flow", default=1_000_000
+        ),
+        click.option("--loss-rate", help="Chance a segment is dropped", default=0.01),
+        click.option(
+            "--reordering-rate",
+            help="Chance a segment is rerouted and arrives out of order",
+            default=0.0,
+        ),
+        click.option("--sack/--no-sack", help="Acknowledge with SACK", default=True),
+        click.option(
+            "--rto-episodes",
+            help="Bursts lost until the retransmission timer fires",
+            default=0,
+        ),
+        click.option("--udp-packets", help="Congesting UDP datagrams", default=0),
+        click.option("--seed", "-s", help="Seed of the random losses", default=0),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
+@click.command("synthetic")
+@click.option("--directory", "-d", help="Run directory to write to", required=True)
+@trace_options
+def _synthetic(directory: str, **settings: Any) -> None:
+    for filename in write_run(directory, TraceSettings(**settings)):
+        click.echo(filename)
+
+
+if __name__ == "__main__":
+    _synthetic()
@@ -0,0 +1,36 @@
+import numpy as np
+
+from analysis import decimation
+
+X = np.linspace(0.0, 1.0, 1_000)
+Y = np.sin(X * 20)
+
+
+def test_min_max_keeps_the_envelope():
+    spiked = Y.copy()
+    spiked[[123, 456]] = 5.0, -5.0
+    indices = decimation.min_max(X, spiked, buckets=10)
+    assert len(indices) <= 40
+    assert {0, 123, 456, 999} <= set(indices.tolist())
+    assert np.array_equal(decimation.min_max(X[:30], Y[:30], 10), np.arange(30))
+
+
+def test_lttb_keeps_threshold_points_with_the_ends():
+    indices = decimation.lttb(X, Y, 50)
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_decimate_keeps_what_it_is_asked_to():
+    keep = np.array([7, 501], dtype=np.int64)
+    for method in decimation.decimations:
+        indices = decimation.decimate(X, Y, method, buckets=5, keep=keep)
+        assert set(keep.tolist()) <= set(indices.tolist())
+    assert len(decimation.decimate(X, Y, "none")) == 1_000
+
+
+def test_matching():
+    x = np.array([0.0, 1.0, 1.0, 2.0, 3.0])
+    assert np.array_equal(decimation.matching(x, np.array([1.0, 3.0, 5.0])), [1, 4])
+    assert not decimation.matching(np.empty(0), np.array([1.0])).size
@@ -0,0 +1,27 @@
+from itertools import product
+
+import pytest
+from pydantic import ValidationError
+
+from analysis.design import Design
+
+VALUES = [[1, 2, 3, 4], ["a", "b", "c"], [0.1, 0.2, 0.3, 0.4, 0.5]]
+
+
+def test_full_design_is_the_product():
+    assert Design().points(VALUES) == list(product(*VALUES))
+    # asking for every point or more falls back to the full design
+    assert Design(method="random", samples=100).points(VALUES) == list(product(*VALUES))
+
+
+@pytest.mark.parametrize("method", ["random", "latin_hypercube", "halton"])
+def test_sampled_designs_pick_unique_points(method):
+    points = Design(method=method, samples=12, seed=3).points(VALUES)
+    assert len(points) == len(set(points)) == 12
+    assert set(points) <= set(product(*VALUES))
+    assert points == Design(method=method, samples=12, seed=3).points(VALUES)
+
+
+def test_sampled_designs_require_samples():
+    with pytest.raises(ValidationError):
+        Design(method="latin_hypercube")
@@ -0,0 +1,27 @@
+import numpy as np
+
+from analysis.ecdf import ecdf, ecdfs
+
+
+def test_ecdf_steps_at_every_distinct_value():
+    curve = ecdf([3.0, 1.0, 2.0, 2.0, np.nan])
+    assert np.array_equal(curve.values, [1.0, 2.0, 3.0])
+    assert np.allclose(curve.probabilities, [0.25, 0.75, 1.0])
+
+
+def test_ecdfs_keep_the_samples_apart():
+    curves = ecdfs({"a": [1.0, 2.0], "b": [[5.0], [4.0, 6.0]], "empty": []})
+    assert np.array_equal(curves["a"].values, [1.0, 2.0])
+    assert np.array_equal(curves["b"].values, [4.0, 5.0, 6.0])
+    assert np.allclose(curves["b"].probabilities, [1 / 3, 2 / 3, 1.0])
+    assert not curves["empty"].values.size
+
+
+def test_downsample_keeps_exact_steps():
+    curve = ecdf(np.arange(1_000.0))
+    sampled = curve.downsample(10)
+    assert len(sampled.values) == 10
+    assert sampled.values[-1] == 999.0
+    assert sampled.probabilities[-1] == 1.0
+    assert np.allclose(sampled.probabilities, (sampled.values + 1) / 1_000)
+    assert ecdf([1.0, 2.0]).downsample(10).values.size == 2
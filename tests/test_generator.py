@@ -0,0 +1,33 @@
+import gzip
+import os
+import sys
+
+from analysis.generator import Command, Conditions, OverwrittenSetting
+
+BASE_SETTINGS = os.path.join(
+    os.path.dirname(__file__), "..", "experiments", "base_setting.json"
+)
+
+# stands in for ns-3, failing after it logged something
+FAILING_SIMULATOR = (
+    sys.executable + " -c \"import sys; sys.stderr.write('boom'); sys.exit(3)\" {}"
+)
+
+
+def test_compressed_run_keeps_the_exit_status(tmp_path):
+    command = Command(
+        conditions=Conditions(fast_rerouting=True, congestion=False),
+        main_directory=str(tmp_path),
+        variables={},
+        seed=1,
+        run=1,
+        condition_label="frr",
+        variable_label="failing",
+        settings=OverwrittenSetting(base_settings=BASE_SETTINGS).apply(),
+        compress=True,
+        simulator=FAILING_SIMULATOR,
+    )
+    telemetry = command.execute()
+    assert telemetry.exit_status == 3
+    with gzip.open(f"{command.directory}/debug.log.gz", "rt") as log:
+        assert log.read() == "boom"
@@ -0,0 +1,41 @@
+import numpy as np
+
+from analysis import goodput
+
+RATES = np.array([[0.0, 2.0, 2.0, 0.0], [4.0, 0.0, 2.0, 2.0]])
+
+
+def test_timeline():
+    timeline = goodput.Timeline(0.5, RATES)
+    assert np.allclose(timeline.times, [0.0, 0.5, 1.0, 1.5])
+    assert np.array_equal(
+        timeline.active, [[False, True, True, False], [True, True, True, True]]
+    )
+    assert np.array_equal(timeline.peak, [2.0, 4.0])
+    assert np.array_equal(timeline.median, [2.0, 2.0])
+    # a stalled flow counts as active, one that has yet to start does not
+    assert np.allclose(timeline.fairness, [1.0, 0.5, 1.0, 1.0])
+    assert np.isclose(timeline.mean_fairness(), 0.875)
+    assert goodput.Timeline(0.5, np.zeros((2, 3))).mean_fairness() == 1.0
+
+
+def test_timeline_from_transfers():
+    transfers = [
+        goodput.Transfer(np.array([0.05, 0.15, 0.25]), np.array([10.0, 20.0, 30.0])),
+        goodput.Transfer(np.array([0.12]), np.array([5.0])),
+    ]
+    timeline = goodput.Timeline.from_transfers(transfers, width=0.1)
+    assert timeline.rates.shape == (2, 3)
+    assert np.allclose(timeline.rates[0], [800.0, 1600.0, 2400.0])
+    assert np.allclose(timeline.rates[1], [0.0, 400.0, 0.0])
+    assert goodput.Timeline.from_transfers([]).rates.shape == (0, 1)
+
+
+def test_bands_pad_seeds_that_finished_sooner():
+    shorter = goodput.Timeline(0.5, np.array([[2.0]]))
+    bands = goodput.bands([goodput.Timeline(0.5, RATES), shorter], (0.0, 100.0))
+    assert len(bands) == 2
+    assert np.allclose(bands[0].times, [0.0, 0.5, 1.0, 1.5])
+    assert np.allclose(bands[0].mean, [1.0, 1.0, 1.0, 0.0])
+    assert np.allclose(bands[1].lower, [0.0, 0.0, 0.0, 0.0])
+    assert np.allclose(bands[1].upper, RATES[1])
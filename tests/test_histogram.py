@@ -0,0 +1,23 @@
+import numpy as np
+
+from analysis.histogram import MAXIMUM_INTEGER_BINS, edges, histograms
+
+
+def test_integer_bins_are_centred_on_the_integers():
+    histogram = histograms({"a": [0, 1, 1, 3, np.nan, np.inf]})["a"]
+    assert np.array_equal(histogram.edges, [-0.5, 0.5, 1.5, 2.5, 3.5])
+    assert np.allclose(histogram.fractions, [0.25, 0.5, 0.0, 0.25])
+
+
+def test_wide_integer_ranges_are_binned():
+    values = np.array([0.0, 10.0 * MAXIMUM_INTEGER_BINS])
+    assert len(edges(values)) - 1 <= MAXIMUM_INTEGER_BINS
+    assert len(edges(np.array([0.0, 1.0, 2.0]), bins=2)) == 3
+
+
+def test_histograms_share_their_bins():
+    result = histograms({"a": [0.1, 0.2, 0.9], "b": [0.5], "empty": []}, bins=4)
+    assert np.array_equal(result["a"].edges, result["b"].edges)
+    assert np.isclose(result["a"].fractions.sum(), 1.0)
+    assert np.isclose(result["b"].fractions.sum(), 1.0)
+    assert not result["empty"].fractions.any()
@@ -1,7 +1,7 @@
-import scapy.utils
 import hypothesis
-from tests.utils import FastReroutingUDPCommand
+import scapy.utils
 
+from tests.utils import FastReroutingUDPCommand
 
 fast_rerouting_udp_command = FastReroutingUDPCommand(policy_threshold=50, seed=1)
 
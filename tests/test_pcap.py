@@ -0,0 +1,34 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from analysis.pcap import DESTINATION, SOURCE, PcapFile, cached_index
+from analysis.window import Window
+from benchmarks.synthetic import TraceSettings, write_run
+
+
+@pytest.mark.skipif(shutil.which("tshark") is None, reason="tshark is not installed")
+def test_flow_completion_times_ignore_the_window(tmp_path):
+    write_run(str(tmp_path), TraceSettings(flows=2, bytes=100_000))
+    receiver = PcapFile(str(tmp_path / "-Receiver-1.pcap"))
+    # the flows finish long after the window closes
+    windowed = receiver.windowed(Window(0.0, 0.05))
+
+    times = receiver.flow_completion_times(DESTINATION)
+    assert len(times) == 2
+    assert windowed.flow_completion_times(DESTINATION) == times
+    assert windowed.flow_completion_time(SOURCE, DESTINATION) == (
+        receiver.flow_completion_time(SOURCE, DESTINATION)
+    )
+
+
+def test_index_of_an_absolute_directory_stays_in_the_cache(tmp_path, monkeypatch):
+    run = tmp_path / "run"
+    captures = sorted(write_run(str(run), TraceSettings(bytes=10_000)))
+    monkeypatch.chdir(tmp_path)
+    sender = str(run / "-TrafficSender0-1.pcap")
+    index = cached_index(sender)
+    assert sorted(str(path) for path in run.iterdir()) == captures
+    assert len(list((tmp_path / ".analysis_cache").rglob("*.index.npz"))) == 1
+    assert np.array_equal(cached_index(sender).offsets, index.offsets)
@@ -0,0 +1,60 @@
+import numpy as np
+
+from analysis.pyramid import Pyramid, cached
+from analysis.window import Window
+
+TIMES = np.arange(10_000) / 1_000
+VALUES = np.arange(10_000, dtype=np.int64) % 97
+
+
+def test_levels_shrink_within_the_budget():
+    pyramid = Pyramid.build(TIMES, VALUES, budget=100)
+    assert pyramid.levels
+    assert len(pyramid.levels[-1]) <= 100
+    sizes = [len(level) for level in pyramid.levels]
+    assert sizes == sorted(sizes, reverse=True)
+    # every level nests within the one beneath it
+    for finer, coarser in zip(pyramid.levels, pyramid.levels[1:]):
+        assert set(coarser.tolist()) <= set(finer.tolist())
+    assert not Pyramid.build(TIMES[:50], VALUES[:50], budget=100).levels
+
+
+def test_store_and_load(tmp_path):
+    pyramid = Pyramid.build(TIMES, VALUES, budget=100)
+    filename = str(tmp_path / "pyramid.npz")
+    pyramid.store(filename)
+    loaded = Pyramid.load(filename)
+    assert np.array_equal(loaded.times, pyramid.times)
+    assert np.array_equal(loaded.values, pyramid.values)
+    assert len(loaded.levels) == len(pyramid.levels)
+    for stored, level in zip(loaded.levels, pyramid.levels):
+        assert np.array_equal(stored, level)
+
+
+def test_window_reaches_the_edges():
+    pyramid = Pyramid.build(TIMES, VALUES, budget=100)
+    times, values = pyramid.window(2.0005, 2.0495, budget=100)
+    # finest level, with the sample before the start and after the end
+    assert np.allclose(times[[0, -1]], [2.0, 2.05])
+    assert np.array_equal(values, VALUES[2_000:2_051])
+    times, _ = pyramid.window(budget=100)
+    assert len(times) <= 100
+
+
+def test_sliced():
+    pyramid = Pyramid.build(TIMES, VALUES, budget=100)
+    sliced = pyramid.sliced(Window(1.0005, 2.0), budget=100)
+    assert np.isclose(sliced.times[0], 1.0)
+    assert np.isclose(sliced.times[-1], 2.0)
+    assert len(sliced.levels[-1]) <= 100
+
+
+def test_cache_of_an_absolute_directory_stays_in_the_cache(tmp_path, monkeypatch):
+    run = tmp_path / "run"
+    run.mkdir()
+    (run / "trace.dat").write_text("")
+    monkeypatch.chdir(tmp_path)
+    pyramid = Pyramid.build(TIMES, VALUES, budget=100)
+    cached(str(run), "bytes", [str(run / "trace.dat")], lambda: pyramid)
+    assert list(run.iterdir()) == [run / "trace.dat"]
+    assert len(list((tmp_path / ".analysis_cache").rglob("bytes.npz"))) == 1
@@ -0,0 +1,25 @@
+import numpy as np
+
+from analysis import reordering
+
+IN_ORDER = np.array([1, 2, 3, 4, 5], dtype=np.int64)
+# 2 arrives after 3 and 4, 5 arrives before 4
+REORDERED = np.array([1, 3, 4, 2, 6, 5], dtype=np.int64)
+
+
+def test_extents():
+    assert not reordering.extents(IN_ORDER).size
+    assert np.array_equal(reordering.extents(REORDERED), [2, 1])
+
+
+def test_displacements():
+    assert not reordering.displacements(IN_ORDER).any()
+    assert np.array_equal(reordering.displacements(REORDERED), [0, -1, -1, 2, -1, 1])
+
+
+def test_density_and_displaced():
+    density = reordering.density(REORDERED, threshold=2)
+    assert np.allclose(density * 6, [0, 3, 1, 1, 1])
+    assert np.isclose(reordering.displaced(REORDERED), 5 / 6)
+    assert reordering.displaced(IN_ORDER) == 0.0
+    assert reordering.displaced(np.empty(0, dtype=np.int64)) == 0.0
@@ -1,10 +1,9 @@
-from scapy.utils import rdpcap
-from scapy.layers.inet import IP, TCP
 import hypothesis
+from scapy.layers.inet import IP, TCP
+from scapy.utils import rdpcap
 
 from tests.utils import FastReroutingUDPCommand
 
-
 fast_rerouting_command = FastReroutingUDPCommand(seed=1, policy_threshold=50)
 
 
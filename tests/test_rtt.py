@@ -0,0 +1,43 @@
+import numpy as np
+
+from analysis import rtt
+
+
+def _sent(times, sequences, tsvals):
+    return rtt.Sent(
+        np.array(times, dtype=np.float64),
+        np.array(sequences, dtype=np.int64),
+        np.array(tsvals, dtype=np.int64),
+    )
+
+
+def _echoes(times, tsecrs):
+    return rtt.Echoes(
+        np.array(times, dtype=np.float64), np.array(tsecrs, dtype=np.int64)
+    )
+
+
+def test_samples_time_every_tsval_from_its_first_segment():
+    segments = _sent([0.0, 0.1, 0.2], [0, 100, 200], [1, 1, 2])
+    # the second echo of a TSval is ignored
+    acknowledgements = _echoes([0.5, 0.6, 0.7], [1, 1, 2])
+    samples = rtt.samples(segments, acknowledgements)
+    assert np.allclose(samples.times, [0.0, 0.2])
+    assert np.allclose(samples.rtts, [0.5, 0.5])
+    assert np.isclose(samples.percentile(50), 500.0)
+
+
+def test_samples_follow_karns_rule():
+    # the segment at 100 is retransmitted with TSval 3, so neither TSval is timed
+    segments = _sent([0.0, 0.1, 0.3], [0, 100, 100], [1, 2, 3])
+    acknowledgements = _echoes([0.4, 0.5, 0.6], [1, 2, 3])
+    samples = rtt.samples(segments, acknowledgements)
+    assert np.allclose(samples.times, [0.0])
+    assert rtt.samples(segments, _echoes([], [])).percentile(50) == 0.0
+
+
+def test_inflation():
+    samples = rtt.Samples(np.array([0.0, 1.0, 2.0]), np.array([0.1, 1.3, 2.1]))
+    assert rtt.inflation(samples, []) == 1.0
+    assert np.isclose(rtt.inflation(samples, [1.2]), 3.0)
+    assert rtt.inflation(samples, [0.05, 1.2, 2.05]) == 1.0
@@ -0,0 +1,130 @@
+import numpy as np
+
+from analysis import discovery
+from analysis.graph import MultiFlowPlot
+from analysis.scenario import Scenario
+from analysis.statistic import (
+    MultiFlowStatistic,
+    Statistic,
+    bootstrap_means,
+    jains_fairness_index,
+)
+from benchmarks.synthetic import TraceSettings, write_run
+
+SEEDS = [discovery.Seed("10"), discovery.Seed("11")]
+# two design points of a multi-variable sweep share the value on the first axis
+POINTS = (
+    discovery.Variable("1.0_5"),
+    discovery.Variable("1.0_6"),
+    discovery.Variable("3.0_5"),
+)
+
+
+def test_statistic_cache_keeps_points_sharing_a_value(tmp_path):
+    stat = Statistic(SEEDS, [1.0, 1.0, 3.0], np.arange(6.0).reshape(2, 3))
+    filename = str(tmp_path / "stat.npz")
+    stat.store(filename, POINTS)
+
+    loaded = Statistic.load(filename, SEEDS, POINTS)
+    assert loaded is not None
+    assert loaded.variables == stat.variables
+    assert np.array_equal(loaded.values, stat.values)
+
+    subset = Statistic.load(filename, SEEDS[1:], POINTS[1:])
+    assert subset is not None
+    assert subset.variables == [1.0, 3.0]
+    assert np.array_equal(subset.values, [[4.0, 5.0]])
+
+    assert Statistic.load(filename, SEEDS, ("2.0_5",)) is None
+
+
+def test_multi_flow_statistic_cache_selects_cells(tmp_path):
+    stat = MultiFlowStatistic.from_plots(
+        {
+            seed: [
+                MultiFlowPlot(variable=variable, value=[offset + variable] * flows)
+                for variable, flows in ((1.0, 1), (2.0, 2), (3.0, 3))
+            ]
+            for seed, offset in zip(SEEDS, (0.0, 10.0))
+        }
+    )
+    points = ("1", "2", "3")
+    filename = str(tmp_path / "stat.npz")
+    stat.store(filename, points)
+
+    loaded = MultiFlowStatistic.load(filename, SEEDS, points)
+    assert loaded is not None
+    assert np.array_equal(loaded.values, stat.values)
+    assert np.array_equal(loaded.offsets, stat.offsets)
+
+    subset = MultiFlowStatistic.load(filename, SEEDS[1:], ("3", "1"))
+    assert subset is not None
+    assert subset.variables == [3.0, 1.0]
+    assert subset.data[SEEDS[1]][0].value == [13.0] * 3
+    assert subset.data[SEEDS[1]][1].value == [11.0]
+
+
+def _scenario(directory):
+    return Scenario(directory, "frr", SEEDS, POINTS)
+
+
+def test_cold_and_warm_loads_match(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for seed in SEEDS:
+        for index, point in enumerate(POINTS):
+            run = tmp_path / "sweep" / "frr" / seed / point
+            run.mkdir(parents=True)
+            write_run(
+                str(run),
+                TraceSettings(flows=2, bytes=10_000 * (index + 1), seed=int(seed)),
+            )
+
+    for property in ("goodput_fairness", "peak_goodput_multi_flow"):
+        cold = getattr(_scenario("sweep"), property)
+        assert (tmp_path / ".analysis_cache" / "sweep" / f"frr_{property}.npz").exists()
+        warm = getattr(_scenario("sweep"), property)
+        assert cold.variables == warm.variables == [1.0, 1.0, 3.0]
+        assert np.array_equal(cold.values, warm.values)
+
+
+def test_bootstrap_means():
+    values = np.array([[1.0, 10.0], [2.0, 20.0], [3.0, 30.0], [6.0, 60.0]])
+    means = bootstrap_means(values, resamples=2_000, seed=7)
+    assert means.shape == (2_000, 2)
+    assert np.array_equal(means, bootstrap_means(values, resamples=2_000, seed=7))
+    assert np.allclose(means.mean(axis=0), [3.0, 30.0], rtol=0.05)
+
+
+def test_bootstrap_confidence_interval_contains_the_average():
+    stat = Statistic(SEEDS * 3, [1.0, 2.0], np.arange(12.0).reshape(6, 2) ** 2)
+    interval = stat.bootstrap_confidence_interval()
+    for lower, average, upper in zip(interval.lower, stat.average, interval.upper):
+        assert lower.value <= average.value <= upper.value
+
+
+def test_jains_fairness_index():
+    assert np.allclose(
+        jains_fairness_index(
+            np.array([6.0, 6.0, 0.0]),
+            np.array([12.0, 36.0, 0.0]),
+            np.array([3, 3, 3]),
+        ),
+        [1.0, 1 / 3, 1.0],
+    )
+
+
+def test_multi_flow_statistic_fairness():
+    stat = MultiFlowStatistic.from_plots(
+        {
+            SEEDS[0]: [
+                MultiFlowPlot(variable=1.0, value=[2.0, 2.0]),
+                MultiFlowPlot(variable=2.0, value=[4.0, 0.0, 0.0, 0.0]),
+            ],
+            SEEDS[1]: [
+                MultiFlowPlot(variable=1.0, value=[1.0, 3.0]),
+                MultiFlowPlot(variable=2.0, value=[5.0]),
+            ],
+        }
+    )
+    assert stat.fairness.variables == [1.0, 2.0]
+    assert np.allclose(stat.fairness.values, [[1.0, 0.25], [0.8, 1.0]])